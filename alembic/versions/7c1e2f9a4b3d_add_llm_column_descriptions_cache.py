@@ -0,0 +1,33 @@
+"""Add llm_column_descriptions cache table
+
+Revision ID: 7c1e2f9a4b3d
+Revises: 45b885d06824
+Create Date: 2026-10-15 09:12:04.118422
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e2f9a4b3d'
+down_revision: Union[str, Sequence[str], None] = '45b885d06824'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_column_descriptions',
+    sa.Column('sha', sa.String(length=64), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('llm_column_descriptions')
@@ -0,0 +1,41 @@
+"""Add composite (dataset_id, table_name) index on dataset_schemas
+
+Revision ID: b4d8e1c07a52
+Revises: 7c1e2f9a4b3d
+Create Date: 2026-10-15 10:03:41.502917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d8e1c07a52'
+down_revision: Union[str, Sequence[str], None] = '7c1e2f9a4b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_dataset_schemas_dataset_id_table_name',
+            'dataset_schemas',
+            ['dataset_id', 'table_name'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_dataset_schemas_dataset_id_table_name',
+            table_name='dataset_schemas',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,29 @@
+"""Add metadata_text_parts to datasets
+
+Revision ID: e91a3c5d7f20
+Revises: b4d8e1c07a52
+Create Date: 2026-10-15 11:27:18.640253
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91a3c5d7f20'
+down_revision: Union[str, Sequence[str], None] = 'b4d8e1c07a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('datasets', sa.Column('metadata_text_parts', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('datasets', 'metadata_text_parts')
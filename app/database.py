@@ -2,33 +2,46 @@
 Database connection and session management
 """
 import os
+import time
 from dotenv import load_dotenv
 from contextlib import contextmanager
 
 # Load environment variables
 load_dotenv()
-from typing import Generator
+from typing import Dict, Generator, Optional, Tuple
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import NullPool
+import orjson
 import psycopg2
 
-from app.models import Base
+from app.models import Base, Dataset
+from app.encryption import get_encryption_manager
 
 # Metadata database URL (for storing datasets, schemas, metadata)
 METADATA_DATABASE_URL = os.getenv('DATABASE_URL', '')
 if METADATA_DATABASE_URL.startswith('postgres://'):
     METADATA_DATABASE_URL = METADATA_DATABASE_URL.replace('postgres://', 'postgresql://', 1)
 
+# Metadata DB connection pool: every tool call and request opens a short session,
+# so keep warm connections around instead of reconnecting (TCP + auth) each time
+METADATA_POOL_SIZE = int(os.getenv('METADATA_POOL_SIZE', 10))
+METADATA_MAX_OVERFLOW = int(os.getenv('METADATA_MAX_OVERFLOW', 20))
+
 # Create engine for metadata database
 metadata_engine = create_engine(
     METADATA_DATABASE_URL,
-    poolclass=NullPool,  # No connection pooling for metadata DB
+    pool_size=METADATA_POOL_SIZE,
+    max_overflow=METADATA_MAX_OVERFLOW,
+    pool_pre_ping=True,  # Drop connections the server closed while idle
+    pool_recycle=1800,
+    # JSON/JSONB columns (query_logs.client_info, metadata_text_parts) via orjson
+    json_serializer=lambda obj: orjson.dumps(obj, default=str).decode(),
+    json_deserializer=orjson.loads,
     echo=False
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=metadata_engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=metadata_engine)
 
 
 def init_database():
@@ -64,6 +77,91 @@ def get_dataset_connection(connection_string: str):
     return psycopg2.connect(connection_string)
 
 
+# Decrypted connection strings by dataset_id as (expires_at, connection_string,
+# name, is_active). Activation, deactivation and deletion invalidate the entry
+# (locally and through app.events); the TTL bounds staleness if that event is lost.
+CONNECTION_STRING_TTL_SECONDS = 300
+_connection_string_cache: Dict[int, tuple] = {}
+
+
+def _dataset_connection_entry(dataset_id: int) -> Optional[tuple]:
+    """A dataset's _connection_string_cache entry, loaded (and decrypted) on a miss"""
+    cached = _connection_string_cache.get(dataset_id)
+    if cached and cached[0] > time.time():
+        return cached
+
+    with get_db_context() as db:
+        dataset = db.query(
+            Dataset.connection_string_encrypted, Dataset.name, Dataset.is_active
+        ).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        return None
+
+    connection_string = get_encryption_manager().decrypt(dataset.connection_string_encrypted)
+    if connection_string.startswith('postgres://'):
+        connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
+
+    entry = (time.time() + CONNECTION_STRING_TTL_SECONDS, connection_string, dataset.name, dataset.is_active)
+    _connection_string_cache[dataset_id] = entry
+    return entry
+
+
+def get_dataset_connection_string(dataset_id: int) -> Optional[str]:
+    """
+    Decrypted, postgresql://-normalized connection string for a dataset
+
+    Cached per dataset_id for CONNECTION_STRING_TTL_SECONDS; call
+    invalidate_dataset_connection_string() when a dataset changes.
+    """
+    entry = _dataset_connection_entry(dataset_id)
+    return entry[1] if entry else None
+
+
+def get_active_dataset_connection(dataset_id: int) -> Optional[Tuple[str, str]]:
+    """
+    (name, connection string) for an active dataset, None if it's missing or inactive
+
+    Shares get_dataset_connection_string's cache, so repeated queries skip the
+    metadata DB lookup and the decrypt.
+    """
+    entry = _dataset_connection_entry(dataset_id)
+    if not entry or not entry[3]:
+        return None
+    return entry[2], entry[1]
+
+
+def invalidate_dataset_connection_string(dataset_id: Optional[int] = None):
+    """Drop one dataset's cached connection string, or every one if dataset_id is None"""
+    if dataset_id is None:
+        _connection_string_cache.clear()
+    else:
+        _connection_string_cache.pop(dataset_id, None)
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a SQL identifier the way PostgreSQL does (wrap in double quotes, double any inside)"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def build_sample_query(table_name: str, limit: int) -> str:
+    """
+    SELECT * ... LIMIT query for sampling a table, with the table name quoted
+    as an identifier (it comes straight from the tool caller)
+
+    Quoting is done here rather than by psycopg2's sql.Identifier, which needs a
+    live connection just to render the string.
+
+    Args:
+        table_name: Table to sample, optionally schema-qualified ("schema.table")
+        limit: Number of rows
+
+    Returns:
+        The rendered SQL string
+    """
+    table = '.'.join(quote_identifier(part) for part in table_name.split('.'))
+    return f"SELECT * FROM {table} LIMIT {int(limit)}"
+
+
 def test_connection(connection_string: str) -> tuple[bool, str]:
     """Test if a database connection string is valid"""
     try:
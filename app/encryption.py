@@ -2,6 +2,7 @@
 Encryption utilities for securing database connection strings
 """
 import os
+from functools import lru_cache
 from cryptography.fernet import Fernet
 
 
@@ -43,14 +44,7 @@ def generate_encryption_key() -> str:
     return Fernet.generate_key().decode('utf-8')
 
 
-# Global instance
-_encryption_manager = None
-
-
+@lru_cache(maxsize=1)
 def get_encryption_manager() -> EncryptionManager:
     """Get or create the global encryption manager instance"""
-    global _encryption_manager
-    if _encryption_manager is None:
-        _encryption_manager = EncryptionManager()
-    return _encryption_manager
-
+    return EncryptionManager()
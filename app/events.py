@@ -0,0 +1,51 @@
+"""
+Redis pub/sub events that tell running MCP servers to drop their cached dataset state
+"""
+import os
+import orjson
+
+# Dataset activations, deactivations and deletions. The channel name predates
+# the last two; the message's "action" says which one happened.
+DATASET_CHANGED_CHANNEL = 'channel:dataset:activated'
+
+
+def publish_event(channel: str, payload: dict) -> bool:
+    """
+    Publish a JSON event (best-effort)
+
+    Returns:
+        True if the event was published, False if Redis is missing or down
+    """
+    try:
+        import redis
+    except ImportError:
+        return False
+    try:
+        client = redis.Redis.from_url(
+            os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+        client.publish(channel, orjson.dumps(payload))
+        return True
+    except Exception:
+        return False
+
+
+def publish_dataset_changed(dataset_id: int, action: str, name: str = None) -> bool:
+    """
+    Tell running MCP servers a dataset was activated, deactivated or deleted
+
+    Call after the change is committed. Servers drop the dataset's cached
+    connection, schema and query results when the event arrives.
+
+    Args:
+        dataset_id: Dataset that changed
+        action: 'activated', 'deactivated' or 'deleted'
+        name: Dataset name, for the servers' logs
+    """
+    return publish_event(DATASET_CHANGED_CHANNEL, {
+        'dataset_id': dataset_id,
+        'name': name,
+        'action': action
+    })
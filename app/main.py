@@ -3,15 +3,21 @@ MCP Analytics Server - Phase 2 Main Application
 Multi-dataset support with LLM-powered metadata
 """
 import os
+import orjson
 from typing import List, Optional
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.database import get_db, init_database, test_connection
+from app.database import get_db, init_database, invalidate_dataset_connection_string, test_connection
+from app.events import publish_dataset_changed
+from app.pool import configure_threadpool
+from app.responses import json_bytes_response
 from app.models import Dataset, DatasetSchema, Metadata, QueryLog
 from app.encryption import get_encryption_manager, generate_encryption_key
 from app.workers.tasks import process_new_dataset
@@ -20,7 +26,8 @@ from app.workers.tasks import process_new_dataset
 app = FastAPI(
     title="MCP Analytics Server",
     description="Multi-dataset analytics platform with AI-powered metadata",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Import UI routes
@@ -36,10 +43,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (query result tables, schema markdown, UI pages)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     """Initialize database tables on startup"""
+    configure_threadpool()
     init_database()
     print("✅ Database initialized")
 
@@ -86,20 +97,23 @@ class MetadataResponse(BaseModel):
         from_attributes = True
 
 
+_HEALTH_JSON = orjson.dumps({
+    "status": "healthy",
+    "version": "2.0.0",
+    "phase": "Phase 2 - Multi-dataset + LLM Metadata"
+})
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "version": "2.0.0",
-        "phase": "Phase 2 - Multi-dataset + LLM Metadata"
-    }
+    return json_bytes_response(_HEALTH_JSON)
 
 
 # Dataset management endpoints
 @app.post("/api/datasets", response_model=DatasetResponse)
-async def create_dataset(
+def create_dataset(
     dataset: DatasetCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
@@ -144,7 +158,7 @@ async def create_dataset(
 
 
 @app.get("/api/datasets", response_model=List[DatasetResponse])
-async def list_datasets(
+def list_datasets(
     active_only: bool = True,
     db: Session = Depends(get_db)
 ):
@@ -158,7 +172,7 @@ async def list_datasets(
 
 
 @app.get("/api/datasets/{dataset_id}", response_model=DatasetResponse)
-async def get_dataset(dataset_id: int, db: Session = Depends(get_db)):
+def get_dataset(dataset_id: int, db: Session = Depends(get_db)):
     """Get a specific dataset by ID"""
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
     if not dataset:
@@ -167,7 +181,7 @@ async def get_dataset(dataset_id: int, db: Session = Depends(get_db)):
 
 
 @app.delete("/api/datasets/{dataset_id}")
-async def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
+def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
     """Delete a dataset (soft delete by marking inactive)"""
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
     if not dataset:
@@ -175,13 +189,15 @@ async def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
     
     dataset.is_active = False
     db.commit()
+    invalidate_dataset_connection_string(dataset_id)
+    publish_dataset_changed(dataset_id, 'deactivated', dataset.name)
     
     return {"message": "Dataset deactivated successfully"}
 
 
 # Schema endpoints
 @app.get("/api/datasets/{dataset_id}/schema", response_model=List[SchemaResponse])
-async def get_dataset_schema(dataset_id: int, db: Session = Depends(get_db)):
+def get_dataset_schema(dataset_id: int, db: Session = Depends(get_db)):
     """Get schema information for a dataset"""
     # Check if dataset exists
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
@@ -198,7 +214,7 @@ async def get_dataset_schema(dataset_id: int, db: Session = Depends(get_db)):
 
 # Metadata endpoints
 @app.get("/api/datasets/{dataset_id}/metadata", response_model=List[MetadataResponse])
-async def get_dataset_metadata(
+def get_dataset_metadata(
     dataset_id: int,
     table_name: Optional[str] = None,
     db: Session = Depends(get_db)
@@ -222,7 +238,7 @@ async def get_dataset_metadata(
 
 # Processing status endpoint
 @app.get("/api/datasets/{dataset_id}/status")
-async def get_dataset_status(dataset_id: int, db: Session = Depends(get_db)):
+def get_dataset_status(dataset_id: int, db: Session = Depends(get_db)):
     """Get processing status for a dataset"""
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
     if not dataset:
@@ -242,7 +258,7 @@ async def get_dataset_status(dataset_id: int, db: Session = Depends(get_db)):
         DatasetSchema.dataset_id == dataset_id
     ).distinct().all()
     
-    return {
+    return ORJSONResponse({
         "dataset_id": dataset_id,
         "dataset_name": dataset.name,
         "is_active": dataset.is_active,
@@ -250,12 +266,12 @@ async def get_dataset_status(dataset_id: int, db: Session = Depends(get_db)):
         "columns_profiled": schema_count,
         "metadata_generated": metadata_count,
         "processing_complete": schema_count > 0 and metadata_count > 0
-    }
+    })
 
 
 # Trigger manual reprocessing
 @app.post("/api/datasets/{dataset_id}/reprocess")
-async def reprocess_dataset(
+def reprocess_dataset(
     dataset_id: int,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
@@ -13,13 +13,18 @@ from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 from starlette.background import BackgroundTask
 import asyncio
-import json
+import orjson
 
 # Import the MCP server instance from server.py
 from server import mcp
 
 router = APIRouter()
 
+# SSE frames, encoded once
+SSE_INITIALIZE_EVENT = b"data: " + orjson.dumps({'jsonrpc': '2.0', 'method': 'initialize', 'params': {}}) + b"\n\n"
+SSE_KEEPALIVE = b": keepalive\n\n"
+SSE_KEEPALIVE_SECONDS = 30
+
 @router.api_route("/mcp", methods=["GET", "POST"])
 async def mcp_endpoint(request: Request):
     """
@@ -32,17 +37,13 @@ async def mcp_endpoint(request: Request):
     if request.headers.get("accept") == "text/event-stream":
         async def event_stream():
             """Stream SSE events for MCP protocol"""
-            try:
-                # Initialize MCP session
-                yield f"data: {json.dumps({'jsonrpc': '2.0', 'method': 'initialize', 'params': {}})}\n\n"
-                
-                # Keep connection alive
-                while True:
-                    await asyncio.sleep(30)
-                    yield f": keepalive\n\n"
-                    
-            except asyncio.CancelledError:
-                pass
+            # Initialize MCP session
+            yield SSE_INITIALIZE_EVENT
+
+            # Keep connection alive until the client goes away
+            while not await request.is_disconnected():
+                await asyncio.sleep(SSE_KEEPALIVE_SECONDS)
+                yield SSE_KEEPALIVE
         
         return StreamingResponse(
             event_stream(),
@@ -55,7 +56,7 @@ async def mcp_endpoint(request: Request):
         )
     
     # Handle regular JSON-RPC requests
-    body = await request.json()
+    body = orjson.loads(await request.body())
     
     # Process MCP request
     # This is a simplified version - full implementation would use FastMCP's internal handlers
@@ -2,44 +2,31 @@
 Enhanced MCP Server with multi-dataset support
 Dynamically registers tools for each active dataset
 """
-import json
+import os
+import time
+import orjson
 from typing import Dict, Any
-import psycopg2
-import sqlparse
+from uuid import uuid4
 from fastmcp import FastMCP
 
-from app.database import get_db_context, get_dataset_connection
-from app.models import Dataset, DatasetSchema, Metadata, QueryLog
-from app.encryption import get_encryption_manager
+from app.database import (
+    get_db_context, get_active_dataset_connection, build_sample_query
+)
+from app.pool import pooled_connection
+from app.query_validation import validate_query, needs_limit
+from app.models import Dataset, DatasetSchema, Metadata
+from app.services.query_logger import query_logger
 
 # Security configuration
 MAX_ROWS = 1000
-ALLOWED_STATEMENTS = ['SELECT']
+
+# Tool results are compact JSON; set MCP_PRETTY to indent them when debugging
+JSON_OPTIONS = orjson.OPT_INDENT_2 if os.getenv("MCP_PRETTY") else 0
 
 # Initialize FastMCP server
 mcp = FastMCP(name="analytics-server-multi")
 
 
-def validate_query(query: str) -> tuple[bool, str]:
-    """Validate that the query is safe to execute"""
-    parsed = sqlparse.parse(query)
-    if not parsed:
-        return False, "Empty or invalid query"
-    
-    for statement in parsed:
-        stmt_type = statement.get_type()
-        if stmt_type not in ALLOWED_STATEMENTS:
-            return False, f"Only SELECT statements allowed. Got: {stmt_type}"
-        
-        dangerous = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE']
-        query_upper = query.upper()
-        for keyword in dangerous:
-            if keyword in query_upper:
-                return False, f"Dangerous keyword: {keyword}"
-    
-    return True, ""
-
-
 def execute_query_on_dataset(dataset_id: int, query: str, limit: int = None) -> Dict[str, Any]:
     """Execute a SQL query on a specific dataset"""
     is_valid, error_msg = validate_query(query)
@@ -51,67 +38,54 @@ def execute_query_on_dataset(dataset_id: int, query: str, limit: int = None) ->
     else:
         limit = min(limit, MAX_ROWS)
     
-    query_upper = query.upper().strip()
-    if query_upper.startswith('SELECT') and 'LIMIT' not in query_upper:
+    # A LIMIT inside a subquery or literal doesn't count
+    if needs_limit(query):
         query = f"{query.rstrip().rstrip(';')} LIMIT {limit}"
     
-    with get_db_context() as db:
-        # Get dataset
-        dataset = db.query(Dataset).filter(
-            Dataset.id == dataset_id,
-            Dataset.is_active == True
-        ).first()
-        
-        if not dataset:
-            return {'success': False, 'error': 'Dataset not found or inactive'}
-        
-        # Decrypt connection string
-        encryption_manager = get_encryption_manager()
-        connection_string = encryption_manager.decrypt(dataset.connection_string_encrypted)
-        
-        # Execute query
-        try:
-            start_time = __import__('time').time()
-            conn = get_dataset_connection(connection_string)
-            cur = conn.cursor()
+    # Same cached lookup and batched query log as the main server
+    dataset_info = get_active_dataset_connection(dataset_id)
+    if dataset_info is None:
+        return {'success': False, 'error': 'Dataset not found or inactive'}
+    connection_string = dataset_info[1]
+
+    # Execute query
+    try:
+        start_ns = time.perf_counter_ns()
+        with pooled_connection(connection_string) as conn:
+            # Server-side cursor: only `limit` rows ever leave the database, even if
+            # the query carries its own (larger) LIMIT
+            cur = conn.cursor(name=f"q_{uuid4().hex}")
             cur.execute(query)
-            rows = cur.fetchall()
+            # Rows stay as tuples aligned with `columns` (no repeated keys on the wire)
+            results = cur.fetchmany(limit)
             columns = [desc[0] for desc in cur.description] if cur.description else []
-            results = [dict(zip(columns, row)) for row in rows]
-            execution_time = int((__import__('time').time() - start_time) * 1000)
             cur.close()
-            conn.close()
-            
-            # Log query
-            query_log = QueryLog(
-                dataset_id=dataset_id,
-                query=query,
-                execution_time_ms=execution_time,
-                row_count=len(results),
-                success=True
-            )
-            db.add(query_log)
-            db.commit()
-            
-            return {
-                'success': True,
-                'rows': results,
-                'columns': columns,
-                'row_count': len(results),
-                'execution_time_ms': execution_time
-            }
-        except Exception as e:
-            # Log failed query
-            query_log = QueryLog(
-                dataset_id=dataset_id,
-                query=query,
-                success=False,
-                error_message=str(e)
-            )
-            db.add(query_log)
-            db.commit()
-            
-            return {'success': False, 'error': str(e)}
+        execution_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+
+        query_logger.queue_query(
+            query_text=query,
+            dataset_id=dataset_id,
+            execution_time_ms=execution_time,
+            row_count=len(results),
+            success=True
+        )
+
+        return {
+            'success': True,
+            'rows': results,
+            'columns': columns,
+            'row_count': len(results),
+            'execution_time_ms': execution_time
+        }
+    except Exception as e:
+        query_logger.queue_query(
+            query_text=query,
+            dataset_id=dataset_id,
+            success=False,
+            error_message=str(e)
+        )
+
+        return {'success': False, 'error': str(e)}
 
 
 def get_dataset_context(dataset_id: int) -> str:
@@ -217,12 +191,12 @@ async def query_dataset(dataset_id: int, query: str) -> str:
     result = execute_query_on_dataset(dataset_id, query)
     
     if result['success']:
-        return json.dumps({
+        return orjson.dumps({
             'row_count': result['row_count'],
             'execution_time_ms': result['execution_time_ms'],
             'columns': result['columns'],
             'data': result['rows']
-        }, indent=2, default=str)
+        }, default=str, option=JSON_OPTIONS).decode()
     else:
         return f"Error: {result['error']}"
 
@@ -240,16 +214,16 @@ async def get_dataset_sample(dataset_id: int, table_name: str, limit: int = 10)
         JSON string with sample data
     """
     limit = min(limit, 100)
-    query = f"SELECT * FROM {table_name} LIMIT {limit}"
+    query = build_sample_query(table_name, limit)
     result = execute_query_on_dataset(dataset_id, query)
     
     if result['success']:
-        return json.dumps({
+        return orjson.dumps({
             'table': table_name,
             'sample_size': result['row_count'],
             'columns': result['columns'],
             'data': result['rows']
-        }, indent=2, default=str)
+        }, default=str, option=JSON_OPTIONS).decode()
     else:
         return f"Error: {result['error']}"
 
@@ -0,0 +1,117 @@
+"""
+Dataset.metadata_text markdown, built from per-table sections cached in Dataset.metadata_text_parts
+"""
+import io
+from typing import Dict, Iterable, Optional
+from sqlalchemy.orm import Session
+from app.events import publish_event
+from app.models import Dataset, DatasetSchema
+
+# Tables from the metadata database that never belong in a dataset summary
+METADATA_TABLES = ['datasets', 'dataset_schemas', 'metadata', 'query_logs']
+
+# Shown for columns nobody has described yet
+DESCRIPTION_PLACEHOLDER = "Add description here"
+
+# Redis pub/sub channel the MCP servers listen on to drop cached schemas
+SCHEMA_CHANGED_CHANNEL = 'channel:dataset:schema_changed'
+
+
+def render_table_markdown(table_name: str, columns: list, descriptions: Optional[Dict[str, str]] = None) -> str:
+    """Markdown section for one table's DatasetSchema rows, with optional column descriptions"""
+    descriptions = descriptions or {}
+    buf = io.StringIO()
+    buf.write(f"\n## Table: `{table_name}`\n")
+    buf.write(f"**{len(columns)} columns**\n")
+    buf.write("\n| Column | Type | Nullable | Description |")
+    buf.write("\n|--------|------|----------|-------------|")
+
+    for col in columns:
+        nullable = "Yes" if col.is_nullable else "No"
+        description = descriptions.get(col.column_name, DESCRIPTION_PLACEHOLDER)
+        buf.write(f"\n| `{col.column_name}` | {col.data_type} | {nullable} | {description} |")
+
+    buf.write("\n")
+    return buf.getvalue()
+
+
+def assemble_metadata_text(dataset: Dataset, parts: Dict[str, str]) -> str:
+    """Full metadata_text document: the dataset header followed by every table section, sorted by table"""
+    buf = io.StringIO()
+    buf.write(f"# {dataset.name}\n")
+    buf.write(f"{dataset.description or 'No description provided'}\n")
+    buf.write("---\n")
+    for name in sorted(parts):
+        buf.write(parts[name])
+    return buf.getvalue()
+
+
+def rebuild_metadata_text(
+    db: Session,
+    dataset: Dataset,
+    table_names: Optional[Iterable[str]] = None,
+    descriptions: Optional[Dict[str, Dict[str, str]]] = None
+) -> Dict[str, list]:
+    """
+    Re-render the sections of the given tables and reassemble dataset.metadata_text
+
+    Without table_names (or before any sections are cached) every table is
+    rendered. A named table that no longer has schema rows loses its section.
+    The dataset is updated in place; the caller commits.
+
+    Args:
+        db: Metadata database session
+        dataset: Dataset to update
+        table_names: Tables whose sections changed (all tables if None)
+        descriptions: Column descriptions by table name, then column name
+
+    Returns:
+        DatasetSchema rows by table for the tables that were rendered. Empty
+        (and the dataset left untouched) if a full rebuild finds no user tables.
+    """
+    descriptions = descriptions or {}
+    parts = dict(dataset.metadata_text_parts or {})
+    if not parts:
+        table_names = None
+    elif table_names is not None:
+        table_names = set(table_names)
+
+    # Get schemas (some tables, or all) grouped by table
+    query = db.query(DatasetSchema).filter(DatasetSchema.dataset_id == dataset.id)
+    if table_names is not None:
+        query = query.filter(DatasetSchema.table_name.in_(table_names))
+    schemas = query.order_by(DatasetSchema.table_name, DatasetSchema.column_name).all()
+
+    tables = {}
+    for schema in schemas:
+        if schema.table_name not in METADATA_TABLES:
+            tables.setdefault(schema.table_name, []).append(schema)
+
+    if table_names is None:
+        if not tables:
+            return {}
+        parts = {}
+    else:
+        # Table dropped (or filtered out): remove its section
+        for name in table_names - tables.keys():
+            parts.pop(name, None)
+
+    for name, columns in tables.items():
+        parts[name] = render_table_markdown(name, columns, descriptions.get(name))
+
+    dataset.metadata_text_parts = parts
+    dataset.metadata_text = assemble_metadata_text(dataset, parts)
+    return tables
+
+
+def publish_schema_changed(dataset_id: int, table_names: Iterable[str] = ()) -> bool:
+    """
+    Tell running MCP servers that a dataset's metadata_text changed (best-effort)
+
+    Returns:
+        True if the event was published, False if Redis is missing or down
+    """
+    return publish_event(SCHEMA_CHANGED_CHANNEL, {
+        'dataset_id': dataset_id,
+        'table_names': sorted(table_names)
+    })
@@ -3,7 +3,8 @@ Database models for MCP Analytics Server Phase 2
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -19,6 +20,7 @@ class Dataset(Base):
     description = Column(Text, nullable=True)
     connection_string_encrypted = Column(Text, nullable=False)
     metadata_text = Column(Text, nullable=True)  # Full schema metadata as markdown/text
+    metadata_text_parts = Column(JSONB, nullable=True)  # Per-table markdown sections of metadata_text
     date_range = Column(String(100), nullable=True)  # e.g., "Jan 2018 - Dec 2025"
     date_column = Column(String(100), nullable=True)  # Primary date column name
     is_active = Column(Boolean, default=True, nullable=False)
@@ -47,6 +49,7 @@ class DatasetSchema(Base):
     
     # Composite index for fast lookups
     __table_args__ = (
+        Index('ix_dataset_schemas_dataset_id_table_name', 'dataset_id', 'table_name'),
         {'extend_existing': True}
     )
 
@@ -67,6 +70,15 @@ class Metadata(Base):
     dataset = relationship("Dataset", back_populates="metadata_entries")
 
 
+class ColumnDescriptionCache(Base):
+    """LLM column descriptions shared across datasets, keyed by sha256(column_name|data_type)"""
+    __tablename__ = "llm_column_descriptions"
+
+    sha = Column(String(64), primary_key=True)
+    description = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class QueryLog(Base):
     """Query execution logs for tracking usage"""
     __tablename__ = "query_logs"
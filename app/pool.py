@@ -0,0 +1,74 @@
+"""
+psycopg2 connection pools for the scripts and MCP tools that talk to dataset databases,
+plus the worker thread pool size for the FastAPI servers
+"""
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+import anyio
+from psycopg2.pool import ThreadedConnectionPool
+
+
+# Connections per DSN; borrowers past this wait for one to be returned
+POOL_MAXCONN = 16
+
+# Every pool handed out by get_pool, so they can all be closed on shutdown
+_pools = []
+
+# Worker threads for sync dependencies/routes (anyio's default is 40)
+THREADPOOL_TOKENS = int(os.getenv("THREADPOOL_TOKENS", 100))
+
+
+def configure_threadpool():
+    """
+    Size anyio's worker thread pool (call from server startup, on the running loop)
+
+    Sync dependencies such as get_db and sync routes run on these threads. The
+    tools' blocking steps use asyncio.to_thread and stay on the default executor.
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_TOKENS
+
+
+@lru_cache(maxsize=None)
+def get_pool(dsn: str) -> ThreadedConnectionPool:
+    """Get the shared connection pool for a DSN (one pool per database, never shared across DSNs)"""
+    pool = ThreadedConnectionPool(minconn=2, maxconn=POOL_MAXCONN, dsn=dsn)
+    _pools.append(pool)
+    return pool
+
+
+@lru_cache(maxsize=None)
+def _pool_slots(dsn: str) -> threading.BoundedSemaphore:
+    """Free connections in the DSN's pool (getconn raises PoolError instead of waiting once it's empty)"""
+    return threading.BoundedSemaphore(POOL_MAXCONN)
+
+
+def close_all_pools():
+    """Close every pooled connection (for server shutdown)"""
+    get_pool.cache_clear()
+    _pool_slots.cache_clear()
+    while _pools:
+        _pools.pop().closeall()
+
+
+@contextmanager
+def pooled_connection(dsn: str):
+    """
+    Borrow a connection from the DSN's pool, returning it (rolled back if mid-transaction) on exit
+
+    Blocks while all POOL_MAXCONN connections are out, so a burst of parallel
+    tool calls on one dataset queues here rather than failing. Connections that
+    died (e.g. the database restarted) are closed instead of being pooled again.
+    """
+    with _pool_slots(dsn):
+        pool = get_pool(dsn)
+        conn = pool.getconn()
+        if conn.closed:
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            # psycopg2 marks the connection closed once a query hits a dropped socket
+            pool.putconn(conn, close=bool(conn.closed))
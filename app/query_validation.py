@@ -0,0 +1,58 @@
+"""
+SQL checks shared by the MCP servers: read-only validation and LIMIT detection
+"""
+import re
+from functools import lru_cache
+import sqlparse
+from sqlparse.tokens import Keyword
+
+# Security configuration
+ALLOWED_STATEMENTS = ['SELECT']
+DANGEROUS_KEYWORDS = frozenset({'DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE'})
+
+# Regex prefilters so the common single plain SELECT never reaches sqlparse
+_DANGEROUS_PATTERN = re.compile(r'\b(?:' + '|'.join(DANGEROUS_KEYWORDS) + r')\b', re.IGNORECASE)
+_LEADING_SELECT_PATTERN = re.compile(r'\s*SELECT\b', re.IGNORECASE)
+_LIMIT_PATTERN = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+
+@lru_cache(maxsize=128)
+def parse_sql(query: str) -> tuple:
+    """sqlparse.parse, cached so a re-issued query string is only parsed once"""
+    return sqlparse.parse(query)
+
+
+def has_outer_limit(statement) -> bool:
+    """Whether a parsed statement has its own top-level LIMIT (subqueries are grouped, so not counted)"""
+    return any(token.ttype is Keyword and token.normalized == 'LIMIT' for token in statement.tokens)
+
+
+def needs_limit(query: str) -> bool:
+    """Whether the query lacks its own top-level LIMIT (only parses if LIMIT appears at all)"""
+    return not _LIMIT_PATTERN.search(query) or not has_outer_limit(parse_sql(query)[0])
+
+
+@lru_cache(maxsize=4096)
+def validate_query(query: str) -> tuple[bool, str]:
+    """Validate that the query is safe to execute (cached on the raw SQL)"""
+    # Fast path: a single SELECT with no dangerous word anywhere is safe without parsing
+    body = query.strip().rstrip(';')
+    if _LEADING_SELECT_PATTERN.match(body) and ';' not in body and not _DANGEROUS_PATTERN.search(body):
+        return True, ""
+
+    # Slow path tells keywords from identifiers/literals (e.g. a 'deleted' status value)
+    parsed = parse_sql(query)
+    if not parsed:
+        return False, "Empty or invalid query"
+
+    for statement in parsed:
+        stmt_type = statement.get_type()
+        if stmt_type not in ALLOWED_STATEMENTS:
+            return False, f"Only SELECT statements allowed. Got: {stmt_type}"
+
+        # Only real DML/DDL keyword tokens count, so identifiers like drop_reason pass
+        for token in statement.flatten():
+            if token.ttype in (Keyword.DML, Keyword.DDL) and token.normalized in DANGEROUS_KEYWORDS:
+                return False, f"Dangerous keyword: {token.normalized}"
+
+    return True, ""
@@ -0,0 +1,122 @@
+"""
+Content-negotiated responses and JSON-RPC helpers for the MCP endpoints
+"""
+import asyncio
+import inspect
+from typing import Awaitable, Callable
+import msgpack
+import orjson
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+
+def wants_msgpack(request: Request) -> bool:
+    """True if the client's Accept header asks for MessagePack"""
+    return MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def negotiated_response(request: Request, payload, status_code: int = 200) -> Response:
+    """
+    Serialize payload as MessagePack if the client accepts it, JSON (orjson) otherwise
+
+    Values msgpack can't pack natively (datetime, Decimal, ...) are sent as strings.
+    """
+    if wants_msgpack(request):
+        return Response(
+            content=msgpack.packb(payload, use_bin_type=True, default=str),
+            media_type=MSGPACK_MEDIA_TYPE,
+            status_code=status_code
+        )
+    return ORJSONResponse(payload, status_code=status_code)
+
+
+def json_bytes_response(content: bytes, status_code: int = 200) -> Response:
+    """
+    Response for an already-serialized JSON body
+
+    For payloads serialized once at import (health probes, the cached
+    initialize/tools/list results): returning a Response makes FastAPI skip
+    its jsonable_encoder pass, and nothing is re-serialized per request.
+    """
+    return Response(content=content, status_code=status_code, media_type="application/json")
+
+
+def jsonrpc_error(code: int, message: str, request_id=None) -> dict:
+    """JSON-RPC 2.0 error response object"""
+    return {
+        "jsonrpc": "2.0",
+        "error": {"code": code, "message": message},
+        "id": request_id
+    }
+
+
+def jsonrpc_tool_result(text, request_id) -> dict:
+    """JSON-RPC 2.0 response object for a tools/call that returned text"""
+    return {
+        "jsonrpc": "2.0",
+        "result": {
+            "content": [
+                {
+                    "type": "text",
+                    "text": text
+                }
+            ]
+        },
+        "id": request_id
+    }
+
+
+def jsonrpc_result_frame(result_json: bytes, request_id) -> bytes:
+    """Wrap a pre-serialized JSON-RPC result with the caller's request id"""
+    return b'{"jsonrpc":"2.0","result":' + result_json + b',"id":' + orjson.dumps(request_id) + b'}'
+
+
+async def call_tool(fn, arguments: dict):
+    """
+    Run a tool on the server's event loop
+
+    The server.py tools push their blocking SQLAlchemy/psycopg2 work onto worker
+    threads themselves, and their dataset queries use asyncpg pools, which only
+    work on the loop that created them (the server's, warmed at startup).
+    """
+    result = fn(**arguments)
+    if inspect.iscoroutine(result):
+        result = await result
+    return result
+
+
+def jsonrpc_response(request: Request, payload, status_code: int) -> Response:
+    """Response for one dispatched request: pre-serialized bytes as-is, dicts content-negotiated"""
+    if isinstance(payload, bytes):
+        return json_bytes_response(payload, status_code=status_code)
+
+    # MessagePack if the client asks for it
+    return negotiated_response(request, payload, status_code=status_code)
+
+
+async def dispatch_batch(entries: list, dispatch_single: Callable[[object], Awaitable[tuple]]) -> Response:
+    """
+    Run a JSON-RPC batch concurrently and answer with one array (notifications get no entry)
+
+    Args:
+        entries: The batch's request objects
+        dispatch_single: The server's handler for one request object, returning
+            (payload, status_code) with payload a dict or pre-serialized bytes
+    """
+    if not entries:
+        return ORJSONResponse(jsonrpc_error(-32600, "Invalid Request: empty batch"), status_code=400)
+
+    results = await asyncio.gather(*[dispatch_single(entry) for entry in entries])
+
+    frames = [
+        payload if isinstance(payload, bytes) else orjson.dumps(payload)
+        for entry, (payload, _) in zip(entries, results)
+        if not isinstance(entry, dict) or "id" in entry
+    ]
+    if not frames:
+        # A batch of only notifications gets no body
+        return Response(status_code=204)
+
+    return json_bytes_response(b"[" + b",".join(frames) + b"]")
@@ -12,6 +12,7 @@ Features:
 import asyncio
 import time
 from typing import List, Dict, Any, Optional
+from uuid import uuid4
 from sqlalchemy.orm import Session
 
 try:
@@ -21,11 +22,16 @@ except ImportError:
     ASYNCPG_AVAILABLE = False
     print("⚠️  asyncpg not installed - falling back to sync execution")
 
-from app.database import get_db
+from app.database import get_db, get_active_dataset_connection
 from app.models import Dataset
 from app.encryption import get_encryption_manager
+from app.pool import pooled_connection
+from app.query_validation import validate_query
 from app.services.weighting_service import weighting_service
 
+# Rows per round-trip when the sync fallback streams a result from a server-side cursor
+SYNC_FETCH_BATCH_SIZE = 200
+
 
 class ParallelQueryExecutor:
     """
@@ -40,6 +46,7 @@ class ParallelQueryExecutor:
     def __init__(self):
         """Initialize executor with connection pool cache"""
         self.connection_pools = {}  # dataset_id -> asyncpg.Pool
+        self.pool_locks = {}  # dataset_id -> asyncio.Lock held while its pool is created or closed
         self.encryptor = get_encryption_manager()
         self.max_concurrent = 10  # Max queries executing simultaneously
         self.max_queries_per_request = 30  # As per requirements
@@ -58,7 +65,15 @@ class ParallelQueryExecutor:
         if not ASYNCPG_AVAILABLE:
             return None
 
-        if dataset_id not in self.connection_pools:
+        pool = self.connection_pools.get(dataset_id)
+        if pool is not None:
+            return pool
+
+        # Concurrent first queries wait for one pool instead of each creating
+        # their own (and leaking all but the last one stored)
+        async with self.pool_locks.setdefault(dataset_id, asyncio.Lock()):
+            if dataset_id in self.connection_pools:
+                return self.connection_pools[dataset_id]
             try:
                 # Create connection pool
                 pool = await asyncpg.create_pool(
@@ -67,7 +82,9 @@ class ParallelQueryExecutor:
                     max_size=10,         # Max 10 concurrent queries per dataset
                     max_inactive_connection_lifetime=300,  # 5 min idle timeout
                     command_timeout=60,  # 60 sec query timeout
-                    timeout=30           # 30 sec connection timeout
+                    timeout=30,          # 30 sec connection timeout
+                    # JIT makes asyncpg's first-use pg_type introspection very slow on PG16
+                    server_settings={'jit': 'off'}
                 )
                 self.connection_pools[dataset_id] = pool
                 print(f"✅ Created connection pool for dataset {dataset_id}")
@@ -77,6 +94,79 @@ class ParallelQueryExecutor:
 
         return self.connection_pools.get(dataset_id)
 
+    async def close_pool(self, dataset_id: Optional[int] = None):
+        """
+        Close and forget a dataset's pool (every pool if dataset_id is None)
+
+        The next query reconnects, picking up a changed connection string.
+        """
+        if dataset_id is None:
+            pools = list(self.connection_pools.values())
+            self.connection_pools.clear()
+        else:
+            # Wait out a pool being created, so it can't be stored after this returns
+            async with self.pool_locks.setdefault(dataset_id, asyncio.Lock()):
+                pool = self.connection_pools.pop(dataset_id, None)
+            pools = [pool] if pool else []
+
+        for pool in pools:
+            try:
+                await pool.close()
+            except Exception as e:
+                print(f"⚠️  Failed to close pool: {e}")
+
+    async def warm_pools(self) -> int:
+        """
+        Create a pool for every active dataset and run one query on it
+
+        Called at startup so connection setup and asyncpg's type-codec
+        introspection happen before the first client request.
+
+        Returns:
+            Number of pools warmed
+        """
+        if not ASYNCPG_AVAILABLE:
+            return 0
+
+        db = next(get_db())
+        try:
+            dataset_ids = [
+                dataset_id for (dataset_id,) in
+                db.query(Dataset.id).filter(Dataset.is_active == True).all()
+            ]
+        finally:
+            db.close()
+
+        # Datasets usually live on different servers, so connect to them all at once
+        warmed = await asyncio.gather(*(self.warm_pool(dataset_id) for dataset_id in dataset_ids))
+        return sum(warmed)
+
+    async def warm_pool(self, dataset_id: int) -> bool:
+        """
+        Create one dataset's pool and run one query on it (e.g. right after activation)
+
+        Returns:
+            True if the pool is ready
+        """
+        if not ASYNCPG_AVAILABLE:
+            return False
+
+        try:
+            dataset_info = await asyncio.to_thread(self._get_dataset_info, dataset_id)
+            if dataset_info is None:
+                return False
+
+            pool = await self.get_or_create_pool(dataset_id, dataset_info[1])
+            if pool is None:
+                return False
+
+            async with pool.acquire() as conn:
+                await conn.execute('SELECT 1')
+            return True
+        except Exception as e:
+            print(f"⚠️  Failed to warm pool for dataset {dataset_id}: {e}")
+            return False
+
     async def execute_parallel(
         self,
         queries: List[Dict[str, Any]],
@@ -107,7 +197,7 @@ class ParallelQueryExecutor:
                 "total_execution_time_ms": 487
             }
         """
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         # Validate
         if len(queries) == 0:
@@ -137,10 +227,10 @@ class ParallelQueryExecutor:
         if ASYNCPG_AVAILABLE:
             results = await self._execute_async(queries, apply_weights, apply_nccs_merging)
         else:
-            results = self._execute_sync(queries, apply_weights, apply_nccs_merging)
+            results = await asyncio.to_thread(self._execute_sync, queries, apply_weights, apply_nccs_merging)
 
         # Calculate statistics
-        total_execution_time_ms = int((time.time() - start_time) * 1000)
+        total_execution_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
         successful = sum(1 for r in results if r.get('success', False))
         failed = len(results) - successful
 
@@ -162,13 +252,20 @@ class ParallelQueryExecutor:
         """Execute queries using async connection pools"""
         semaphore = asyncio.Semaphore(self.max_concurrent)
 
+        # One metadata lookup per distinct dataset, shared by all of its queries
+        dataset_lookups = {
+            dataset_id: asyncio.ensure_future(asyncio.to_thread(self._get_dataset_info, dataset_id))
+            for dataset_id in {q['dataset_id'] for q in queries}
+        }
+
         async def execute_single(query_def: Dict[str, Any], index: int) -> Dict[str, Any]:
             async with semaphore:
                 return await self._execute_query_async(
                     query_def,
                     index,
                     apply_weights,
-                    apply_nccs_merging
+                    apply_nccs_merging,
+                    dataset_lookups[query_def['dataset_id']]
                 )
 
         # Execute all queries concurrently
@@ -195,45 +292,51 @@ class ParallelQueryExecutor:
         query_def: Dict[str, Any],
         index: int,
         apply_weights: bool,
-        apply_nccs_merging: bool
+        apply_nccs_merging: bool,
+        dataset_lookup: asyncio.Future
     ) -> Dict[str, Any]:
-        """Execute a single query using asyncpg"""
-        start_time = time.time()
+        """Execute a single query using asyncpg (dataset_lookup resolves to _get_dataset_info's result)"""
+        start_ns = time.perf_counter_ns()
         dataset_id = query_def['dataset_id']
         query = query_def['query']
         label = query_def.get('label', f'Query {index+1}')
 
-        # Get dataset info
-        db = next(get_db())
+        # Same read-only check as query_dataset
+        is_valid, error_msg = validate_query(query)
+        if not is_valid:
+            return {
+                "success": False,
+                "error": error_msg,
+                "query_index": index,
+                "label": label,
+                "query": query
+            }
+
         try:
-            dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-            if not dataset or not dataset.is_active:
+            # Get dataset info
+            dataset_info = await dataset_lookup
+            if dataset_info is None:
                 return {
                     "success": False,
                     "error": "Dataset not found or inactive",
                     "query_index": index,
                     "label": label
                 }
-
-            # Get connection string
-            connection_string = self.encryptor.decrypt(dataset.connection_string_encrypted)
-
-            # Fix postgres:// to postgresql://
-            if connection_string.startswith('postgres://'):
-                connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
+            dataset_name, connection_string = dataset_info
 
             # Get or create pool
             pool = await self.get_or_create_pool(dataset_id, connection_string)
 
             if pool is None:
                 # Fallback to sync execution
-                return self._execute_query_sync(query_def, index, apply_weights, apply_nccs_merging)
+                return await asyncio.to_thread(
+                    self._execute_query_sync, query_def, index, apply_weights, apply_nccs_merging
+                )
 
             # Execute query
             async with pool.acquire() as conn:
-                rows = await conn.fetch(query)
-                columns = [col for col in rows[0].keys()] if rows else []
-                results = [dict(row) for row in rows]
+                results = await conn.fetch(query)
+                columns = list(results[0].keys()) if results else []
 
             # Detect weight and NCCS columns
             weight_column = weighting_service.detect_weight_column(columns) if apply_weights else None
@@ -241,13 +344,13 @@ class ParallelQueryExecutor:
 
             # Apply NCCS merging
             if nccs_column and results:
-                results = weighting_service.apply_nccs_merging(results, nccs_column)
+                results = weighting_service.apply_nccs_merging(results, columns, nccs_column)
 
             # Detect query type
             is_aggregated = weighting_service.is_aggregated_query(query)
             should_limit, is_raw = weighting_service.should_apply_5_row_limit(query, len(results))
 
-            execution_time_ms = int((time.time() - start_time) * 1000)
+            execution_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
 
             return {
                 "success": True,
@@ -260,14 +363,14 @@ class ParallelQueryExecutor:
                 "is_aggregated": is_aggregated,
                 "row_limit_applied": should_limit and len(results) >= 5,
                 "dataset_id": dataset_id,
-                "dataset_name": dataset.name,
+                "dataset_name": dataset_name,
                 "query_index": index,
                 "label": label,
                 "query": query
             }
 
         except Exception as e:
-            execution_time_ms = int((time.time() - start_time) * 1000)
+            execution_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             return {
                 "success": False,
                 "error": str(e),
@@ -276,8 +379,10 @@ class ParallelQueryExecutor:
                 "label": label,
                 "query": query
             }
-        finally:
-            db.close()
+
+    def _get_dataset_info(self, dataset_id: int) -> Optional[tuple]:
+        """(name, decrypted postgresql:// connection string) of an active dataset, else None"""
+        return get_active_dataset_connection(dataset_id)
 
     def _execute_sync(
         self,
@@ -300,54 +405,56 @@ class ParallelQueryExecutor:
         apply_nccs_merging: bool
     ) -> Dict[str, Any]:
         """Execute single query synchronously using psycopg2"""
-        import psycopg2
-        import sqlparse
 
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         dataset_id = query_def['dataset_id']
         query = query_def['query']
         label = query_def.get('label', f'Query {index+1}')
 
-        # Get dataset info
-        db = next(get_db())
+        # Same read-only check as query_dataset
+        is_valid, error_msg = validate_query(query)
+        if not is_valid:
+            return {
+                "success": False,
+                "error": error_msg,
+                "query_index": index,
+                "label": label,
+                "query": query
+            }
+
         try:
-            dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-            if not dataset or not dataset.is_active:
+            # Get dataset info
+            dataset_info = self._get_dataset_info(dataset_id)
+            if dataset_info is None:
                 return {
                     "success": False,
                     "error": "Dataset not found or inactive",
                     "query_index": index,
                     "label": label
                 }
-
-            # Get connection string
-            connection_string = self.encryptor.decrypt(dataset.connection_string_encrypted)
-
-            # Fix postgres:// to postgresql://
-            if connection_string.startswith('postgres://'):
-                connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
-
-            # Execute query
-            conn = psycopg2.connect(connection_string)
-            cur = conn.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            columns = [desc[0] for desc in cur.description] if cur.description else []
-            results = [dict(zip(columns, row)) for row in rows]
-            cur.close()
-            conn.close()
+            dataset_name, connection_string = dataset_info
+
+            # Execute query on a pooled connection. Server-side cursor: rows arrive
+            # SYNC_FETCH_BATCH_SIZE at a time instead of buffering the whole result
+            with pooled_connection(connection_string) as conn:
+                cur = conn.cursor(name=f"q_{uuid4().hex}")
+                cur.itersize = SYNC_FETCH_BATCH_SIZE
+                cur.execute(query)
+                results = list(cur)
+                columns = [desc[0] for desc in cur.description] if cur.description else []
+                cur.close()
 
             # Apply transformations
             weight_column = weighting_service.detect_weight_column(columns) if apply_weights else None
             nccs_column = weighting_service.detect_nccs_column(columns) if apply_nccs_merging else None
 
             if nccs_column and results:
-                results = weighting_service.apply_nccs_merging(results, nccs_column)
+                results = weighting_service.apply_nccs_merging(results, columns, nccs_column)
 
             is_aggregated = weighting_service.is_aggregated_query(query)
             should_limit, is_raw = weighting_service.should_apply_5_row_limit(query, len(results))
 
-            execution_time_ms = int((time.time() - start_time) * 1000)
+            execution_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
 
             return {
                 "success": True,
@@ -360,14 +467,14 @@ class ParallelQueryExecutor:
                 "is_aggregated": is_aggregated,
                 "row_limit_applied": should_limit and len(results) >= 5,
                 "dataset_id": dataset_id,
-                "dataset_name": dataset.name,
+                "dataset_name": dataset_name,
                 "query_index": index,
                 "label": label,
                 "query": query
             }
 
         except Exception as e:
-            execution_time_ms = int((time.time() - start_time) * 1000)
+            execution_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             return {
                 "success": False,
                 "error": str(e),
@@ -376,8 +483,6 @@ class ParallelQueryExecutor:
                 "label": label,
                 "query": query
             }
-        finally:
-            db.close()
 
     async def cleanup(self):
         """Close all connection pools"""
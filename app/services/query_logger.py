@@ -2,11 +2,118 @@
 Query Logger Service
 Logs all MCP queries to database for tracking and analytics
 """
-from typing import Dict, Any, Optional
+import atexit
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
+from app.database import get_db_context
 from app.models import QueryLog
 
+# Batched log writer settings
+LOG_FLUSH_INTERVAL_SECONDS = 0.1  # Longest a queued row waits for a batch to fill
+LOG_BATCH_SIZE = 500
+LOG_QUEUE_MAXSIZE = 10_000  # Rows beyond this are dropped rather than blocking requests
+LOG_CLOSE_TIMEOUT_SECONDS = 5  # Longest shutdown waits for the writer thread's last batch
+
+# Queued by close(): the writer thread writes its batch and exits when it sees this
+_STOP = object()
+
+
+class QueryLogWriter:
+    """
+    Writes QueryLog rows from a background thread, one multi-row INSERT per batch
+
+    Thread-safe (a plain queue.Queue), so it works from the FastMCP event loop and
+    from the worker threads the HTTP servers run tools on alike.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, row: Dict[str, Any]):
+        """Queue one QueryLog mapping; never blocks the caller"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            pass  # Logging must never slow down or fail a request
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _drain(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Top batch up with whatever is already queued, up to LOG_BATCH_SIZE
+
+        Returns:
+            (batch, stop) where stop is True if close()'s sentinel was reached
+        """
+        while len(batch) < LOG_BATCH_SIZE:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            with get_db_context() as db:
+                db.bulk_insert_mappings(QueryLog, batch)
+                db.commit()
+        except Exception as e:
+            print(f"⚠️  Query log write failed ({len(batch)} rows dropped): {e}")
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            # Let a burst of requests land in the same INSERT
+            time.sleep(LOG_FLUSH_INTERVAL_SECONDS)
+            batch, stop = self._drain([first])
+            self._write(batch)
+            if stop:
+                return
+
+    def flush(self):
+        """Write everything still queued"""
+        while True:
+            batch, _ = self._drain([])
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self):
+        """
+        Stop the writer thread, then write everything still queued (for shutdown)
+
+        The thread is joined first because it may be holding a batch it has
+        already taken off the queue (during its coalescing sleep); draining
+        the queue alone would lose those rows at interpreter exit.
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=LOG_CLOSE_TIMEOUT_SECONDS)
+                thread.join(LOG_CLOSE_TIMEOUT_SECONDS)
+            except queue.Full:
+                pass
+        self.flush()
+
 
 class QueryLoggerService:
     """Service for logging query execution to database"""
@@ -82,24 +189,10 @@ class QueryLoggerService:
         Returns:
             Created QueryLog object
         """
-        log_entry = QueryLog(
-            dataset_id=dataset_id,
-            query=query_text,
-            executed_at=datetime.utcnow(),
-            execution_time_ms=execution_time_ms,
-            row_count=row_count,
-            success=success,
-            error_message=error_message,
-            client_info=client_info or {}
-        )
-
-        # Store tool_used in client_info if not already there
-        if 'tool' not in log_entry.client_info:
-            log_entry.client_info['tool'] = tool_used
-
-        # Store user agent
-        if user_agent and 'user_agent' not in log_entry.client_info:
-            log_entry.client_info['user_agent'] = user_agent
+        log_entry = QueryLog(**QueryLoggerService._query_log_row(
+            query_text, dataset_id, execution_time_ms, row_count,
+            success, error_message, tool_used, user_agent, client_info
+        ))
 
         db.add(log_entry)
         db.commit()
@@ -107,6 +200,61 @@ class QueryLoggerService:
 
         return log_entry
 
+    @staticmethod
+    def queue_query(
+        query_text: str,
+        dataset_id: Optional[int] = None,
+        execution_time_ms: Optional[int] = None,
+        row_count: Optional[int] = None,
+        success: bool = True,
+        error_message: Optional[str] = None,
+        tool_used: str = 'unknown',
+        user_agent: str = '',
+        client_info: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Like log_query, but hands the row to the background batch writer
+        instead of inserting it on the request path (same arguments, minus db)
+        """
+        query_log_writer.enqueue(QueryLoggerService._query_log_row(
+            query_text, dataset_id, execution_time_ms, row_count,
+            success, error_message, tool_used, user_agent, client_info
+        ))
+
+    @staticmethod
+    def _query_log_row(
+        query_text: str,
+        dataset_id: Optional[int],
+        execution_time_ms: Optional[int],
+        row_count: Optional[int],
+        success: bool,
+        error_message: Optional[str],
+        tool_used: str,
+        user_agent: str,
+        client_info: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Column values for one QueryLog row"""
+        client_info = client_info or {}
+
+        # Store tool_used in client_info if not already there
+        if 'tool' not in client_info:
+            client_info['tool'] = tool_used
+
+        # Store user agent
+        if user_agent and 'user_agent' not in client_info:
+            client_info['user_agent'] = user_agent
+
+        return {
+            'dataset_id': dataset_id,
+            'query': query_text,
+            'executed_at': datetime.utcnow(),
+            'execution_time_ms': execution_time_ms,
+            'row_count': row_count,
+            'success': success,
+            'error_message': error_message,
+            'client_info': client_info
+        }
+
     @staticmethod
     def log_mcp_tool_call(
         db: Session,
@@ -130,6 +278,33 @@ class QueryLoggerService:
         Returns:
             Created QueryLog object
         """
+        return QueryLoggerService.log_query(
+            db=db,
+            **QueryLoggerService._tool_call_fields(tool_name, parameters, result, execution_time_ms, tool_used)
+        )
+
+    @staticmethod
+    def queue_mcp_tool_call(
+        tool_name: str,
+        parameters: Dict[str, Any],
+        result: Dict[str, Any],
+        execution_time_ms: int,
+        tool_used: str = 'unknown'
+    ):
+        """Like log_mcp_tool_call, but queued for the background batch writer"""
+        QueryLoggerService.queue_query(
+            **QueryLoggerService._tool_call_fields(tool_name, parameters, result, execution_time_ms, tool_used)
+        )
+
+    @staticmethod
+    def _tool_call_fields(
+        tool_name: str,
+        parameters: Dict[str, Any],
+        result: Dict[str, Any],
+        execution_time_ms: int,
+        tool_used: str
+    ) -> Dict[str, Any]:
+        """log_query arguments describing an MCP tool invocation"""
         # Format query text
         query_text = f"MCP Tool: {tool_name}"
         if parameters:
@@ -147,20 +322,19 @@ class QueryLoggerService:
         success = result.get('success', True) if isinstance(result, dict) else True
         error_message = result.get('error') if isinstance(result, dict) else None
 
-        return QueryLoggerService.log_query(
-            db=db,
-            query_text=query_text,
-            dataset_id=dataset_id,
-            execution_time_ms=execution_time_ms,
-            row_count=row_count,
-            success=success,
-            error_message=error_message,
-            tool_used=tool_used,
-            client_info={
+        return {
+            'query_text': query_text,
+            'dataset_id': dataset_id,
+            'execution_time_ms': execution_time_ms,
+            'row_count': row_count,
+            'success': success,
+            'error_message': error_message,
+            'tool_used': tool_used,
+            'client_info': {
                 'tool_name': tool_name,
                 'parameters': parameters
             }
-        )
+        }
 
     @staticmethod
     def get_query_stats(db: Session, days: int = 7) -> Dict[str, Any]:
@@ -226,5 +400,6 @@ class QueryLoggerService:
         }
 
 
-# Global instance
+# Global instances
+query_log_writer = QueryLogWriter()
 query_logger = QueryLoggerService()
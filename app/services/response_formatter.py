@@ -2,8 +2,8 @@
 Response Formatter Service
 Converts query results from JSON to Markdown for 50% token savings
 """
-from typing import Dict, List, Any, Optional
-import json
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 from datetime import datetime, date
 
 
@@ -185,7 +185,7 @@ class ResponseFormatter:
         table_name: str,
         sample_size: int,
         columns: List[str],
-        data: List[Dict[str, Any]]
+        data: List[Sequence[Any]]
     ) -> str:
         """
         Format sample data as Markdown
@@ -195,7 +195,7 @@ class ResponseFormatter:
             table_name: Table name
             sample_size: Number of rows sampled
             columns: Column names
-            data: Sample data rows
+            data: Sample data rows (tuples aligned with columns)
 
         Returns:
             Markdown formatted sample
@@ -214,12 +214,12 @@ class ResponseFormatter:
         return md
 
     @staticmethod
-    def _format_table(rows: List[Dict[str, Any]], columns: List[str]) -> str:
+    def _format_table(rows: List[Sequence[Any]], columns: List[str]) -> str:
         """
         Format data rows as Markdown table
 
         Args:
-            rows: List of row dicts
+            rows: List of row tuples, aligned with columns
             columns: List of column names
 
         Returns:
@@ -228,20 +228,21 @@ class ResponseFormatter:
         if not rows or not columns:
             return "_No data to display._\n"
 
-        # Table header
-        md = "| " + " | ".join(columns) + " |\n"
-        md += "|" + "|".join(["---"] * len(columns)) + "|\n"
+        # Table header (shared by every result with the same columns)
+        lines = [ResponseFormatter._table_header(tuple(columns))]
 
         # Table rows
+        format_value = ResponseFormatter._format_value
         for row in rows:
-            values = []
-            for col in columns:
-                value = row.get(col)
-                formatted_value = ResponseFormatter._format_value(value)
-                values.append(formatted_value)
-            md += "| " + " | ".join(values) + " |\n"
+            lines.append("| " + " | ".join([format_value(value) for value in row]) + " |\n")
+
+        return "".join(lines) + "\n"
 
-        return md + "\n"
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _table_header(columns: Tuple[str, ...]) -> str:
+        """Markdown header and separator lines for a column tuple"""
+        return "| " + " | ".join(columns) + " |\n" + "|" + "|".join(["---"] * len(columns)) + "|\n"
 
     @staticmethod
     def _format_value(value: Any) -> str:
@@ -411,6 +412,8 @@ class ResponseFormatter:
 - Merge **A + A1 → A**
 - Merge **C + D + E → C/D/E**
 - Apply automatically when NCCS column detected
+- When grouping by NCCS, **merge in SQL** so merged classes aggregate into one row:
+  `GROUP BY CASE UPPER(TRIM(nccs)) WHEN 'A1' THEN 'A' WHEN 'C' THEN 'C/D/E' WHEN 'D' THEN 'C/D/E' WHEN 'E' THEN 'C/D/E' ELSE nccs END`
 
 ## Data Types
 - **Event-level**: Individual user events (large, granular)
@@ -2,9 +2,13 @@
 Weighting Service
 Handles weight column detection, application, and NCCS merging
 """
-from typing import Dict, List, Any, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 import re
 
+# GROUP BY or an aggregate function call, matched case-insensitively in one pass
+AGGREGATE_PATTERN = re.compile(r'GROUP BY|(?:COUNT|SUM|AVG|MIN|MAX|STDDEV|VARIANCE)\(', re.IGNORECASE)
+
 
 class WeightingService:
     """
@@ -36,47 +40,54 @@ class WeightingService:
         'economic_class'
     ]
 
+    # NCCS merging rules: raw class → merged class
+    NCCS_MERGES = {'A1': 'A', 'C': 'C/D/E', 'D': 'C/D/E', 'E': 'C/D/E'}
+
     def __init__(self):
         """Initialize weighting service"""
         pass
 
-    def detect_weight_column(self, columns: List[str]) -> Optional[str]:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _match_column(patterns: Tuple[str, ...], columns: Tuple[str, ...]) -> Optional[str]:
         """
-        Detect weight column from list of column names
-
-        Args:
-            columns: List of column names
+        Return the first column containing a pattern (patterns checked in priority order)
 
-        Returns:
-            Weight column name if found, None otherwise
+        Cached on the (patterns, columns) tuples, so identical column sets
+        (e.g. partitioned tables) are only scanned once.
         """
         columns_lower = [col.lower() for col in columns]
 
-        for pattern in self.WEIGHT_PATTERNS:
+        for pattern in patterns:
             for i, col_lower in enumerate(columns_lower):
                 if pattern in col_lower:
                     return columns[i]  # Return original case
 
         return None
 
-    def detect_nccs_column(self, columns: List[str]) -> Optional[str]:
+    def detect_weight_column(self, columns: Sequence[str]) -> Optional[str]:
         """
-        Detect NCCS (socioeconomic class) column
+        Detect weight column from list of column names
 
         Args:
-            columns: List of column names
+            columns: Column names (pass a tuple to skip the conversion)
 
         Returns:
-            NCCS column name if found, None otherwise
+            Weight column name if found, None otherwise
         """
-        columns_lower = [col.lower() for col in columns]
+        return self._match_column(tuple(self.WEIGHT_PATTERNS), tuple(columns))
 
-        for pattern in self.NCCS_PATTERNS:
-            for i, col_lower in enumerate(columns_lower):
-                if pattern in col_lower:
-                    return columns[i]  # Return original case
+    def detect_nccs_column(self, columns: Sequence[str]) -> Optional[str]:
+        """
+        Detect NCCS (socioeconomic class) column
 
-        return None
+        Args:
+            columns: Column names (pass a tuple to skip the conversion)
+
+        Returns:
+            NCCS column name if found, None otherwise
+        """
+        return self._match_column(tuple(self.NCCS_PATTERNS), tuple(columns))
 
     def is_aggregated_query(self, query: str) -> bool:
         """
@@ -88,19 +99,13 @@ class WeightingService:
         Returns:
             True if aggregated, False if raw data
         """
-        query_upper = query.upper()
+        return self._is_aggregated(query)
 
-        # Check for GROUP BY
-        if 'GROUP BY' in query_upper:
-            return True
-
-        # Check for aggregate functions
-        agg_functions = ['COUNT(', 'SUM(', 'AVG(', 'MIN(', 'MAX(', 'STDDEV(', 'VARIANCE(']
-        for func in agg_functions:
-            if func in query_upper:
-                return True
-
-        return False
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _is_aggregated(query: str) -> bool:
+        """is_aggregated_query, cached on the raw SQL"""
+        return AGGREGATE_PATTERN.search(query) is not None
 
     def should_apply_5_row_limit(self, query: str, row_count: int) -> Tuple[bool, bool]:
         """
@@ -124,9 +129,10 @@ class WeightingService:
 
     def apply_nccs_merging(
         self,
-        rows: List[Dict[str, Any]],
+        rows: List[Sequence[Any]],
+        columns: List[str],
         nccs_column: str
-    ) -> List[Dict[str, Any]]:
+    ) -> List[Sequence[Any]]:
         """
         Apply NCCS merging rules to results
 
@@ -134,32 +140,33 @@ class WeightingService:
         - A + A1 → A
         - C + D + E → C/D/E
 
+        Only relabels rows; merged classes still come back as separate rows
+        unless the query groups by the merged CASE expression itself (see
+        get_weighting_instructions), in which case this is a no-op pass.
+
         Args:
-            rows: Query result rows
+            rows: Query result rows (tuples aligned with columns)
+            columns: Column names of the result
             nccs_column: Name of NCCS column
 
         Returns:
             Rows with NCCS values merged
         """
-        if not rows or nccs_column not in rows[0]:
+        if not rows or nccs_column not in columns:
             return rows
 
+        nccs_index = columns.index(nccs_column)
+
         # Apply merging rules
         merged_rows = []
         for row in rows:
-            nccs_value = row.get(nccs_column)
+            nccs_value = row[nccs_index]
 
             if nccs_value:
-                # Convert to string and uppercase
-                nccs_str = str(nccs_value).strip().upper()
-
-                # Rule 1: A1 → A
-                if nccs_str == 'A1':
-                    row[nccs_column] = 'A'
-
-                # Rule 2: C, D, E → C/D/E
-                elif nccs_str in ['C', 'D', 'E']:
-                    row[nccs_column] = 'C/D/E'
+                merged = self.NCCS_MERGES.get(str(nccs_value).strip().upper())
+                if merged:
+                    row = list(row)
+                    row[nccs_index] = merged
 
             merged_rows.append(row)
 
@@ -340,7 +347,18 @@ When querying panel data, follow these rules:
    SELECT SUM(weight) as total_population FROM users
    ```
 
-**NCCS Merging**: A1→A, C/D/E→C/D/E (applied automatically)
+**NCCS Merging**: A1→A, C/D/E→C/D/E (applied automatically to returned values).
+When grouping by NCCS, group by the merged class in SQL so merged classes
+aggregate into one row:
+   ```sql
+   SELECT
+     CASE UPPER(TRIM(nccs)) WHEN 'A1' THEN 'A'
+       WHEN 'C' THEN 'C/D/E' WHEN 'D' THEN 'C/D/E' WHEN 'E' THEN 'C/D/E'
+       ELSE nccs END AS nccs,
+     SUM(weight) AS population
+   FROM users
+   GROUP BY 1
+   ```
 """
 
 
@@ -12,7 +12,8 @@ from typing import Optional
 import os
 from datetime import datetime, timedelta
 
-from app.database import get_db
+from app.database import get_db, invalidate_dataset_connection_string
+from app.events import publish_dataset_changed
 from app.models import Dataset, QueryLog, DatasetSchema
 from app.encryption import get_encryption_manager
 from app.workers.tasks import process_new_dataset
@@ -27,7 +28,7 @@ templates = Jinja2Templates(directory="app/ui/templates")
 # =============================================================================
 
 @router.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request, db: Session = Depends(get_db)):
+def dashboard(request: Request, db: Session = Depends(get_db)):
     """Dashboard homepage with overview stats"""
 
     # Calculate stats
@@ -68,7 +69,7 @@ async def dashboard(request: Request, db: Session = Depends(get_db)):
 # =============================================================================
 
 @router.get("/datasets", response_class=HTMLResponse)
-async def list_datasets(request: Request, db: Session = Depends(get_db)):
+def list_datasets(request: Request, db: Session = Depends(get_db)):
     """List all datasets"""
 
     datasets = db.query(Dataset).order_by(desc(Dataset.created_at)).all()
@@ -102,7 +103,7 @@ async def new_dataset_form(request: Request):
 
 
 @router.post("/datasets", response_class=HTMLResponse)
-async def create_dataset(
+def create_dataset(
     request: Request,
     name: str = Form(...),
     connection_string: str = Form(...),
@@ -161,7 +162,7 @@ async def create_dataset(
 
 
 @router.get("/datasets/{dataset_id}", response_class=HTMLResponse)
-async def dataset_detail(
+def dataset_detail(
     request: Request,
     dataset_id: int,
     db: Session = Depends(get_db)
@@ -215,8 +216,14 @@ async def dataset_detail(
     })
 
 
+def _dataset_changed(dataset_id: int, action: str, name: str):
+    """Drop this process's cached connection for the dataset and tell the other servers"""
+    invalidate_dataset_connection_string(dataset_id)
+    publish_dataset_changed(dataset_id, action, name)
+
+
 @router.post("/datasets/{dataset_id}/activate")
-async def activate_dataset(dataset_id: int, db: Session = Depends(get_db)):
+def activate_dataset(dataset_id: int, db: Session = Depends(get_db)):
     """Activate a dataset"""
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
     if not dataset:
@@ -224,12 +231,13 @@ async def activate_dataset(dataset_id: int, db: Session = Depends(get_db)):
 
     dataset.is_active = True
     db.commit()
+    _dataset_changed(dataset_id, 'activated', dataset.name)
 
     return {"success": True, "message": "Dataset activated"}
 
 
 @router.post("/datasets/{dataset_id}/deactivate")
-async def deactivate_dataset(dataset_id: int, db: Session = Depends(get_db)):
+def deactivate_dataset(dataset_id: int, db: Session = Depends(get_db)):
     """Deactivate a dataset"""
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
     if not dataset:
@@ -237,12 +245,13 @@ async def deactivate_dataset(dataset_id: int, db: Session = Depends(get_db)):
 
     dataset.is_active = False
     db.commit()
+    _dataset_changed(dataset_id, 'deactivated', dataset.name)
 
     return {"success": True, "message": "Dataset deactivated"}
 
 
 @router.post("/datasets/{dataset_id}/reprocess")
-async def reprocess_dataset(dataset_id: int, db: Session = Depends(get_db)):
+def reprocess_dataset(dataset_id: int, db: Session = Depends(get_db)):
     """Trigger schema reprocessing for a dataset"""
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
     if not dataset:
@@ -259,7 +268,7 @@ async def reprocess_dataset(dataset_id: int, db: Session = Depends(get_db)):
 
 
 @router.delete("/datasets/{dataset_id}")
-async def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
+def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
     """Delete a dataset"""
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
     if not dataset:
@@ -272,8 +281,10 @@ async def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
     db.query(QueryLog).filter(QueryLog.dataset_id == dataset_id).delete()
 
     # Delete dataset
+    name = dataset.name
     db.delete(dataset)
     db.commit()
+    _dataset_changed(dataset_id, 'deleted', name)
 
     return {"success": True, "message": "Dataset deleted"}
 
@@ -283,7 +294,7 @@ async def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
 # =============================================================================
 
 @router.get("/logs", response_class=HTMLResponse)
-async def query_logs(
+def query_logs(
     request: Request,
     dataset_id: Optional[int] = Query(None),
     client_tool: Optional[str] = Query(None),
@@ -351,7 +362,7 @@ async def query_logs(
 
 
 @router.delete("/logs")
-async def clear_logs(db: Session = Depends(get_db)):
+def clear_logs(db: Session = Depends(get_db)):
     """Clear all query logs"""
     db.query(QueryLog).delete()
     db.commit()
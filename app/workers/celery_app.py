@@ -3,6 +3,7 @@ Celery configuration for background tasks
 """
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Redis URL for Celery broker and backend
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
@@ -28,3 +29,10 @@ celery_app.conf.update(
     worker_max_tasks_per_child=50,
 )
 
+
+
+@worker_process_init.connect
+def reset_metadata_pool(**kwargs):
+    """Forked workers must not reuse pooled metadata connections opened by the parent"""
+    from app.database import metadata_engine
+    metadata_engine.dispose(close=False)
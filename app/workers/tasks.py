@@ -3,255 +3,323 @@ Background tasks for schema profiling and LLM metadata generation
 Enhanced with weight column detection and NCCS awareness
 """
 import os
-from typing import List, Dict
+import hashlib
+from itertools import groupby
+from operator import itemgetter
+import httpx
+import orjson
+from typing import List, Dict, Optional
 from openai import OpenAI
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
 from app.workers.celery_app import celery_app
-from app.database import get_db_context, get_dataset_connection
-from app.models import Dataset, DatasetSchema, Metadata
-from app.encryption import get_encryption_manager
+from app.database import get_db_context, get_dataset_connection_string
+from app.pool import pooled_connection
+from app.models import Dataset, DatasetSchema, Metadata, ColumnDescriptionCache
 from app.services.weighting_service import weighting_service
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Initialize OpenAI client on a shared HTTP/2 keep-alive transport so repeated
+# calls from a worker process reuse one TLS connection
+http_client = httpx.Client(
+    http2=True,
+    timeout=30.0,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=40, keepalive_expiry=30.0)
+)
+client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=http_client)
+
+# Attempts per table when the JSON-mode reply fails to parse (e.g. truncated at max_tokens)
+LLM_JSON_ATTEMPTS = 2
+
+
+def column_fingerprint(column_name: str, data_type: str) -> str:
+    """Content address for a column description: sha256 of 'column_name|data_type'"""
+    return hashlib.sha256(f"{column_name}|{data_type}".encode('utf-8')).hexdigest()
+
+
+def _generate_column_descriptions(dataset: Dataset, table_name: str, cols_text: str) -> Dict[str, str]:
+    """Ask the LLM for short descriptions of the columns listed in cols_text, keyed by column name"""
+    # Check if this is panel data with weighting
+    description = dataset.description or ""
+    has_weight_hint = "Weight column" in description
+    has_nccs_hint = "NCCS column" in description
+
+    weight_context = ""
+    if has_weight_hint:
+        weight_context = "\n\n**IMPORTANT**: This is panel data with weighting. Include notes about weight columns and proper usage."
+
+    nccs_context = ""
+    if has_nccs_hint:
+        nccs_context = "\n**NCCS Merging**: A1→A, C/D/E→C/D/E (socioeconomic classes)"
+
+    prompt = f"""You are a data analyst specializing in consumer panel data. Given this database table schema, provide a SHORT (max 10 words) description for each column.
+
+Table: {table_name}
+Dataset: {dataset.name}
+{weight_context}
+{nccs_context}
+
+Columns:
+{cols_text}
+
+Respond in JSON format:
+{{
+  "column_name": "short description",
+  ...
+}}
+
+Keep descriptions crisp and technical. Focus on what the data represents. For weight columns, mention "Population weight" or similar."""
+
+    # JSON mode guarantees a parseable object, so no markdown fence stripping is needed.
+    # A decode error only happens on a truncated reply; retry those before giving up.
+    for attempt in range(LLM_JSON_ATTEMPTS):
+        response = client.chat.completions.create(
+            model="gpt-4.1-mini",
+            messages=[
+                {"role": "system", "content": "You are a data analyst providing concise column descriptions."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=500,
+            response_format={"type": "json_object"}
+        )
+
+        try:
+            return orjson.loads(response.choices[0].message.content)
+        except orjson.JSONDecodeError:
+            if attempt == LLM_JSON_ATTEMPTS - 1:
+                raise
 
 
 @celery_app.task(name='app.workers.tasks.profile_dataset_schema')
-def profile_dataset_schema(dataset_id: int) -> Dict:
+def profile_dataset_schema(dataset_id: int, db: Optional[Session] = None) -> Dict:
     """
     Profile a dataset's schema and store in database
     
     Args:
         dataset_id: ID of the dataset to profile
+        db: Session to reuse (a new one is opened if omitted)
     
     Returns:
         Dict with status and results
     """
-    with get_db_context() as db:
-        # Get dataset
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        if not dataset:
-            return {'success': False, 'error': 'Dataset not found'}
-        
-        # Decrypt connection string
-        encryption_manager = get_encryption_manager()
-        connection_string = encryption_manager.decrypt(dataset.connection_string_encrypted)
-        
-        # Connect to dataset database
-        try:
-            conn = get_dataset_connection(connection_string)
+    if db is None:
+        with get_db_context() as db:
+            return profile_dataset_schema(dataset_id, db=db)
+
+    # Get dataset
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        return {'success': False, 'error': 'Dataset not found'}
+    
+    # Decrypted connection string
+    connection_string = get_dataset_connection_string(dataset_id)
+    
+    # Connect to dataset database
+    try:
+        with pooled_connection(connection_string) as conn:
             cur = conn.cursor()
-            
-            # Get all tables (skip internal tables)
+
+            # Get every column of every table in one query (skip internal tables)
             cur.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_type = 'BASE TABLE'
-                AND table_name NOT IN ('query_logs', 'datasets', 'dataset_schemas', 'metadata')
+                SELECT c.table_name, c.column_name, c.data_type, c.is_nullable = 'YES' AS is_nullable
+                FROM information_schema.columns c
+                JOIN information_schema.tables t
+                    ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+                WHERE c.table_schema = 'public' 
+                AND t.table_type = 'BASE TABLE'
+                AND c.table_name NOT IN ('query_logs', 'datasets', 'dataset_schemas', 'metadata')
+                ORDER BY c.table_name, c.ordinal_position
             """)
-            tables = [row[0] for row in cur.fetchall()]
-            
-            total_columns = 0
-            weight_column_detected = None
-            nccs_column_detected = None
-            all_columns = []
-
-            # For each table, get schema
-            for table_name in tables:
-                cur.execute("""
-                    SELECT column_name, data_type, is_nullable
-                    FROM information_schema.columns
-                    WHERE table_name = %s
-                    ORDER BY ordinal_position
-                """, (table_name,))
-
-                columns = cur.fetchall()
-                table_column_names = [col[0] for col in columns]
-                all_columns.extend(table_column_names)
-
-                # Detect weight column in this table
-                if not weight_column_detected:
-                    detected_weight = weighting_service.detect_weight_column(table_column_names)
-                    if detected_weight:
-                        weight_column_detected = f"{table_name}.{detected_weight}"
-
-                # Detect NCCS column in this table
-                if not nccs_column_detected:
-                    detected_nccs = weighting_service.detect_nccs_column(table_column_names)
-                    if detected_nccs:
-                        nccs_column_detected = f"{table_name}.{detected_nccs}"
-
-                # Store schema information
-                for column_name, data_type, is_nullable in columns:
-                    # Check if schema entry already exists
-                    existing = db.query(DatasetSchema).filter(
-                        DatasetSchema.dataset_id == dataset_id,
-                        DatasetSchema.table_name == table_name,
-                        DatasetSchema.column_name == column_name
-                    ).first()
-
-                    if not existing:
-                        schema_entry = DatasetSchema(
-                            dataset_id=dataset_id,
-                            table_name=table_name,
-                            column_name=column_name,
-                            data_type=data_type,
-                            is_nullable=(is_nullable == 'YES')
-                        )
-                        db.add(schema_entry)
-                        total_columns += 1
-
-                db.commit()
-
-            # Update dataset with detected columns
-            if weight_column_detected:
-                dataset.description = (dataset.description or "") + f"\n[Weight column: {weight_column_detected}]"
-                db.commit()
-
-            if nccs_column_detected:
-                dataset.description = (dataset.description or "") + f"\n[NCCS column: {nccs_column_detected}]"
-                db.commit()
-            
+            rows = cur.fetchall()
             cur.close()
-            conn.close()
 
-            return {
-                'success': True,
-                'tables_found': len(tables),
-                'columns_profiled': total_columns,
-                'weight_column': weight_column_detected,
-                'nccs_column': nccs_column_detected
-            }
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        tables = [
+            (table_name, [row[1:] for row in table_rows])
+            for table_name, table_rows in groupby(rows, key=itemgetter(0))
+        ]
+        
+        weight_column_detected = None
+        nccs_column_detected = None
+        all_columns = []
+
+        # Existing (table, column) pairs, loaded once
+        existing = {
+            (row.table_name, row.column_name)
+            for row in db.query(DatasetSchema.table_name, DatasetSchema.column_name).filter(
+                DatasetSchema.dataset_id == dataset_id
+            )
+        }
+        new_rows = []
+
+        # For each table, get schema
+        for table_name, columns in tables:
+            table_column_names = tuple(col[0] for col in columns)
+            all_columns.extend(table_column_names)
+
+            # Detect weight column in this table
+            if not weight_column_detected:
+                detected_weight = weighting_service.detect_weight_column(table_column_names)
+                if detected_weight:
+                    weight_column_detected = f"{table_name}.{detected_weight}"
+
+            # Detect NCCS column in this table
+            if not nccs_column_detected:
+                detected_nccs = weighting_service.detect_nccs_column(table_column_names)
+                if detected_nccs:
+                    nccs_column_detected = f"{table_name}.{detected_nccs}"
+
+            # Collect new schema rows
+            new_rows.extend(
+                {
+                    'dataset_id': dataset_id,
+                    'table_name': table_name,
+                    'column_name': column_name,
+                    'data_type': data_type,
+                    'is_nullable': is_nullable
+                }
+                for column_name, data_type, is_nullable in columns
+                if (table_name, column_name) not in existing
+            )
+
+        # Store schema information in one multi-row INSERT
+        db.bulk_insert_mappings(DatasetSchema, new_rows)
+        db.commit()
+        total_columns = len(new_rows)
+
+        # Update dataset with detected columns
+        if weight_column_detected:
+            dataset.description = (dataset.description or "") + f"\n[Weight column: {weight_column_detected}]"
+            db.commit()
+
+        if nccs_column_detected:
+            dataset.description = (dataset.description or "") + f"\n[NCCS column: {nccs_column_detected}]"
+            db.commit()
+
+        return {
+            'success': True,
+            'tables_found': len(tables),
+            'columns_profiled': total_columns,
+            'weight_column': weight_column_detected,
+            'nccs_column': nccs_column_detected
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {'success': False, 'error': str(e)}
 
 
 @celery_app.task(name='app.workers.tasks.generate_llm_metadata')
-def generate_llm_metadata(dataset_id: int, table_name: str) -> Dict:
+def generate_llm_metadata(dataset_id: int, table_name: str, db: Optional[Session] = None) -> Dict:
     """
     Generate AI-powered metadata for a table's columns
     
     Args:
         dataset_id: ID of the dataset
         table_name: Name of the table to generate metadata for
+        db: Session to reuse (a new one is opened if omitted)
     
     Returns:
         Dict with status and results
     """
-    with get_db_context() as db:
-        # Get dataset and schema
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        if not dataset:
-            return {'success': False, 'error': 'Dataset not found'}
-        
-        # Get all columns for this table
-        columns = db.query(DatasetSchema).filter(
-            DatasetSchema.dataset_id == dataset_id,
-            DatasetSchema.table_name == table_name
-        ).all()
-        
-        if not columns:
-            return {'success': False, 'error': 'No columns found for table'}
-        
-        # Prepare column info for LLM
-        column_info = []
-        for col in columns:
-            column_info.append({
-                'name': col.column_name,
-                'type': col.data_type,
-                'nullable': col.is_nullable
-            })
-        
-        # Generate metadata using OpenAI
-        try:
-            # Check if this is panel data with weighting
-            has_weight_hint = "Weight column" in (dataset.description or "")
-            has_nccs_hint = "NCCS column" in (dataset.description or "")
-
-            weight_context = ""
-            if has_weight_hint:
-                weight_context = "\n\n**IMPORTANT**: This is panel data with weighting. Include notes about weight columns and proper usage."
+    if db is None:
+        with get_db_context() as db:
+            return generate_llm_metadata(dataset_id, table_name, db=db)
 
-            nccs_context = ""
-            if has_nccs_hint:
-                nccs_context = "\n**NCCS Merging**: A1→A, C/D/E→C/D/E (socioeconomic classes)"
-
-            prompt = f"""You are a data analyst specializing in consumer panel data. Given this database table schema, provide a SHORT (max 10 words) description for each column.
+    # Get dataset and schema
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        return {'success': False, 'error': 'Dataset not found'}
+    
+    # Get all columns for this table
+    columns = db.query(DatasetSchema).filter(
+        DatasetSchema.dataset_id == dataset_id,
+        DatasetSchema.table_name == table_name
+    ).all()
+    
+    if not columns:
+        return {'success': False, 'error': 'No columns found for table'}
+    
+    # Reuse descriptions for (column_name, data_type) pairs already seen in any dataset
+    fingerprints = {
+        col.column_name: column_fingerprint(col.column_name, col.data_type)
+        for col in columns
+    }
+    cached = {
+        entry.sha: entry.description
+        for entry in db.query(ColumnDescriptionCache).filter(
+            ColumnDescriptionCache.sha.in_(set(fingerprints.values()))
+        ).all()
+    }
+    metadata_dict = {
+        column_name: cached[sha]
+        for column_name, sha in fingerprints.items()
+        if sha in cached
+    }
 
-Table: {table_name}
-Dataset: {dataset.name}
-{weight_context}
-{nccs_context}
+    # Prompt lines for the columns without a cached description
+    cols_text = '\n'.join(
+        f'- {col.column_name} ({col.data_type})'
+        for col in columns
+        if col.column_name not in metadata_dict
+    )
+    
+    # Generate metadata using OpenAI
+    try:
+        if cols_text:
+            generated = _generate_column_descriptions(dataset, table_name, cols_text)
+            generated = {name: desc for name, desc in generated.items() if name in fingerprints}
+            metadata_dict.update(generated)
 
-Columns:
-{chr(10).join([f"- {col['name']} ({col['type']})" for col in column_info])}
+            # Write new descriptions back to the shared cache in one statement
+            if generated:
+                db.execute(
+                    pg_insert(ColumnDescriptionCache).values([
+                        {'sha': fingerprints[name], 'description': desc}
+                        for name, desc in generated.items()
+                    ]).on_conflict_do_nothing(index_elements=['sha'])
+                )
 
-Respond in JSON format:
-{{
-  "column_name": "short description",
-  ...
-}}
+        # Store metadata (one SELECT for existing rows, then bulk insert/update)
+        existing = {
+            m.column_name: m.id
+            for m in db.query(Metadata.id, Metadata.column_name).filter(
+                Metadata.dataset_id == dataset_id,
+                Metadata.table_name == table_name
+            ).all()
+        }
 
-Keep descriptions crisp and technical. Focus on what the data represents. For weight columns, mention "Population weight" or similar."""
+        to_insert = []
+        to_update = []
+        for column_name, description in metadata_dict.items():
+            if column_name in existing:
+                to_update.append({
+                    'id': existing[column_name],
+                    'description': description,
+                    'model_used': "gpt-4.1-mini"
+                })
+            else:
+                to_insert.append(Metadata(
+                    dataset_id=dataset_id,
+                    table_name=table_name,
+                    column_name=column_name,
+                    description=description,
+                    model_used="gpt-4.1-mini"
+                ))
 
-            response = client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=[
-                    {"role": "system", "content": "You are a data analyst providing concise column descriptions."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            # Parse response
-            import json
-            metadata_json = response.choices[0].message.content
-            
-            # Extract JSON from markdown code blocks if present
-            if '```json' in metadata_json:
-                metadata_json = metadata_json.split('```json')[1].split('```')[0].strip()
-            elif '```' in metadata_json:
-                metadata_json = metadata_json.split('```')[1].split('```')[0].strip()
-            
-            metadata_dict = json.loads(metadata_json)
-            
-            # Store metadata
-            stored_count = 0
-            for column_name, description in metadata_dict.items():
-                # Check if metadata already exists
-                existing = db.query(Metadata).filter(
-                    Metadata.dataset_id == dataset_id,
-                    Metadata.table_name == table_name,
-                    Metadata.column_name == column_name
-                ).first()
-                
-                if existing:
-                    existing.description = description
-                    existing.model_used = "gpt-4.1-mini"
-                else:
-                    metadata_entry = Metadata(
-                        dataset_id=dataset_id,
-                        table_name=table_name,
-                        column_name=column_name,
-                        description=description,
-                        model_used="gpt-4.1-mini"
-                    )
-                    db.add(metadata_entry)
-                
-                stored_count += 1
-            
-            db.commit()
-            
-            return {
-                'success': True,
-                'columns_processed': stored_count,
-                'table': table_name
-            }
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        db.bulk_save_objects(to_insert)
+        db.bulk_update_mappings(Metadata, to_update)
+        db.commit()
+        stored_count = len(to_insert) + len(to_update)
+        
+        return {
+            'success': True,
+            'columns_processed': stored_count,
+            'table': table_name
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {'success': False, 'error': str(e)}
 
 
 @celery_app.task(name='app.workers.tasks.process_new_dataset')
@@ -267,22 +335,24 @@ def process_new_dataset(dataset_id: int) -> Dict:
     Returns:
         Dict with status and results
     """
-    # Step 1: Profile schema
-    profile_result = profile_dataset_schema(dataset_id)
-    
-    if not profile_result.get('success'):
-        return profile_result
-    
-    # Step 2: Generate metadata for each table
+    # One session for the whole pipeline
     with get_db_context() as db:
-        # Get all unique tables for this dataset
+        # Step 1: Profile schema
+        profile_result = profile_dataset_schema(dataset_id, db=db)
+
+        if not profile_result.get('success'):
+            return profile_result
+
+        # Step 2: Generate metadata for each table
+        # Get all unique tables for this dataset (GROUP BY can walk the
+        # (dataset_id, table_name) index instead of sorting every schema row)
         tables = db.query(DatasetSchema.table_name).filter(
             DatasetSchema.dataset_id == dataset_id
-        ).distinct().all()
+        ).group_by(DatasetSchema.table_name).all()
         
         metadata_results = []
         for (table_name,) in tables:
-            result = generate_llm_metadata(dataset_id, table_name)
+            result = generate_llm_metadata(dataset_id, table_name, db=db)
             metadata_results.append(result)
     
     return {
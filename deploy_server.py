@@ -5,20 +5,22 @@ Unified server with UI and MCP on same port
 """
 import os
 import sys
-import asyncio
+import orjson
 from dotenv import load_dotenv
 load_dotenv()
 
 import uvicorn
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 # Initialize FastAPI
 app = FastAPI(
     title="MCP Analytics Server",
     description="Multi-dataset analytics with Web UI and MCP protocol",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -30,8 +32,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (query result tables, schema markdown, UI pages)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Import database and UI routes
 from app.database import init_database
+from app.responses import (
+    call_tool, dispatch_batch, json_bytes_response, jsonrpc_error,
+    jsonrpc_response, jsonrpc_result_frame, jsonrpc_tool_result
+)
+from app.pool import close_all_pools, configure_threadpool
 from app.ui.routes import router as ui_router
 
 # Mount UI
@@ -44,13 +54,19 @@ async def startup():
     print("=" * 70)
     print("🚀 MCP Analytics Server - Production")
     print("=" * 70)
+    configure_threadpool()
     init_database()
     print("✅ Database ready")
 
-    # Load dataset cache
-    from server import reload_datasets_cache, listen_for_dataset_changes
-    reload_datasets_cache()
-    asyncio.create_task(listen_for_dataset_changes())
+    # Load dataset cache in the background (tools work without it)
+    from server import schedule_datasets_reload, start_background_tasks
+    app.state.background_tasks = await start_background_tasks()
+    schedule_datasets_reload()
+
+    # Open dataset pools now so the first queries skip connection + codec setup
+    from app.services.parallel_query_executor import parallel_executor
+    warmed = await parallel_executor.warm_pools()
+    print(f"✅ Warmed {warmed} dataset connection pools")
 
     print()
     print("📍 Endpoints:")
@@ -67,6 +83,14 @@ async def startup():
     print()
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the background tasks and close pooled dataset connections"""
+    from server import stop_background_tasks
+    await stop_background_tasks(getattr(app.state, "background_tasks", None))
+    close_all_pools()
+
+
 @app.get("/")
 async def root():
     """Redirect to UI"""
@@ -74,14 +98,17 @@ async def root():
     return RedirectResponse(url="/ui")
 
 
+_HEALTH_JSON = orjson.dumps({
+    "status": "healthy",
+    "version": "2.0.0",
+    "features": ["ui", "mcp", "encryption", "logging"]
+})
+
+
 @app.get("/health")
 async def health():
     """Health check"""
-    return {
-        "status": "healthy",
-        "version": "2.0.0",
-        "features": ["ui", "mcp", "encryption", "logging"]
-    }
+    return json_bytes_response(_HEALTH_JSON)
 
 
 # ============================================================================
@@ -98,161 +125,159 @@ from server import (
     get_context
 )
 
-
-@app.api_route("/mcp", methods=["GET", "POST", "OPTIONS"])
-async def mcp_endpoint(request: Request):
+# Tools callable via tools/call
+_TOOLS = {
+    "list_available_datasets": list_available_datasets,
+    "get_dataset_schema": get_dataset_schema,
+    "query_dataset": query_dataset,
+    "get_dataset_sample": get_dataset_sample,
+    "get_context": get_context,
+}
+
+
+# Static JSON-RPC results, serialized once at import instead of on every handshake
+_INITIALIZE_RESULT_JSON = orjson.dumps({
+    "protocolVersion": "2024-11-05",
+    "serverInfo": {
+        "name": "mcp-analytics-phase2-optimized",
+        "version": "2.0.0"
+    },
+    "capabilities": {
+        "tools": {},
+    }
+})
+
+_TOOLS_LIST_RESULT_JSON = orjson.dumps({
+    "tools": [
+        {
+            "name": "list_available_datasets",
+            "description": "List all available datasets",
+            "inputSchema": {"type": "object", "properties": {}}
+        },
+        {
+            "name": "get_dataset_schema",
+            "description": "Get schema for a dataset",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "dataset_id": {"type": "integer"}
+                },
+                "required": ["dataset_id"]
+            }
+        },
+        {
+            "name": "query_dataset",
+            "description": "Execute SQL query on dataset (40 row limit)",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "dataset_id": {"type": "integer"},
+                    "query": {"type": "string"},
+                    "apply_weights": {"type": "boolean", "default": True}
+                },
+                "required": ["dataset_id", "query"]
+            }
+        },
+        {
+            "name": "get_dataset_sample",
+            "description": "Get sample data from a table",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "dataset_id": {"type": "integer"},
+                    "table_name": {"type": "string"},
+                    "limit": {"type": "integer", "default": 10}
+                },
+                "required": ["dataset_id", "table_name"]
+            }
+        },
+        {
+            "name": "get_context",
+            "description": "Get progressive context about server",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "level": {"type": "integer", "default": 0},
+                    "dataset_id": {"type": "integer"}
+                }
+            }
+        }
+    ]
+})
+
+
+async def _dispatch_single(entry) -> tuple:
     """
-    MCP Protocol Endpoint
+    Handle one JSON-RPC request object
 
-    This endpoint handles MCP protocol requests from ChatGPT, Claude Desktop, etc.
-
-    Connection URL for ChatGPT/Claude:
-        https://your-domain.com/mcp
+    Returns:
+        (payload, status_code) where payload is a response dict, or the
+        already-serialized bytes for the cached initialize/tools/list results
     """
-    try:
-        # Handle OPTIONS for CORS
-        if request.method == "OPTIONS":
-            return JSONResponse({"status": "ok"})
-
-        # Get request body
-        if request.method == "POST":
-            body = await request.json()
-        else:
-            body = {}
+    if not isinstance(entry, dict):
+        return jsonrpc_error(-32600, "Invalid Request"), 400
 
-        method = body.get("method", "")
+    method = entry.get("method", "")
 
+    try:
         # Handle MCP protocol methods
         if method == "initialize":
-            return JSONResponse({
-                "jsonrpc": "2.0",
-                "result": {
-                    "protocolVersion": "2024-11-05",
-                    "serverInfo": {
-                        "name": "mcp-analytics-phase2-optimized",
-                        "version": "2.0.0"
-                    },
-                    "capabilities": {
-                        "tools": {},
-                    }
-                },
-                "id": body.get("id")
-            })
+            return jsonrpc_result_frame(_INITIALIZE_RESULT_JSON, entry.get("id")), 200
 
         elif method == "tools/list":
             # Return available MCP tools
-            return JSONResponse({
-                "jsonrpc": "2.0",
-                "result": {
-                    "tools": [
-                        {
-                            "name": "list_available_datasets",
-                            "description": "List all available datasets",
-                            "inputSchema": {"type": "object", "properties": {}}
-                        },
-                        {
-                            "name": "get_dataset_schema",
-                            "description": "Get schema for a dataset",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "dataset_id": {"type": "integer"}
-                                },
-                                "required": ["dataset_id"]
-                            }
-                        },
-                        {
-                            "name": "query_dataset",
-                            "description": "Execute SQL query on dataset (40 row limit)",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "dataset_id": {"type": "integer"},
-                                    "query": {"type": "string"},
-                                    "apply_weights": {"type": "boolean", "default": True}
-                                },
-                                "required": ["dataset_id", "query"]
-                            }
-                        },
-                        {
-                            "name": "get_dataset_sample",
-                            "description": "Get sample data from a table",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "dataset_id": {"type": "integer"},
-                                    "table_name": {"type": "string"},
-                                    "limit": {"type": "integer", "default": 10}
-                                },
-                                "required": ["dataset_id", "table_name"]
-                            }
-                        },
-                        {
-                            "name": "get_context",
-                            "description": "Get progressive context about server",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "level": {"type": "integer", "default": 0},
-                                    "dataset_id": {"type": "integer"}
-                                }
-                            }
-                        }
-                    ]
-                },
-                "id": body.get("id")
-            })
+            return jsonrpc_result_frame(_TOOLS_LIST_RESULT_JSON, entry.get("id")), 200
 
         elif method == "tools/call":
             # Execute a tool
-            tool_name = body.get("params", {}).get("name")
-            arguments = body.get("params", {}).get("arguments", {})
+            tool_name = entry.get("params", {}).get("name")
+            arguments = entry.get("params", {}).get("arguments", {})
 
             # Call the appropriate tool
-            if tool_name == "list_available_datasets":
-                result = await list_available_datasets()
-            elif tool_name == "get_dataset_schema":
-                result = await get_dataset_schema(**arguments)
-            elif tool_name == "query_dataset":
-                result = await query_dataset(**arguments)
-            elif tool_name == "get_dataset_sample":
-                result = await get_dataset_sample(**arguments)
-            elif tool_name == "get_context":
-                result = await get_context(**arguments)
-            else:
-                return JSONResponse({
-                    "jsonrpc": "2.0",
-                    "error": {"code": -32601, "message": f"Tool not found: {tool_name}"},
-                    "id": body.get("id")
-                }, status_code=404)
-
-            return JSONResponse({
-                "jsonrpc": "2.0",
-                "result": {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": result
-                        }
-                    ]
-                },
-                "id": body.get("id")
-            })
+            fn = _TOOLS.get(tool_name)
+            if fn is None:
+                return jsonrpc_error(-32601, f"Tool not found: {tool_name}", entry.get("id")), 404
+
+            result = await call_tool(fn, arguments)
+            return jsonrpc_tool_result(result, entry.get("id")), 200
 
         else:
             # Unknown method
-            return JSONResponse({
-                "jsonrpc": "2.0",
-                "error": {"code": -32601, "message": f"Method not found: {method}"},
-                "id": body.get("id")
-            }, status_code=404)
+            return jsonrpc_error(-32601, f"Method not found: {method}", entry.get("id")), 404
 
     except Exception as e:
-        return JSONResponse({
-            "jsonrpc": "2.0",
-            "error": {"code": -32000, "message": str(e)},
-            "id": body.get("id", None)
-        }, status_code=500)
+        return jsonrpc_error(-32000, str(e), entry.get("id")), 500
+
+
+@app.api_route("/mcp", methods=["GET", "POST", "OPTIONS"])
+async def mcp_endpoint(request: Request):
+    """
+    MCP Protocol Endpoint
+
+    This endpoint handles MCP protocol requests from ChatGPT, Claude Desktop, etc.
+    Accepts a single JSON-RPC request or a batch (JSON array) of them.
+
+    Connection URL for ChatGPT/Claude:
+        https://your-domain.com/mcp
+    """
+    # Handle OPTIONS for CORS
+    if request.method == "OPTIONS":
+        return ORJSONResponse({"status": "ok"})
+
+    # Get request body
+    try:
+        if request.method == "POST":
+            body = orjson.loads(await request.body())
+        else:
+            body = {}
+    except Exception as e:
+        return ORJSONResponse(jsonrpc_error(-32700, f"Parse error: {str(e)}"), status_code=400)
+
+    if isinstance(body, list):
+        return await dispatch_batch(body, _dispatch_single)
+
+    payload, status_code = await _dispatch_single(body)
+    return jsonrpc_response(request, payload, status_code)
 
 
 if __name__ == "__main__":
@@ -261,8 +286,11 @@ if __name__ == "__main__":
         port = int(sys.argv[1])
 
     uvicorn.run(
-        app,
+        "deploy_server:app",
         host="0.0.0.0",
         port=port,
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),  # Each worker process gets its own pools
         log_level="info"
     )
@@ -3,6 +3,7 @@ Edit column descriptions for metadata
 """
 
 from app.database import get_db
+from app.metadata_text import rebuild_metadata_text, publish_schema_changed
 from app.models import Dataset
 
 # Your descriptions
@@ -32,38 +33,15 @@ DESCRIPTIONS = {
 def update_metadata():
     db = next(get_db())
     dataset = db.query(Dataset).filter(Dataset.id == 2).first()
-
-    # Rebuild metadata text with descriptions
-    md_lines = [
-        f"# {dataset.name}\n",
-        f"Consumer digital insights panel data with demographics and app usage metrics.\n",
-        f"---\n"
-    ]
-
-    for table_name, columns_desc in DESCRIPTIONS.items():
-        md_lines.append(f"\n## Table: `{table_name}`\n")
-        md_lines.append(f"**{len(columns_desc)} columns**\n")
-        md_lines.append("\n| Column | Type | Nullable | Description |")
-        md_lines.append("\n|--------|------|----------|-------------|")
-
-        # Get column info from database
-        from app.models import DatasetSchema
-        schemas = db.query(DatasetSchema).filter(
-            DatasetSchema.dataset_id == 2,
-            DatasetSchema.table_name == table_name
-        ).order_by(DatasetSchema.column_name).all()
-
-        for col in schemas:
-            nullable = "Yes" if col.is_nullable else "No"
-            description = columns_desc.get(col.column_name, "No description")
-            md_lines.append(f"\n| `{col.column_name}` | {col.data_type} | {nullable} | {description} |")
-
-        md_lines.append("\n")
-
-    dataset.metadata_text = "".join(md_lines)
     dataset.description = "Consumer digital insights panel data"
+
+    # Re-render only the described tables' sections (others keep their cached markdown)
+    rebuild_metadata_text(db, dataset, DESCRIPTIONS.keys(), descriptions=DESCRIPTIONS)
     db.commit()
 
+    # Running servers drop their cached copy of the schema
+    publish_schema_changed(dataset.id, DESCRIPTIONS.keys())
+
     print("✅ Descriptions updated!")
     print(f"\nPreview:\n{dataset.metadata_text[:800]}...")
 
@@ -5,45 +5,194 @@ Uses OpenAI GPT-4.1-mini to create meaningful descriptions
 
 import sys
 import os
+import json
+import time
+import random
+import asyncio
+from functools import lru_cache
+from typing import Optional
+from itertools import islice
 from dotenv import load_dotenv
-from openai import OpenAI
+import tiktoken
+from openai import AsyncOpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
 from sqlalchemy.orm import Session
-from app.database import get_db, get_dataset_connection
+from app.database import get_db, get_dataset_connection_string
+from app.metadata_text import rebuild_metadata_text, publish_schema_changed
 from app.models import Dataset, DatasetSchema, Metadata
-from app.encryption import get_encryption_manager
-import psycopg2
+from psycopg2 import sql
+from app.pool import get_pool
 
 load_dotenv()
 
 # Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-def get_sample_values(connection_string: str, table_name: str, column_name: str, limit: int = 10):
-    """Get sample values from a column"""
+# Max OpenAI requests in flight at once (keeps bursts under the RPM limit)
+MAX_CONCURRENT_REQUESTS = 20
+
+# Tables sampled at once (each holds a pooled dataset connection)
+MAX_CONCURRENT_TABLES = 4
+
+# Columns of one table described per realtime request
+COLUMNS_PER_PROMPT = 20
+
+# Batch API status polling interval bounds (seconds, doubles each poll)
+BATCH_POLL_MIN_SECONDS = 5
+BATCH_POLL_MAX_SECONDS = 300
+
+# Sample values: TABLESAMPLE SYSTEM percentage and row cap per table
+SAMPLE_PERCENT = 0.1
+SAMPLE_ROWS = 5000
+
+# Account quotas for realtime calls (set to match the OpenAI tier)
+OPENAI_RPM_LIMIT = int(os.getenv('OPENAI_RPM_LIMIT', 500))
+OPENAI_TPM_LIMIT = int(os.getenv('OPENAI_TPM_LIMIT', 200000))
+
+# Retries on 429/timeout/5xx with random exponential backoff (seconds)
+OPENAI_MAX_ATTEMPTS = 6
+OPENAI_BACKOFF_MIN_SECONDS = 1
+OPENAI_BACKOFF_MAX_SECONDS = 60
+
+RETRYABLE_OPENAI_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# Characters per token for the estimate used when no tiktoken encoding can be loaded
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """
+    The gpt-4o-mini tiktoken encoding, loaded on first use
+
+    tiktoken downloads the BPE file the first time, so this can fail offline.
+    Returns None in that case (cached, so the download isn't retried per call).
+    """
     try:
-        conn = psycopg2.connect(connection_string)
-        cur = conn.cursor()
-        
-        # Get sample values (non-null, distinct)
-        cur.execute(f"""
-            SELECT DISTINCT "{column_name}" 
-            FROM {table_name} 
-            WHERE "{column_name}" IS NOT NULL 
-            LIMIT {limit}
-        """)
-        
-        samples = [str(row[0]) for row in cur.fetchall()]
-        cur.close()
-        conn.close()
-        
-        return samples
+        try:
+            return tiktoken.encoding_for_model("gpt-4o-mini")
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
     except Exception as e:
-        print(f"  Warning: Could not get samples for {column_name}: {e}")
-        return []
+        print(f"⚠️  tiktoken encoding unavailable, estimating tokens from length: {e}")
+        return None
 
 
-def generate_column_description(table_name: str, column_name: str, data_type: str, sample_values: list) -> str:
-    """Generate AI description for a column"""
+def count_tokens(text: str) -> int:
+    """Token count of text, or a character-based estimate if tiktoken can't load"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text))
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute` tokens per minute"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount: int = 1):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) * 60 / self.capacity)
+
+
+request_limiter = TokenBucket(OPENAI_RPM_LIMIT)
+token_limiter = TokenBucket(OPENAI_TPM_LIMIT)
+
+
+def estimate_tokens(params: dict) -> int:
+    """Prompt tokens plus the completion budget, as counted against the TPM quota"""
+    prompt_tokens = sum(count_tokens(m["content"]) for m in params["messages"])
+    return prompt_tokens + params.get("max_tokens", 0)
+
+
+async def create_chat_completion(**params):
+    """chat.completions.create paced against RPM/TPM quotas, retrying transient errors"""
+    tokens = estimate_tokens(params)
+    for attempt in range(OPENAI_MAX_ATTEMPTS):
+        await request_limiter.acquire()
+        await token_limiter.acquire(tokens)
+        try:
+            return await client.with_options(max_retries=0).chat.completions.create(**params)
+        except RETRYABLE_OPENAI_ERRORS:
+            if attempt == OPENAI_MAX_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(random.uniform(
+                0, min(OPENAI_BACKOFF_MAX_SECONDS, OPENAI_BACKOFF_MIN_SECONDS * 2 ** attempt)
+            ))
+
+
+def _query_samples(conn, table_name: str, columns: list, limit: int, tablesample: bool) -> dict:
+    """Run one array_agg sampling query over `columns`, optionally on a TABLESAMPLE subset"""
+    # Identifiers are quoted by psycopg2 and the limits are bound parameters,
+    # so column/table names from the profiled schema can't inject SQL. Values are
+    # cast to text first: DISTINCT needs an equality operator, which json, xml and
+    # point lack, and the samples end up as strings anyway
+    select_list = sql.SQL(",\n").join(
+        sql.SQL("(array_agg(DISTINCT {c}::text) FILTER (WHERE {c} IS NOT NULL))[1:%(limit)s] AS {c}").format(
+            c=sql.Identifier(c)
+        )
+        for c in columns
+    )
+    source = sql.SQL("{table} TABLESAMPLE SYSTEM (%(percent)s)" if tablesample else "{table}").format(
+        table=sql.Identifier(table_name)
+    )
+    query = sql.SQL("""
+        SELECT {select_list}
+        FROM (SELECT * FROM {source} LIMIT %(sample_rows)s) s
+    """).format(select_list=select_list, source=source)
+
+    cur = conn.cursor()
+    cur.execute(query, {'limit': limit, 'percent': SAMPLE_PERCENT, 'sample_rows': SAMPLE_ROWS})
+    row = cur.fetchone()
+    cur.close()
+
+    return {
+        c: [str(v) for v in (values or [])]
+        for c, values in zip(columns, row)
+    }
+
+
+def get_samples_for_table(conn, table_name: str, columns: list, limit: int = 10) -> dict:
+    """
+    Get sample values for several columns of a table in one query
+
+    Reads a SAMPLE_PERCENT block sample of the table so every column shares
+    one cheap scan. Columns that come back empty (e.g. small tables where no
+    page was sampled) are retried against the first SAMPLE_ROWS rows.
+
+    Returns:
+        Dict of column name -> list of up to `limit` distinct non-null values (as strings)
+    """
+    if not columns:
+        return {}
+
+    try:
+        samples = _query_samples(conn, table_name, columns, limit, tablesample=True)
+        empty = [c for c in columns if not samples[c]]
+        if empty:
+            samples.update(_query_samples(conn, table_name, empty, limit, tablesample=False))
+    except Exception as e:
+        conn.rollback()
+        print(f"  Warning: Could not get samples for {table_name}: {e}")
+        return {}
+
+    return samples
+
+
+def column_description_request(table_name: str, column_name: str, data_type: str, sample_values: list) -> dict:
+    """Build the chat completion parameters for one column description"""
     
     # Create prompt for GPT
     prompt = f"""You are analyzing a dataset for senior brand managers at large companies who make strategic decisions about media spend allocation and ecommerce strategy.
@@ -60,15 +209,22 @@ Generate a concise, business-focused description (1-2 sentences) that:
 
 Description:"""
 
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You are a data analyst helping executives understand analytics datasets. Be concise and strategic."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 100,
+        "temperature": 0.3
+    }
+
+
+async def generate_column_description(table_name: str, column_name: str, data_type: str, sample_values: list) -> str:
+    """Generate AI description for a column"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a data analyst helping executives understand analytics datasets. Be concise and strategic."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=100,
-            temperature=0.3
+        response = await create_chat_completion(
+            **column_description_request(table_name, column_name, data_type, sample_values)
         )
         
         description = response.choices[0].message.content.strip()
@@ -79,7 +235,7 @@ Description:"""
         return f"Column storing {data_type} data"
 
 
-def generate_dataset_summary(dataset_name: str, tables: dict) -> str:
+async def generate_dataset_summary(dataset_name: str, tables: dict) -> str:
     """Generate overall dataset summary using AI"""
     
     # Build context about the dataset
@@ -102,7 +258,7 @@ Generate a brief, strategic overview (2-3 sentences) that:
 Overview:"""
 
     try:
-        response = client.chat.completions.create(
+        response = await create_chat_completion(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a data strategist helping executives understand the business value of datasets."},
@@ -120,7 +276,151 @@ Overview:"""
         return f"Analytics dataset with {len(tables)} tables for strategic analysis."
 
 
-def generate_metadata(dataset_id: int):
+def column_descriptions_bulk_request(table_name: str, cols_with_samples: list) -> dict:
+    """Build the chat completion parameters describing several (col, sample_values) columns at once"""
+    column_lines = []
+    for i, (col, sample_values) in enumerate(cols_with_samples, 1):
+        samples = ', '.join(sample_values[:5]) if sample_values else 'No samples available'
+        column_lines.append(f"{i}. {col['column_name']} ({col['data_type']}) - Sample Values: {samples}")
+
+    prompt = f"""You are analyzing a dataset for senior brand managers at large companies who make strategic decisions about media spend allocation and ecommerce strategy.
+
+Table: {table_name}
+Columns:
+{chr(10).join(column_lines)}
+
+For EACH column, generate a concise, business-focused description (1-2 sentences) that:
+1. Explains what this column represents
+2. Highlights its relevance for strategic analysis
+3. Uses professional, executive-level language
+
+Respond in JSON format:
+{{"descriptions": [{{"column": "column_name", "description": "..."}}, ...]}}"""
+
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You are a data analyst helping executives understand analytics datasets. Be concise and strategic."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 100 * len(cols_with_samples),
+        "temperature": 0.3,
+        "response_format": {"type": "json_object"}
+    }
+
+
+async def generate_column_descriptions_bulk(table_name: str, cols_with_samples: list) -> dict:
+    """Describe several columns of one table in a single request, keyed by column name"""
+    descriptions = {}
+    try:
+        response = await create_chat_completion(
+            **column_descriptions_bulk_request(table_name, cols_with_samples)
+        )
+        parsed = json.loads(response.choices[0].message.content)
+        for item in parsed["descriptions"]:
+            descriptions[item["column"]] = item["description"].strip()
+    except Exception as e:
+        print(f"  Bulk description failed for {table_name}, falling back to per-column calls: {e}")
+
+    # Per-column fallback for anything the bulk reply missed
+    for col, sample_values in cols_with_samples:
+        if col['column_name'] not in descriptions:
+            descriptions[col['column_name']] = await generate_column_description(
+                table_name, col['column_name'], col['data_type'], sample_values
+            )
+
+    return descriptions
+
+
+async def generate_column_descriptions(pending: list, semaphore: Optional[asyncio.Semaphore] = None) -> list:
+    """
+    Generate descriptions for (table_name, col, sample_values) jobs concurrently, in input order
+
+    Columns of the same table are packed COLUMNS_PER_PROMPT to a request.
+    Pass a shared semaphore to bound requests across several concurrent calls.
+    """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    by_table = {}
+    for table_name, col, sample_values in pending:
+        by_table.setdefault(table_name, []).append((col, sample_values))
+
+    async def describe(table_name: str, cols_with_samples: list) -> tuple:
+        async with semaphore:
+            return table_name, await generate_column_descriptions_bulk(table_name, cols_with_samples)
+
+    requests = []
+    for table_name, cols_with_samples in by_table.items():
+        it = iter(cols_with_samples)
+        while chunk := list(islice(it, COLUMNS_PER_PROMPT)):
+            requests.append(describe(table_name, chunk))
+
+    results = {}
+    for table_name, descriptions in await asyncio.gather(*requests):
+        for column_name, description in descriptions.items():
+            results[(table_name, column_name)] = description
+
+    return [results[(table_name, col['column_name'])] for table_name, col, _ in pending]
+
+
+async def generate_column_descriptions_batch(pending: list) -> list:
+    """
+    Generate descriptions for (table_name, col, sample_values) jobs via the OpenAI Batch API
+
+    Half the price of realtime calls and outside the RPM limit, but results
+    can take up to 24h. Returned in input order.
+    """
+    lines = []
+    for table_name, col, sample_values in pending:
+        lines.append(json.dumps({
+            "custom_id": f"{table_name}:{col['column_name']}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": column_description_request(table_name, col['column_name'], col['data_type'], sample_values)
+        }))
+
+    batch_file = await client.files.create(
+        file=("column_descriptions.jsonl", "\n".join(lines).encode('utf-8')),
+        purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    print(f"📦 Submitted batch {batch.id} ({len(lines)} requests)")
+
+    # Poll with exponential backoff until the batch reaches a terminal state
+    delay = BATCH_POLL_MIN_SECONDS
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, BATCH_POLL_MAX_SECONDS)
+        batch = await client.batches.retrieve(batch.id)
+        print(f"  ⏳ Batch {batch.id}: {batch.status} "
+              f"({batch.request_counts.completed}/{batch.request_counts.total} done)")
+
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    # Map results back by custom_id
+    output = await client.files.content(batch.output_file_id)
+    results = {}
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        response = item.get("response") or {}
+        if response.get("status_code") == 200:
+            results[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+
+    return [
+        results.get(f"{table_name}:{col['column_name']}", f"Column storing {col['data_type']} data")
+        for table_name, col, _ in pending
+    ]
+
+
+async def generate_metadata(dataset_id: int, sync: bool = False):
     """Generate AI metadata for all columns in a dataset"""
     
     db = next(get_db())
@@ -137,10 +437,10 @@ def generate_metadata(dataset_id: int):
         print(f"{'='*80}\n")
         
         # Get connection string
-        encryption_manager = get_encryption_manager()
-        connection_string = encryption_manager.decrypt(dataset.connection_string_encrypted)
-        if connection_string.startswith('postgres://'):
-            connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
+        connection_string = get_dataset_connection_string(dataset_id)
+        
+        # Pooled connections to the dataset database for the sample queries
+        data_pool = get_pool(connection_string)
         
         # Get all schemas grouped by table
         schemas = db.query(DatasetSchema).filter(
@@ -168,9 +468,22 @@ def generate_metadata(dataset_id: int):
         
         print(f"Found {len(filtered_tables)} tables with {sum(len(cols) for cols in filtered_tables.values())} columns\n")
         
+        # Columns that already have a description, loaded once
+        described = {
+            (m.table_name, m.column_name)
+            for m in db.query(Metadata.table_name, Metadata.column_name).filter(
+                Metadata.dataset_id == dataset_id,
+                Metadata.description.isnot(None),
+                Metadata.description != ''
+            )
+        }
+        
+        # End the read transaction: the session must not sit idle in one while OpenAI responds
+        db.commit()
+        
         # Generate dataset summary
         print("🤖 Generating dataset summary...")
-        dataset_summary = generate_dataset_summary(dataset.name, filtered_tables)
+        dataset_summary = await generate_dataset_summary(dataset.name, filtered_tables)
         print(f"✅ Summary: {dataset_summary}\n")
         
         # Update dataset description if empty
@@ -179,14 +492,21 @@ def generate_metadata(dataset_id: int):
             db.commit()
             print("✅ Updated dataset description\n")
         
-        # Generate metadata for each column
+        # Nothing below needs the metadata DB until the results are saved, which
+        # with the Batch API can be up to 24h away: release its connection now
+        # and write the results through a fresh session
+        db.close()
+        
+        # Collect columns that still need a description
         total_columns = sum(len(cols) for cols in filtered_tables.values())
         current = 0
+        queued_tables = {}
         
         for table_name, columns in filtered_tables.items():
             print(f"\n📋 Processing table: {table_name} ({len(columns)} columns)")
             print("-" * 80)
             
+            table_pending = []
             for col in columns:
                 current += 1
                 column_name = col['column_name']
@@ -195,73 +515,116 @@ def generate_metadata(dataset_id: int):
                 print(f"  [{current}/{total_columns}] {column_name} ({data_type})...", end=" ")
                 
                 # Check if metadata already exists
-                existing = db.query(Metadata).filter(
-                    Metadata.dataset_id == dataset_id,
-                    Metadata.table_name == table_name,
-                    Metadata.column_name == column_name
-                ).first()
-                
-                if existing and existing.description:
+                if (table_name, column_name) in described:
                     print("⏭️  (already exists)")
                     continue
                 
-                # Get sample values
-                sample_values = get_sample_values(connection_string, table_name, column_name)
-                
-                # Generate description
-                description = generate_column_description(table_name, column_name, data_type, sample_values)
-                
-                # Save to database
-                if existing:
-                    existing.description = description
-                    existing.model_used = "gpt-4o-mini"
-                else:
-                    metadata = Metadata(
-                        dataset_id=dataset_id,
-                        table_name=table_name,
-                        column_name=column_name,
-                        description=description,
-                        model_used="gpt-4o-mini"
-                    )
-                    db.add(metadata)
-                
-                db.commit()
-                print("✅")
+                table_pending.append(col)
+                print("🕒 queued")
+            
+            if table_pending:
+                queued_tables[table_name] = table_pending
+        
+        # Fan out per table: sampling for one table overlaps OpenAI latency for
+        # another. Separate semaphores bound DB and OpenAI concurrency independently.
+        db_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TABLES)
+        openai_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        
+        def sample_table(table_name: str, column_names: list) -> dict:
+            conn = data_pool.getconn()
+            try:
+                return get_samples_for_table(conn, table_name, column_names)
+            finally:
+                data_pool.putconn(conn)
+        
+        async def process_table(table_name: str, table_pending: list) -> tuple:
+            async with db_semaphore:
+                samples = await asyncio.to_thread(
+                    sample_table, table_name, [col['column_name'] for col in table_pending]
+                )
+            table_jobs = [
+                (table_name, col, samples.get(col['column_name'], []))
+                for col in table_pending
+            ]
+            table_descriptions = None
+            if sync:
+                table_descriptions = await generate_column_descriptions(table_jobs, openai_semaphore)
+            return table_jobs, table_descriptions
+        
+        # Generate all descriptions (Batch API by default, concurrent realtime calls with --sync)
+        queued_count = sum(len(cols) for cols in queued_tables.values())
+        if queued_count and sync:
+            print(f"\n🤖 Generating {queued_count} descriptions ({COLUMNS_PER_PROMPT} columns/request, {MAX_CONCURRENT_REQUESTS} concurrent)...")
+        
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(process_table(table_name, table_pending))
+                for table_name, table_pending in queued_tables.items()
+            ]
+        
+        pending = []
+        descriptions = []
+        for task in tasks:
+            table_jobs, table_descriptions = task.result()
+            pending.extend(table_jobs)
+            if table_descriptions is not None:
+                descriptions.extend(table_descriptions)
+        
+        if pending and not sync:
+            print(f"\n🤖 Generating {len(pending)} descriptions via the Batch API (may take a while)...")
+            descriptions = await generate_column_descriptions_batch(pending)
+        
+        # Save to database in one commit, on a new session (rows without a
+        # description are updated in place)
+        db = next(get_db())
+        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+        if not dataset:
+            print(f"❌ Dataset {dataset_id} was deleted before the descriptions were ready")
+            return
+        existing_metadata = {
+            (m.table_name, m.column_name): m
+            for m in db.query(Metadata).filter(Metadata.dataset_id == dataset_id).all()
+        }
+        new_entries = []
+        for (table_name, col, _), description in zip(pending, descriptions):
+            existing = existing_metadata.get((table_name, col['column_name']))
+            if existing:
+                existing.description = description
+                existing.model_used = "gpt-4o-mini"
+            else:
+                new_entries.append(Metadata(
+                    dataset_id=dataset_id,
+                    table_name=table_name,
+                    column_name=col['column_name'],
+                    description=description,
+                    model_used="gpt-4o-mini"
+                ))
+        
+        db.add_all(new_entries)
+        db.commit()
+        print(f"✅ Saved {len(descriptions)} descriptions")
         
         print(f"\n{'='*80}")
         print(f"✅ Metadata generation complete!")
         print(f"{'='*80}\n")
         
-        # Generate metadata_text for the dataset
+        # Rebuild metadata_text through the shared per-table renderer, so later
+        # per-table rebuilds (generate_metadata.py, edit_descriptions.py) match it
         print("📝 Generating metadata_text summary...")
         
-        md_lines = [
-            f"# {dataset.name}\n",
-            f"{dataset.description}\n",
-            "---\n"
-        ]
+        descriptions_by_table = {}
+        for row in db.query(Metadata.table_name, Metadata.column_name, Metadata.description).filter(
+            Metadata.dataset_id == dataset_id
+        ):
+            if row.description:
+                descriptions_by_table.setdefault(row.table_name, {})[row.column_name] = row.description
         
-        for table_name, columns in filtered_tables.items():
-            md_lines.append(f"\n## Table: {table_name}\n")
-            md_lines.append(f"**Columns**: {len(columns)}\n\n")
-            md_lines.append("| Column | Type | Description |\n")
-            md_lines.append("|--------|------|-------------|\n")
-            
-            for col in columns:
-                # Get metadata
-                meta = db.query(Metadata).filter(
-                    Metadata.dataset_id == dataset_id,
-                    Metadata.table_name == table_name,
-                    Metadata.column_name == col['column_name']
-                ).first()
-                
-                desc = meta.description if meta else "No description"
-                md_lines.append(f"| `{col['column_name']}` | {col['data_type']} | {desc} |\n")
-        
-        metadata_text = "".join(md_lines)
-        dataset.metadata_text = metadata_text
+        rendered = rebuild_metadata_text(db, dataset, descriptions=descriptions_by_table)
         db.commit()
         
+        # Running MCP servers drop their cached copy of the old text
+        publish_schema_changed(dataset_id, rendered.keys())
+        
         print("✅ metadata_text saved to dataset\n")
         
     except Exception as e:
@@ -276,9 +639,10 @@ def generate_metadata(dataset_id: int):
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python generate_ai_metadata.py <dataset_id>")
+        print("Usage: python generate_ai_metadata.py <dataset_id> [--sync]")
+        print("  --sync  Use realtime API calls instead of the (cheaper, slower) Batch API")
         sys.exit(1)
     
     dataset_id = int(sys.argv[1])
-    generate_metadata(dataset_id)
+    asyncio.run(generate_metadata(dataset_id, sync='--sync' in sys.argv[2:]))
 
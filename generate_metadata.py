@@ -4,12 +4,19 @@ This creates a markdown summary of the schema that gets returned to LLM in ONE c
 """
 
 import sys
-from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import Dataset, DatasetSchema
+from app.metadata_text import rebuild_metadata_text, publish_schema_changed
+from app.models import Dataset
 
-def generate_metadata_text(dataset_id: int):
-    """Generate markdown metadata for a dataset"""
+
+def generate_metadata_text(dataset_id: int, table_name: str = None):
+    """
+    Generate markdown metadata for a dataset
+
+    Each table's section is cached in Dataset.metadata_text_parts. With
+    table_name, only that table's section is recomputed before the document
+    is reassembled; without it (or with no cached parts yet) every table is.
+    """
 
     db = next(get_db())
 
@@ -19,66 +26,30 @@ def generate_metadata_text(dataset_id: int):
         print(f"❌ Dataset {dataset_id} not found")
         return
 
-    print(f"📝 Generating metadata for: {dataset.name}")
-
-    # Get all schemas grouped by table
-    schemas = db.query(DatasetSchema).filter(
-        DatasetSchema.dataset_id == dataset_id
-    ).order_by(DatasetSchema.table_name, DatasetSchema.column_name).all()
+    print(f"📝 Generating metadata for: {dataset.name}" + (f" (table {table_name})" if table_name else ""))
 
-    # Group by table
-    tables = {}
-    for schema in schemas:
-        if schema.table_name not in tables:
-            tables[schema.table_name] = []
-        tables[schema.table_name].append(schema)
-
-    # Filter out metadata tables
-    metadata_tables = ['datasets', 'dataset_schemas', 'metadata', 'query_logs']
-    filtered_tables = {k: v for k, v in tables.items() if k not in metadata_tables}
-
-    if not filtered_tables:
+    filtered_tables = rebuild_metadata_text(db, dataset, [table_name] if table_name else None)
+    if not filtered_tables and (not table_name or not dataset.metadata_text_parts):
         print("⚠️  Warning: No user data tables found (all tables are metadata tables)")
         print("   This means you connected to the metadata database instead of your data database")
         return
 
-    # Build markdown
-    md_lines = [
-        f"# {dataset.name}\n",
-        f"{dataset.description or 'No description provided'}\n",
-        f"---\n"
-    ]
-
-    for table_name, columns in filtered_tables.items():
-        md_lines.append(f"\n## Table: `{table_name}`\n")
-        md_lines.append(f"**{len(columns)} columns**\n")
-        md_lines.append("\n| Column | Type | Nullable | Description |")
-        md_lines.append("\n|--------|------|----------|-------------|")
-
-        for col in columns:
-            nullable = "Yes" if col.is_nullable else "No"
-            # TODO: Add column descriptions (user can manually edit or add via UI)
-            description = "Add description here"
-            md_lines.append(f"\n| `{col.column_name}` | {col.data_type} | {nullable} | {description} |")
-
-        md_lines.append("\n")
-
-    metadata_text = "".join(md_lines)
-
-    # Update dataset
-    dataset.metadata_text = metadata_text
+    metadata_text = dataset.metadata_text
     db.commit()
 
+    # Running servers drop their cached copy of the schema
+    publish_schema_changed(dataset_id, filtered_tables.keys() | ({table_name} if table_name else set()))
+
     print(f"✅ Metadata generated ({len(metadata_text)} characters)")
     print(f"\nPreview:\n")
     print(metadata_text[:500] + "..." if len(metadata_text) > 500 else metadata_text)
     print(f"\n🎉 Dataset '{dataset.name}' metadata ready!")
-    print(f"   - {len(filtered_tables)} tables (metadata tables filtered out)")
-    print(f"   - {sum(len(cols) for cols in filtered_tables.values())} columns")
+    print(f"   - {len(dataset.metadata_text_parts)} tables (metadata tables filtered out)")
+    print(f"   - {sum(len(cols) for cols in filtered_tables.values())} columns regenerated")
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python3 generate_metadata.py <dataset_id>")
+        print("Usage: python3 generate_metadata.py <dataset_id> [table_name]")
         print("\nAvailable datasets:")
         db = next(get_db())
         datasets = db.query(Dataset).all()
@@ -87,4 +58,5 @@ if __name__ == "__main__":
         sys.exit(1)
 
     dataset_id = int(sys.argv[1])
-    generate_metadata_text(dataset_id)
+    table_name = sys.argv[2] if len(sys.argv) > 2 else None
+    generate_metadata_text(dataset_id, table_name)
@@ -4,9 +4,138 @@ Load sample data into cloud PostgreSQL database
 """
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import psycopg2
+from psycopg2.extras import execute_values
+from app.pool import get_pool, pooled_connection
 
-def load_data_from_local():
+COLUMNS = """
+        vtionid, package, duration_sum, event_count, event_time_range,
+        day_of_week, app_name, cat, genre, date, population, age_bucket,
+        nccs_class, gender, state_grp, weights, type
+"""
+
+INDEXES = {
+    "idx_date": "date",
+    "idx_type": "type",
+    "idx_cat": "cat",
+    "idx_age_bucket": "age_bucket",
+    "idx_gender": "gender",
+    "idx_state_grp": "state_grp",
+}
+
+# Bytes the cloud-side COPY reads from the pipe per chunk; the pipe plus this
+# buffer is all the loader holds in memory, whatever the table size
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# INSERT fallback: rows fetched per batch, and rows per INSERT ... VALUES statement
+INSERT_BATCH_SIZE = 50_000
+INSERT_PAGE_SIZE = 1000
+
+# Attempts per index; a failed CONCURRENTLY build leaves an INVALID index that must be dropped first
+INDEX_BUILD_ATTEMPTS = 2
+
+
+def create_index_concurrently(db_url: str, index_name: str, column: str) -> str:
+    """Build one index with CREATE INDEX CONCURRENTLY on its own autocommit connection"""
+    with pooled_connection(db_url) as conn:
+        conn.autocommit = True  # CONCURRENTLY cannot run inside a transaction
+        try:
+            cur = conn.cursor()
+            for attempt in range(INDEX_BUILD_ATTEMPTS):
+                try:
+                    cur.execute(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON digital_insights({column});"
+                    )
+                    return index_name
+                except psycopg2.Error:
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name};")
+                    if attempt == INDEX_BUILD_ATTEMPTS - 1:
+                        raise
+        finally:
+            conn.autocommit = False
+
+
+def copy_rows(local_conn, cloud_conn) -> int:
+    """
+    Stream rows local -> cloud with binary COPY through an OS pipe
+
+    A background thread writes COPY TO STDOUT into the pipe while the cloud
+    side reads it as COPY FROM STDIN. Rows are never materialized
+    client-side, so no server-side cursor is needed.
+    """
+    local_cur = local_conn.cursor()
+    cloud_cur = cloud_conn.cursor()
+    read_fd, write_fd = os.pipe()
+    export_errors = []
+    
+    def export_local():
+        with os.fdopen(write_fd, 'wb') as pipe_w:
+            try:
+                local_cur.copy_expert(
+                    f"COPY (SELECT {COLUMNS} FROM digital_insights) TO STDOUT WITH (FORMAT BINARY)",
+                    pipe_w
+                )
+            except Exception as e:
+                export_errors.append(e)
+    
+    exporter = threading.Thread(target=export_local, daemon=True)
+    exporter.start()
+    
+    # Closing the read end on failure unblocks the exporter with a broken pipe
+    with os.fdopen(read_fd, 'rb') as pipe_r:
+        cloud_cur.copy_expert(
+            f"COPY digital_insights ({COLUMNS}) FROM STDIN WITH (FORMAT BINARY)",
+            pipe_r,
+            size=COPY_CHUNK_SIZE
+        )
+    exporter.join()
+    if export_errors:
+        raise export_errors[0]
+    cloud_conn.commit()
+    
+    total_rows = cloud_cur.rowcount
+    local_cur.close()
+    cloud_cur.close()
+    return total_rows
+
+
+def insert_rows(local_conn, cloud_conn) -> int:
+    """
+    Load rows with multi-row INSERTs, for targets where COPY is unavailable
+    (e.g. PgBouncer in statement mode)
+
+    Reads through a server-side cursor so only one batch is held in memory,
+    and sends each page of rows as a single INSERT ... VALUES statement.
+    """
+    local_cur = local_conn.cursor(name='stream_di')  # named cursors need a transaction (not autocommit)
+    local_cur.itersize = 10000
+    cloud_cur = cloud_conn.cursor()
+    
+    local_cur.execute(f"SELECT {COLUMNS} FROM digital_insights")
+    
+    total_rows = 0
+    while True:
+        batch = local_cur.fetchmany(INSERT_BATCH_SIZE)
+        if not batch:
+            break
+        execute_values(
+            cloud_cur,
+            f"INSERT INTO digital_insights ({COLUMNS}) VALUES %s",
+            batch,
+            page_size=INSERT_PAGE_SIZE
+        )
+        cloud_conn.commit()
+        total_rows += len(batch)
+        print(f"Inserted {total_rows} rows...")
+    
+    local_cur.close()
+    cloud_cur.close()
+    return total_rows
+
+
+def load_data_from_local(use_copy: bool = True):
     """Export data from local PostgreSQL and load to cloud"""
     
     # Get cloud database URL from environment
@@ -29,9 +158,9 @@ def load_data_from_local():
     )
     
     print("Connecting to cloud database...")
-    cloud_conn = psycopg2.connect(cloud_db_url)
+    cloud_pool = get_pool(cloud_db_url)
+    cloud_conn = cloud_pool.getconn()
     
-    local_cur = local_conn.cursor()
     cloud_cur = cloud_conn.cursor()
     
     # Create table in cloud database
@@ -62,60 +191,29 @@ def load_data_from_local():
     cloud_conn.commit()
     print("Table created successfully")
     
-    # Fetch data from local database
-    print("Fetching data from local database...")
-    local_cur.execute("""
-        SELECT vtionid, package, duration_sum, event_count, event_time_range,
-               day_of_week, app_name, cat, genre, date, population, age_bucket,
-               nccs_class, gender, state_grp, weights, type
-        FROM digital_insights
-    """)
-    
-    # Insert data in batches
-    print("Inserting data into cloud database...")
-    batch_size = 10000
-    total_rows = 0
-    
-    insert_query = """
-    INSERT INTO digital_insights (
-        vtionid, package, duration_sum, event_count, event_time_range,
-        day_of_week, app_name, cat, genre, date, population, age_bucket,
-        nccs_class, gender, state_grp, weights, type
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
+    # Drop indexes so the load doesn't maintain them row by row
+    print("Dropping indexes before load...")
+    for index_name in INDEXES:
+        cloud_cur.execute(f"DROP INDEX IF EXISTS {index_name};")
+    cloud_conn.commit()
     
-    batch = []
-    for row in local_cur:
-        batch.append(row)
-        
-        if len(batch) >= batch_size:
-            cloud_cur.executemany(insert_query, batch)
-            cloud_conn.commit()
-            total_rows += len(batch)
-            print(f"Inserted {total_rows} rows...")
-            batch = []
-    
-    # Insert remaining rows
-    if batch:
-        cloud_cur.executemany(insert_query, batch)
-        cloud_conn.commit()
-        total_rows += len(batch)
-        print(f"Inserted {total_rows} rows...")
+    if use_copy:
+        print("Copying data into cloud database...")
+        total_rows = copy_rows(local_conn, cloud_conn)
+    else:
+        print("Inserting data into cloud database...")
+        total_rows = insert_rows(local_conn, cloud_conn)
+    print(f"Loaded {total_rows} rows")
     
-    # Create indexes
+    # Create indexes in parallel, one connection each
     print("Creating indexes...")
-    indexes = [
-        "CREATE INDEX IF NOT EXISTS idx_date ON digital_insights(date);",
-        "CREATE INDEX IF NOT EXISTS idx_type ON digital_insights(type);",
-        "CREATE INDEX IF NOT EXISTS idx_cat ON digital_insights(cat);",
-        "CREATE INDEX IF NOT EXISTS idx_age_bucket ON digital_insights(age_bucket);",
-        "CREATE INDEX IF NOT EXISTS idx_gender ON digital_insights(gender);",
-        "CREATE INDEX IF NOT EXISTS idx_state_grp ON digital_insights(state_grp);",
-    ]
-    
-    for index_query in indexes:
-        cloud_cur.execute(index_query)
-    cloud_conn.commit()
+    with ThreadPoolExecutor(max_workers=len(INDEXES)) as executor:
+        futures = [
+            executor.submit(create_index_concurrently, cloud_db_url, index_name, column)
+            for index_name, column in INDEXES.items()
+        ]
+        for future in as_completed(futures):
+            print(f"  Created {future.result()}")
     print("Indexes created successfully")
     
     # Verify the data
@@ -124,14 +222,14 @@ def load_data_from_local():
     print(f"\nData migration complete! Total rows in cloud database: {count}")
     
     # Close connections
-    local_cur.close()
     local_conn.close()
     cloud_cur.close()
-    cloud_conn.close()
+    cloud_pool.putconn(cloud_conn)
 
 if __name__ == "__main__":
     try:
-        load_data_from_local()
+        # --no-copy: use multi-row INSERTs where the target can't accept COPY
+        load_data_from_local(use_copy='--no-copy' not in sys.argv[1:])
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         import traceback
@@ -4,12 +4,13 @@ Run this to profile a dataset without Celery/Redis
 """
 
 import sys
-import psycopg2
+from itertools import groupby
+from operator import itemgetter
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.models import Dataset, DatasetSchema
-from app.encryption import get_encryption_manager
-from app.database import get_db
+from app.database import get_db, get_dataset_connection_string
+from app.pool import pooled_connection
 import os
 from dotenv import load_dotenv
 
@@ -30,69 +31,65 @@ def profile_dataset(dataset_id: int):
     print(f"📊 Profiling dataset: {dataset.name} (ID: {dataset_id})")
 
     # Decrypt connection string
-    encryption_manager = get_encryption_manager()
-    connection_string = encryption_manager.decrypt(dataset.connection_string_encrypted)
+    connection_string = get_dataset_connection_string(dataset_id)
 
     print(f"🔗 Connecting to database...")
 
     try:
-        # Connect to user database
-        conn = psycopg2.connect(connection_string)
-        cursor = conn.cursor()
-
-        # Get all tables
-        cursor.execute("""
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-            AND table_type = 'BASE TABLE'
-        """)
-        tables = cursor.fetchall()
+        # Get every column of every base table in one query, grouped by table
+        with pooled_connection(connection_string) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT
+                    c.table_name,
+                    c.column_name,
+                    c.data_type,
+                    c.is_nullable = 'YES' AS is_nullable
+                FROM information_schema.columns c
+                JOIN information_schema.tables t
+                    ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+                WHERE c.table_schema = 'public'
+                AND t.table_type = 'BASE TABLE'
+                ORDER BY c.table_name, c.ordinal_position
+            """)
+            rows = cursor.fetchall()
+            cursor.close()
+
+        tables = [
+            (table_name, [row[1:] for row in table_rows])
+            for table_name, table_rows in groupby(rows, key=itemgetter(0))
+        ]
 
         print(f"✅ Found {len(tables)} tables")
 
-        total_columns = 0
+        # Existing (table, column) pairs in one query instead of one per column
+        existing = {
+            (row.table_name, row.column_name)
+            for row in db.query(DatasetSchema.table_name, DatasetSchema.column_name).filter(
+                DatasetSchema.dataset_id == dataset_id
+            )
+        }
+        new_rows = []
 
-        for (table_name,) in tables:
+        for table_name, columns in tables:
             print(f"  📋 Profiling table: {table_name}")
 
-            # Get columns for this table
-            cursor.execute("""
-                SELECT
-                    column_name,
-                    data_type,
-                    is_nullable
-                FROM information_schema.columns
-                WHERE table_schema = 'public'
-                AND table_name = %s
-                ORDER BY ordinal_position
-            """, (table_name,))
-
-            columns = cursor.fetchall()
-
-            for column_name, data_type, is_nullable in columns:
-                # Check if already exists
-                existing = db.query(DatasetSchema).filter(
-                    DatasetSchema.dataset_id == dataset_id,
-                    DatasetSchema.table_name == table_name,
-                    DatasetSchema.column_name == column_name
-                ).first()
-
-                if not existing:
-                    schema = DatasetSchema(
-                        dataset_id=dataset_id,
-                        table_name=table_name,
-                        column_name=column_name,
-                        data_type=data_type,
-                        is_nullable=(is_nullable == 'YES')
-                    )
-                    db.add(schema)
-                    total_columns += 1
-
+            new_rows.extend(
+                {
+                    'dataset_id': dataset_id,
+                    'table_name': table_name,
+                    'column_name': column_name,
+                    'data_type': data_type,
+                    'is_nullable': is_nullable
+                }
+                for column_name, data_type, is_nullable in columns
+                if (table_name, column_name) not in existing
+            )
+
+        # Plain mappings go out as batched multi-row INSERTs (no ORM objects to build)
+        db.bulk_insert_mappings(DatasetSchema, new_rows)
         db.commit()
-
-        cursor.close()
-        conn.close()
+        total_columns = len(new_rows)
 
         print(f"✅ Profiled {total_columns} columns successfully!")
         print(f"🎉 Dataset '{dataset.name}' is now ready!")
@@ -15,16 +15,19 @@ import traceback
 from dotenv import load_dotenv
 load_dotenv()
 
+import orjson
 import uvicorn
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 # Initialize FastAPI
 app = FastAPI(
     title="MCP Analytics Server",
     description="Multi-dataset analytics with Web UI and MCP protocol",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -36,8 +39,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (query result tables, schema markdown, UI pages)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Import database and UI routes
 from app.database import init_database
+from app.responses import (
+    call_tool, dispatch_batch, json_bytes_response, jsonrpc_error,
+    jsonrpc_response, jsonrpc_result_frame, jsonrpc_tool_result
+)
+from app.pool import close_all_pools, configure_threadpool
 from app.ui.routes import router as ui_router
 
 # Mount UI
@@ -50,21 +61,35 @@ async def startup():
     print("=" * 70)
     print("🚀 MCP Analytics Server - Production")
     print("=" * 70)
+    configure_threadpool()
 
-    try:
-        init_database()
+    async def load_dataset_cache():
+        from server import reload_datasets_cache
+        await asyncio.to_thread(reload_datasets_cache)
+
+    # Schema init and the dataset cache don't depend on each other
+    db_result, cache_result = await asyncio.gather(
+        asyncio.to_thread(init_database),
+        load_dataset_cache(),
+        return_exceptions=True
+    )
+
+    if isinstance(db_result, Exception):
+        print(f"⚠️  Database initialization warning: {db_result}")
+    else:
         print("✅ Database initialized")
-    except Exception as e:
-        print(f"⚠️  Database initialization warning: {e}")
 
-    # Load dataset cache
-    try:
-        from server import reload_datasets_cache, listen_for_dataset_changes
-        reload_datasets_cache()
-        asyncio.create_task(listen_for_dataset_changes())
+    if isinstance(cache_result, Exception):
+        print(f"⚠️  Cache initialization warning: {cache_result}")
+    else:
+        from server import start_background_tasks
+        app.state.background_tasks = await start_background_tasks()
         print("✅ Dataset cache loaded")
-    except Exception as e:
-        print(f"⚠️  Cache initialization warning: {e}")
+
+    # Open dataset pools now so the first queries skip connection + codec setup
+    from app.services.parallel_query_executor import parallel_executor
+    warmed = await parallel_executor.warm_pools()
+    print(f"✅ Warmed {warmed} dataset connection pools")
 
     print()
     print("📍 Endpoints:")
@@ -81,21 +106,32 @@ async def startup():
     print()
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the background tasks and close the shared connection pools"""
+    from server import stop_background_tasks
+    await stop_background_tasks(getattr(app.state, "background_tasks", None))
+    close_all_pools()
+
+
 @app.get("/")
 async def root():
     """Redirect to UI"""
     return RedirectResponse(url="/ui")
 
 
+_HEALTH_JSON = orjson.dumps({
+    "status": "healthy",
+    "version": "2.0.0",
+    "features": ["ui", "mcp", "encryption", "logging"],
+    "row_limit": int(os.getenv('MAX_ROWS', 40))
+})
+
+
 @app.get("/health")
 async def health():
     """Health check"""
-    return {
-        "status": "healthy",
-        "version": "2.0.0",
-        "features": ["ui", "mcp", "encryption", "logging"],
-        "row_limit": int(os.getenv('MAX_ROWS', 40))
-    }
+    return json_bytes_response(_HEALTH_JSON)
 
 
 # ============================================================================
@@ -117,17 +153,248 @@ except ImportError as e:
     MCP_TOOLS_AVAILABLE = False
 
 
+# tools/call argument handling: each takes the raw arguments dict and returns
+# (tool, kwargs), raising ValueError for missing or malformed params
+
+def _prepare_list_available_datasets(arguments: dict) -> tuple:
+    return list_available_datasets, {}
+
+
+def _prepare_get_dataset_schema(arguments: dict) -> tuple:
+    dataset_id = arguments.get("dataset_id")
+    if dataset_id is None:
+        raise ValueError("dataset_id is required")
+    return get_dataset_schema, {"dataset_id": int(dataset_id)}
+
+
+def _prepare_query_dataset(arguments: dict) -> tuple:
+    dataset_id = arguments.get("dataset_id")
+    query = arguments.get("query")
+    if dataset_id is None or query is None:
+        raise ValueError("dataset_id and query are required")
+    apply_weights = arguments.get("apply_weights", True)
+    return query_dataset, {
+        "dataset_id": int(dataset_id),
+        "query": str(query),
+        "apply_weights": bool(apply_weights)
+    }
+
+
+def _prepare_get_dataset_sample(arguments: dict) -> tuple:
+    dataset_id = arguments.get("dataset_id")
+    table_name = arguments.get("table_name")
+    if dataset_id is None or table_name is None:
+        raise ValueError("dataset_id and table_name are required")
+    limit = arguments.get("limit", 10)
+    return get_dataset_sample, {
+        "dataset_id": int(dataset_id),
+        "table_name": str(table_name),
+        "limit": int(limit)
+    }
+
+
+def _prepare_get_context(arguments: dict) -> tuple:
+    level = arguments.get("level", 0)
+    dataset_id = arguments.get("dataset_id")
+    return get_context, {
+        "level": int(level),
+        "dataset_id": int(dataset_id) if dataset_id is not None else None
+    }
+
+
+# Tool name -> argument handler (also the set of names tools/call accepts)
+_DISPATCH = {
+    "list_available_datasets": _prepare_list_available_datasets,
+    "get_dataset_schema": _prepare_get_dataset_schema,
+    "query_dataset": _prepare_query_dataset,
+    "get_dataset_sample": _prepare_get_dataset_sample,
+    "get_context": _prepare_get_context
+}
+
+
+# Static JSON-RPC results, serialized once at import instead of on every handshake
+_INITIALIZE_RESULT_JSON = orjson.dumps({
+    "protocolVersion": "2024-11-05",
+    "serverInfo": {
+        "name": "mcp-analytics-phase2-optimized",
+        "version": "2.0.0"
+    },
+    "capabilities": {
+        "tools": {},
+    }
+})
+
+_TOOLS_LIST_RESULT_JSON = orjson.dumps({
+    "tools": [
+        {
+            "name": "list_available_datasets",
+            "description": "List all available datasets with metadata",
+            "inputSchema": {
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
+        },
+        {
+            "name": "get_dataset_schema",
+            "description": "Get complete schema for a dataset with AI-generated descriptions",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "dataset_id": {
+                        "type": "integer",
+                        "description": "ID of the dataset"
+                    }
+                },
+                "required": ["dataset_id"]
+            }
+        },
+        {
+            "name": "query_dataset",
+            "description": "Execute SQL query on dataset (40 row limit, SELECT only)",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "dataset_id": {
+                        "type": "integer",
+                        "description": "ID of the dataset"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "SQL SELECT query"
+                    },
+                    "apply_weights": {
+                        "type": "boolean",
+                        "description": "Apply weighting if weight column detected",
+                        "default": True
+                    }
+                },
+                "required": ["dataset_id", "query"]
+            }
+        },
+        {
+            "name": "get_dataset_sample",
+            "description": "Get sample data from a specific table",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "dataset_id": {
+                        "type": "integer",
+                        "description": "ID of the dataset"
+                    },
+                    "table_name": {
+                        "type": "string",
+                        "description": "Name of the table"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Number of sample rows (max 100)",
+                        "default": 10
+                    }
+                },
+                "required": ["dataset_id", "table_name"]
+            }
+        },
+        {
+            "name": "get_context",
+            "description": "Get progressive context about server and datasets",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "level": {
+                        "type": "integer",
+                        "description": "Context level (0=rules, 1=datasets, 2=schema, 3=full)",
+                        "default": 0
+                    },
+                    "dataset_id": {
+                        "type": "integer",
+                        "description": "Dataset ID (required for level 2-3)"
+                    }
+                },
+                "required": []
+            }
+        }
+    ]
+})
+
+
+async def _dispatch_single(entry) -> tuple:
+    """
+    Handle one JSON-RPC request object
+
+    Returns:
+        (payload, status_code) where payload is a response dict, or the
+        already-serialized bytes for the cached initialize/tools/list results
+    """
+    if not isinstance(entry, dict):
+        return jsonrpc_error(-32600, "Invalid Request"), 400
+
+    method = entry.get("method", "")
+    request_id = entry.get("id")
+
+    # Handle MCP protocol methods
+    if method == "initialize":
+        return jsonrpc_result_frame(_INITIALIZE_RESULT_JSON, request_id), 200
+
+    elif method == "tools/list":
+        # Return available MCP tools
+        return jsonrpc_result_frame(_TOOLS_LIST_RESULT_JSON, request_id), 200
+
+    elif method == "tools/call":
+        if not MCP_TOOLS_AVAILABLE:
+            return jsonrpc_error(-32000, "MCP tools not available - check server logs", request_id), 500
+
+        # Execute a tool
+        params = entry.get("params", {})
+        tool_name = params.get("name")
+        arguments = params.get("arguments", {})
+
+        # Validate tool name
+        prepare = _DISPATCH.get(tool_name)
+        if prepare is None:
+            return jsonrpc_error(
+                -32601,
+                f"Tool not found: {tool_name}. Available: {', '.join(sorted(_DISPATCH))}",
+                request_id
+            ), 404
+
+        # Call the tool with error handling
+        try:
+            fn, kwargs = prepare(arguments)
+
+            result = await call_tool(fn, kwargs)
+
+            # Return successful result
+            return jsonrpc_tool_result(result, request_id), 200
+
+        except ValueError as e:
+            return jsonrpc_error(-32602, f"Invalid params: {str(e)}", request_id), 400
+
+        except Exception as e:
+            # Log the full error for debugging
+            print(f"❌ Tool execution error: {tool_name}")
+            print(traceback.format_exc())
+
+            return jsonrpc_error(-32000, f"Tool execution failed: {str(e)}", request_id), 500
+
+    else:
+        # Unknown method
+        return jsonrpc_error(-32601, f"Method not found: {method}", request_id), 404
+
+
 @app.api_route("/mcp", methods=["GET", "POST", "OPTIONS"])
 async def mcp_endpoint(request: Request):
     """
     MCP Protocol Endpoint - JSON-RPC 2.0
 
+    Accepts a single request object or a batch (JSON array) of them.
+
     Connection URL: https://your-domain.com/mcp
     """
     try:
         # Handle OPTIONS for CORS preflight
         if request.method == "OPTIONS":
-            return JSONResponse(
+            return ORJSONResponse(
                 {"status": "ok"},
                 headers={
                     "Access-Control-Allow-Origin": "*",
@@ -138,7 +405,7 @@ async def mcp_endpoint(request: Request):
 
         # Handle GET for basic info
         if request.method == "GET":
-            return JSONResponse({
+            return ORJSONResponse({
                 "name": "mcp-analytics-phase2-optimized",
                 "version": "2.0.0",
                 "protocol": "json-rpc-2.0",
@@ -148,272 +415,21 @@ async def mcp_endpoint(request: Request):
 
         # Handle POST for JSON-RPC requests
         try:
-            body = await request.json()
+            body = orjson.loads(await request.body())
         except Exception as e:
-            return JSONResponse({
-                "jsonrpc": "2.0",
-                "error": {"code": -32700, "message": f"Parse error: {str(e)}"},
-                "id": None
-            }, status_code=400)
-
-        method = body.get("method", "")
-        request_id = body.get("id")
-
-        # Handle MCP protocol methods
-        if method == "initialize":
-            return JSONResponse({
-                "jsonrpc": "2.0",
-                "result": {
-                    "protocolVersion": "2024-11-05",
-                    "serverInfo": {
-                        "name": "mcp-analytics-phase2-optimized",
-                        "version": "2.0.0"
-                    },
-                    "capabilities": {
-                        "tools": {},
-                    }
-                },
-                "id": request_id
-            })
-
-        elif method == "tools/list":
-            # Return available MCP tools
-            tools = [
-                {
-                    "name": "list_available_datasets",
-                    "description": "List all available datasets with metadata",
-                    "inputSchema": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
-                },
-                {
-                    "name": "get_dataset_schema",
-                    "description": "Get complete schema for a dataset with AI-generated descriptions",
-                    "inputSchema": {
-                        "type": "object",
-                        "properties": {
-                            "dataset_id": {
-                                "type": "integer",
-                                "description": "ID of the dataset"
-                            }
-                        },
-                        "required": ["dataset_id"]
-                    }
-                },
-                {
-                    "name": "query_dataset",
-                    "description": "Execute SQL query on dataset (40 row limit, SELECT only)",
-                    "inputSchema": {
-                        "type": "object",
-                        "properties": {
-                            "dataset_id": {
-                                "type": "integer",
-                                "description": "ID of the dataset"
-                            },
-                            "query": {
-                                "type": "string",
-                                "description": "SQL SELECT query"
-                            },
-                            "apply_weights": {
-                                "type": "boolean",
-                                "description": "Apply weighting if weight column detected",
-                                "default": True
-                            }
-                        },
-                        "required": ["dataset_id", "query"]
-                    }
-                },
-                {
-                    "name": "get_dataset_sample",
-                    "description": "Get sample data from a specific table",
-                    "inputSchema": {
-                        "type": "object",
-                        "properties": {
-                            "dataset_id": {
-                                "type": "integer",
-                                "description": "ID of the dataset"
-                            },
-                            "table_name": {
-                                "type": "string",
-                                "description": "Name of the table"
-                            },
-                            "limit": {
-                                "type": "integer",
-                                "description": "Number of sample rows (max 100)",
-                                "default": 10
-                            }
-                        },
-                        "required": ["dataset_id", "table_name"]
-                    }
-                },
-                {
-                    "name": "get_context",
-                    "description": "Get progressive context about server and datasets",
-                    "inputSchema": {
-                        "type": "object",
-                        "properties": {
-                            "level": {
-                                "type": "integer",
-                                "description": "Context level (0=rules, 1=datasets, 2=schema, 3=full)",
-                                "default": 0
-                            },
-                            "dataset_id": {
-                                "type": "integer",
-                                "description": "Dataset ID (required for level 2-3)"
-                            }
-                        },
-                        "required": []
-                    }
-                }
-            ]
+            return ORJSONResponse(jsonrpc_error(-32700, f"Parse error: {str(e)}"), status_code=400)
 
-            return JSONResponse({
-                "jsonrpc": "2.0",
-                "result": {"tools": tools},
-                "id": request_id
-            })
+        if isinstance(body, list):
+            return await dispatch_batch(body, _dispatch_single)
 
-        elif method == "tools/call":
-            if not MCP_TOOLS_AVAILABLE:
-                return JSONResponse({
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32000,
-                        "message": "MCP tools not available - check server logs"
-                    },
-                    "id": request_id
-                }, status_code=500)
-
-            # Execute a tool
-            params = body.get("params", {})
-            tool_name = params.get("name")
-            arguments = params.get("arguments", {})
-
-            # Validate tool name
-            valid_tools = [
-                "list_available_datasets",
-                "get_dataset_schema",
-                "query_dataset",
-                "get_dataset_sample",
-                "get_context"
-            ]
-
-            if tool_name not in valid_tools:
-                return JSONResponse({
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32601,
-                        "message": f"Tool not found: {tool_name}. Available: {', '.join(valid_tools)}"
-                    },
-                    "id": request_id
-                }, status_code=404)
-
-            # Call the tool with error handling
-            try:
-                if tool_name == "list_available_datasets":
-                    result = await list_available_datasets()
-
-                elif tool_name == "get_dataset_schema":
-                    dataset_id = arguments.get("dataset_id")
-                    if dataset_id is None:
-                        raise ValueError("dataset_id is required")
-                    result = await get_dataset_schema(dataset_id=int(dataset_id))
-
-                elif tool_name == "query_dataset":
-                    dataset_id = arguments.get("dataset_id")
-                    query = arguments.get("query")
-                    if dataset_id is None or query is None:
-                        raise ValueError("dataset_id and query are required")
-                    apply_weights = arguments.get("apply_weights", True)
-                    result = await query_dataset(
-                        dataset_id=int(dataset_id),
-                        query=str(query),
-                        apply_weights=bool(apply_weights)
-                    )
-
-                elif tool_name == "get_dataset_sample":
-                    dataset_id = arguments.get("dataset_id")
-                    table_name = arguments.get("table_name")
-                    if dataset_id is None or table_name is None:
-                        raise ValueError("dataset_id and table_name are required")
-                    limit = arguments.get("limit", 10)
-                    result = await get_dataset_sample(
-                        dataset_id=int(dataset_id),
-                        table_name=str(table_name),
-                        limit=int(limit)
-                    )
-
-                elif tool_name == "get_context":
-                    level = arguments.get("level", 0)
-                    dataset_id = arguments.get("dataset_id")
-                    result = await get_context(
-                        level=int(level),
-                        dataset_id=int(dataset_id) if dataset_id is not None else None
-                    )
-
-                # Return successful result
-                return JSONResponse({
-                    "jsonrpc": "2.0",
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": result
-                            }
-                        ]
-                    },
-                    "id": request_id
-                })
-
-            except ValueError as e:
-                return JSONResponse({
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32602,
-                        "message": f"Invalid params: {str(e)}"
-                    },
-                    "id": request_id
-                }, status_code=400)
-
-            except Exception as e:
-                # Log the full error for debugging
-                print(f"❌ Tool execution error: {tool_name}")
-                print(traceback.format_exc())
-
-                return JSONResponse({
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32000,
-                        "message": f"Tool execution failed: {str(e)}"
-                    },
-                    "id": request_id
-                }, status_code=500)
-
-        else:
-            # Unknown method
-            return JSONResponse({
-                "jsonrpc": "2.0",
-                "error": {
-                    "code": -32601,
-                    "message": f"Method not found: {method}"
-                },
-                "id": request_id
-            }, status_code=404)
+        payload, status_code = await _dispatch_single(body)
+        return jsonrpc_response(request, payload, status_code)
 
     except Exception as e:
         print(f"❌ MCP endpoint error: {str(e)}")
         print(traceback.format_exc())
 
-        return JSONResponse({
-            "jsonrpc": "2.0",
-            "error": {
-                "code": -32000,
-                "message": f"Internal server error: {str(e)}"
-            },
-            "id": None
-        }, status_code=500)
+        return ORJSONResponse(jsonrpc_error(-32000, f"Internal server error: {str(e)}"), status_code=500)
 
 
 if __name__ == "__main__":
@@ -427,8 +443,11 @@ if __name__ == "__main__":
     print()
 
     uvicorn.run(
-        app,
+        "production_server:app",
         host="0.0.0.0",
         port=port,
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),  # Each worker process gets its own pools
         log_level="info"
     )
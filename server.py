@@ -13,33 +13,43 @@ New Features:
 - Query logging to database
 """
 import os
+import hashlib
+import re
 import argparse
-import json
+import orjson
 import time
 import asyncio
-from typing import Any, Dict, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from uuid import uuid4
 from dotenv import load_dotenv
 from fastmcp import FastMCP
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 # Load environment variables
 load_dotenv()
 
-from app.database import get_db, metadata_engine
+from app.database import (
+    get_db, metadata_engine, get_dataset_connection_string,
+    invalidate_dataset_connection_string, get_active_dataset_connection, build_sample_query
+)
 from app.models import Dataset, DatasetSchema, Metadata
-from app.encryption import get_encryption_manager
+from app.events import DATASET_CHANGED_CHANNEL
+from app.metadata_text import SCHEMA_CHANGED_CHANNEL
 from app.services.response_formatter import ResponseFormatter
 from app.services.context_service import context_service
 from app.services.weighting_service import weighting_service
 from app.services.query_logger import query_logger
 from app.services.parallel_query_executor import parallel_executor
-import sqlparse
-import psycopg2
+from app.pool import pooled_connection
+from app.query_validation import validate_query, needs_limit
 
 # Security configuration
 MAX_ROWS = int(os.getenv('MAX_ROWS', 40))  # Changed to 40 rows limit
 MAX_RAW_ROWS = 40  # Maximum rows for all queries - changed to 40
-ALLOWED_STATEMENTS = ['SELECT']
 
 # Initialize FastMCP server
 mcp = FastMCP(name="mcp-analytics-phase2-optimized")
@@ -47,61 +57,247 @@ mcp = FastMCP(name="mcp-analytics-phase2-optimized")
 # Global formatter instance
 formatter = ResponseFormatter()
 
+# get_context(level=0) is fixed text, so it's rendered once
+GLOBAL_CONTEXT = context_service.get_context_level_0()
+
+# list_available_datasets response as (expires_at, markdown, dataset_count); rebuilt
+# by reload_datasets_cache, dropped by the hot-reload listener when a dataset is
+# (de)activated or deleted, and never kept past the Redis copy's expiry
+_dataset_list_cache: Optional[tuple] = None
+
+# get_dataset_schema responses by dataset_id as (expires_at, metadata_text);
+# cleared by the hot-reload listener when datasets or schemas change
+SCHEMA_CACHE_TTL_SECONDS = 300
+_schema_cache: Dict[int, tuple] = {}
+
+# Dataset stats by dataset_id as (expires_at, table_count, row_count). The row
+# count is an exact COUNT(*), so it's cached for the TTL and concurrent
+# list_available_datasets calls for a dataset share one count
+DATASET_STATS_TTL_SECONDS = 60
+_dataset_stats_cache: Dict[int, tuple] = {}
+_dataset_stats_locks: Dict[int, threading.Lock] = {}
+
+# Threads for gathering per-dataset stats in get_active_datasets
+DATASET_STATS_WORKERS = 8
+_dataset_stats_executor = ThreadPoolExecutor(max_workers=DATASET_STATS_WORKERS, thread_name_prefix="dataset-stats")
+
+
+def get_dataset_stats(dataset_id: int, table_name: str) -> tuple:
+    """
+    Table count and main-table row count for a dataset (cached briefly)
+
+    Args:
+        dataset_id: ID of the dataset
+        table_name: Main table to count rows of (the dataset name)
+
+    Returns:
+        (table_count, row_count); row_count is None if the table doesn't exist
+    """
+    with _dataset_stats_locks.setdefault(dataset_id, threading.Lock()):
+        cached = _dataset_stats_cache.get(dataset_id)
+        if cached and cached[0] > time.time():
+            return cached[1:]
+
+        row_count = None
+        table_count = 0
+
+        try:
+            # Get connection and query for stats
+            connection_string = get_dataset_connection_string(dataset_id)
+
+            with pooled_connection(connection_string) as conn:
+                cur = conn.cursor()
+
+                # Straight from pg_catalog: the information_schema.tables view is several
+                # joins plus per-row privilege checks, so it costs far more to plan and run
+                table_count_sql = """
+                    SELECT COUNT(*) FROM pg_catalog.pg_class c
+                    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+                """
+
+                # Table count, and the main table (assuming table name = dataset name)
+                # resolved the way an unquoted name in a query is: case-folded,
+                # optionally schema-qualified, via search_path. to_regclass gives
+                # NULL rather than an error if there's no such table, and the
+                # name is a bound parameter, so it can't inject SQL
+                cur.execute(f"SELECT ({table_count_sql}), to_regclass(%s)::text", (table_name,))
+                table_count, resolved_name = cur.fetchone()
+
+                # regclass renders as a (quoted where needed) name that's safe to splice in
+                if resolved_name is not None:
+                    cur.execute(f"SELECT COUNT(*) FROM {resolved_name}")
+                    row_count = cur.fetchone()[0]
+                cur.close()
+        except:
+            return table_count, row_count  # Don't fail (or cache) if we can't get stats
+
+        _dataset_stats_cache[dataset_id] = (time.time() + DATASET_STATS_TTL_SECONDS, table_count, row_count)
+        return table_count, row_count
+
+
+# Results shared across server processes through Redis. Every Redis call is
+# best-effort: if Redis is missing or down, callers fall through to the database.
+ACTIVE_DATASETS_CACHE_KEY = "mcp:datasets:active"
+ACTIVE_DATASETS_CACHE_TTL_SECONDS = 60
+SCHEMA_CACHE_KEY = "mcp:schema:{dataset_id}"
+# Formatted query_dataset responses. Only SELECTs ever run, so the TTL bounds
+# staleness from new data loads; activating, deactivating or deleting a dataset
+# deletes all of its keys at once, and they're only served while it's active
+QUERY_RESULT_CACHE_KEY = "mcp:query:{dataset_id}:{digest}"
+QUERY_RESULT_CACHE_TTL_SECONDS = 300
+# Keys per SCAN round trip / DEL call when clearing a dataset's query results
+REDIS_SCAN_BATCH = 500
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Shared Redis client for result caching, or None if redis isn't installed"""
+    try:
+        import redis
+    except ImportError:
+        return None
+    return redis.Redis.from_url(
+        os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+        socket_timeout=0.5,
+        socket_connect_timeout=0.5
+    )
+
+
+def redis_cache_get(key: str) -> Optional[bytes]:
+    """GET a cached value, or None on a miss or any Redis error"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return client.get(key)
+    except Exception:
+        return None
+
+
+def redis_cache_get_with_ttl(key: str) -> Tuple[Optional[bytes], Optional[float]]:
+    """
+    GET a cached value and its remaining TTL in seconds (one round trip)
+
+    Returns (None, None) on a miss or any Redis error; the TTL is None if the
+    key has no expiry.
+    """
+    client = get_redis()
+    if client is None:
+        return None, None
+    try:
+        with client.pipeline(transaction=False) as pipe:
+            value, pttl = pipe.get(key).pttl(key).execute()
+    except Exception:
+        return None, None
+    if value is None:
+        return None, None
+    return value, (pttl / 1000 if pttl >= 0 else None)
+
+
+def redis_cache_set(key: str, value: bytes, ttl_seconds: int):
+    """SET a cached value with a TTL, ignoring Redis errors"""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.set(key, value, ex=ttl_seconds)
+    except Exception:
+        pass
+
+
+def redis_cache_delete(*keys: str):
+    """DEL cached values, ignoring Redis errors"""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(*keys)
+    except Exception:
+        pass
+
+
+def redis_cache_delete_matching(pattern: str):
+    """DEL every key matching a glob pattern (SCAN, not KEYS, so Redis isn't blocked), ignoring Redis errors"""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        batch = []
+        for key in client.scan_iter(match=pattern, count=REDIS_SCAN_BATCH):
+            batch.append(key)
+            if len(batch) >= REDIS_SCAN_BATCH:
+                client.delete(*batch)
+                batch = []
+        if batch:
+            client.delete(*batch)
+    except Exception:
+        pass
+
+
+# Quotes, dollar quoting and line comments: whitespace inside these changes the query
+_WHITESPACE_SENSITIVE = re.compile(r"['\"$]|--")
+
+
+def query_result_cache_key(dataset_id: int, query: str, apply_weights: bool) -> str:
+    """
+    Redis key for a query_dataset response
+
+    The query is stripped of surrounding whitespace and trailing semicolons. Runs
+    of inner whitespace are collapsed only when the query has no quotes or line
+    comments, where whitespace could be significant; case is always kept.
+    """
+    normalized = query.strip().rstrip(';').rstrip()
+    if not _WHITESPACE_SENSITIVE.search(normalized):
+        normalized = ' '.join(normalized.split())
+    digest = hashlib.sha256(f"{int(apply_weights)}|{normalized}".encode('utf-8')).hexdigest()
+    return QUERY_RESULT_CACHE_KEY.format(dataset_id=dataset_id, digest=digest)
+
+
+def get_active_datasets_cached() -> Tuple[List[Dict], float]:
+    """
+    get_active_datasets, shared through Redis for ACTIVE_DATASETS_CACHE_TTL_SECONDS
+
+    Returns:
+        (datasets, seconds until the shared copy expires), so callers caching
+        the list themselves don't stretch its lifetime past the Redis key's
+    """
+    cached, ttl = redis_cache_get_with_ttl(ACTIVE_DATASETS_CACHE_KEY)
+    if cached:
+        return orjson.loads(cached), min(ttl if ttl is not None else ACTIVE_DATASETS_CACHE_TTL_SECONDS,
+                                         ACTIVE_DATASETS_CACHE_TTL_SECONDS)
+
+    datasets = get_active_datasets()
+    redis_cache_set(ACTIVE_DATASETS_CACHE_KEY, orjson.dumps(datasets), ACTIVE_DATASETS_CACHE_TTL_SECONDS)
+    return datasets, ACTIVE_DATASETS_CACHE_TTL_SECONDS
+
 
 def get_active_datasets() -> List[Dict]:
     """Get all active datasets with rich information"""
     db = next(get_db())
     try:
         datasets = db.query(Dataset).filter(Dataset.is_active == True).all()
+        dataset_ids = [ds.id for ds in datasets]
         result = []
-        
-        for ds in datasets:
-            # Get row count from the dataset
-            row_count = None
-            table_count = 0
-            column_count = 0
-            has_metadata = False
-            
-            try:
-                # Get connection and query for stats
-                encryption_manager = get_encryption_manager()
-                connection_string = encryption_manager.decrypt(ds.connection_string_encrypted)
-                if connection_string.startswith('postgres://'):
-                    connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
-                
-                conn = psycopg2.connect(connection_string)
-                cur = conn.cursor()
-                
-                # Get table count
-                cur.execute("""
-                    SELECT COUNT(*) FROM information_schema.tables 
-                    WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
-                """)
-                table_count = cur.fetchone()[0]
-                
-                # Get row count from main table (assuming table name = dataset name)
-                try:
-                    cur.execute(f"SELECT COUNT(*) FROM {ds.name}")
-                    row_count = cur.fetchone()[0]
-                except:
-                    pass  # Table might not exist or have different name
-                
-                cur.close()
-                conn.close()
-            except:
-                pass  # Don't fail if we can't get stats
-            
-            # Get schema info
-            schema_entries = db.query(DatasetSchema).filter(
-                DatasetSchema.dataset_id == ds.id
-            ).all()
-            column_count = len(schema_entries)
-            
-            # Check if metadata exists
-            metadata_entries = db.query(Metadata).filter(
-                Metadata.dataset_id == ds.id
-            ).first()
-            has_metadata = metadata_entries is not None or ds.metadata_text is not None
+
+        # Table and row counts from every dataset database at once
+        stats = _dataset_stats_executor.map(lambda ds: get_dataset_stats(ds.id, ds.name), datasets)
+
+        # Schema column counts and metadata presence for all datasets in one query each
+        column_counts = dict(
+            db.query(DatasetSchema.dataset_id, func.count(DatasetSchema.id)).filter(
+                DatasetSchema.dataset_id.in_(dataset_ids)
+            ).group_by(DatasetSchema.dataset_id).all()
+        )
+        with_metadata = {
+            dataset_id for (dataset_id,) in db.query(Metadata.dataset_id).filter(
+                Metadata.dataset_id.in_(dataset_ids)
+            ).distinct()
+        }
+
+        for ds, (table_count, row_count) in zip(datasets, stats):
+            column_count = column_counts.get(ds.id, 0)
+            has_metadata = ds.id in with_metadata or ds.metadata_text is not None
             
             result.append({
                 'id': ds.id,
@@ -122,43 +318,9 @@ def get_active_datasets() -> List[Dict]:
 
 
 def get_dataset_connection(dataset_id: int):
-    """Get decrypted connection string for a dataset"""
-    db = next(get_db())
-    try:
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        if not dataset or not dataset.is_active:
-            return None
-        
-        encryption_manager = get_encryption_manager()
-        connection_string = encryption_manager.decrypt(dataset.connection_string_encrypted)
-        
-        # Fix postgres:// to postgresql://
-        if connection_string.startswith('postgres://'):
-            connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
-        
-        return connection_string
-    finally:
-        db.close()
-
-
-def validate_query(query: str) -> tuple[bool, str]:
-    """Validate that the query is safe to execute"""
-    parsed = sqlparse.parse(query)
-    if not parsed:
-        return False, "Empty or invalid query"
-    
-    for statement in parsed:
-        stmt_type = statement.get_type()
-        if stmt_type not in ALLOWED_STATEMENTS:
-            return False, f"Only SELECT statements allowed. Got: {stmt_type}"
-        
-        dangerous = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE']
-        query_upper = query.upper()
-        for keyword in dangerous:
-            if keyword in query_upper:
-                return False, f"Dangerous keyword: {keyword}"
-    
-    return True, ""
+    """Get decrypted connection string for an active dataset (cached, see get_active_dataset_connection)"""
+    dataset = get_active_dataset_connection(dataset_id)
+    return dataset[1] if dataset else None
 
 
 def execute_query_on_dataset(
@@ -181,18 +343,120 @@ def execute_query_on_dataset(
     Returns:
         Dict with success, rows, columns, metadata
     """
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
 
-    # Validate query
-    is_valid, error_msg = validate_query(query)
-    if not is_valid:
-        return {'success': False, 'error': error_msg}
+    # Validate query and pick its row limit
+    prepared = prepare_query(query, limit)
+    if not prepared.is_valid:
+        return {'success': False, 'error': prepared.error}
+    query, limit, is_aggregated = prepared.sql, prepared.limit, prepared.is_aggregated
 
     # Get connection string
     connection_string = get_dataset_connection(dataset_id)
     if not connection_string:
         return {'success': False, 'error': 'Dataset not found or inactive'}
 
+    try:
+        with pooled_connection(connection_string) as conn:
+            # Server-side cursor: only `limit` rows ever leave the database, even if
+            # the query carries its own (larger) LIMIT
+            cur = conn.cursor(name=f"q_{uuid4().hex}")
+            cur.execute(query)
+            # Rows stay as tuples aligned with `columns` (no per-row dict)
+            results = cur.fetchmany(limit)
+            columns = [desc[0] for desc in cur.description] if cur.description else []
+            cur.close()
+
+        return build_query_result(
+            dataset_id, query, limit, is_aggregated, results, columns,
+            apply_weights, apply_nccs_merging, start_ns
+        )
+    except Exception as e:
+        execution_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+        return {
+            'success': False,
+            'error': str(e),
+            'execution_time_ms': execution_time_ms
+        }
+
+
+async def execute_query_on_dataset_async(
+    dataset_id: int,
+    query: str,
+    limit: int = None,
+    apply_weights: bool = True,
+    apply_nccs_merging: bool = True
+) -> Dict[str, Any]:
+    """
+    execute_query_on_dataset on the dataset's asyncpg pool (shared with execute_multi_query)
+
+    Falls back to the psycopg2 version on a worker thread if asyncpg isn't
+    installed or can't connect. Same arguments and result.
+    """
+    start_ns = time.perf_counter_ns()
+
+    # Validate query and pick its row limit
+    prepared = prepare_query(query, limit)
+    if not prepared.is_valid:
+        return {'success': False, 'error': prepared.error}
+
+    # Get connection string
+    connection_string = await asyncio.to_thread(get_dataset_connection, dataset_id)
+    if not connection_string:
+        return {'success': False, 'error': 'Dataset not found or inactive'}
+
+    pool = await parallel_executor.get_or_create_pool(dataset_id, connection_string)
+    if pool is None:
+        return await asyncio.to_thread(
+            execute_query_on_dataset, dataset_id, query, limit, apply_weights, apply_nccs_merging
+        )
+
+    query, limit, is_aggregated = prepared.sql, prepared.limit, prepared.is_aggregated
+
+    try:
+        async with pool.acquire() as conn:
+            # Cursor in a read-only transaction: only `limit` rows ever leave the
+            # database, even if the query carries its own (larger) LIMIT
+            async with conn.transaction(readonly=True):
+                statement = await conn.prepare(query)
+                columns = [attribute.name for attribute in statement.get_attributes()]
+                cursor = await statement.cursor()
+                # Records index positionally like the psycopg2 tuples
+                results = await cursor.fetch(limit)
+
+        return build_query_result(
+            dataset_id, query, limit, is_aggregated, results, columns,
+            apply_weights, apply_nccs_merging, start_ns
+        )
+    except Exception as e:
+        execution_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+        return {
+            'success': False,
+            'error': str(e),
+            'execution_time_ms': execution_time_ms
+        }
+
+
+class PreparedQuery(NamedTuple):
+    """A query checked and rewritten for execution"""
+    is_valid: bool
+    error: str
+    sql: str  # The query with a LIMIT appended if it had none
+    limit: int
+    is_aggregated: bool
+
+
+@lru_cache(maxsize=4096)
+def prepare_query(query: str, limit: Optional[int]) -> PreparedQuery:
+    """
+    Validate a query, pick its row limit and append it if the query has no LIMIT of its own
+
+    Cached on the raw SQL, so a query the LLM repeats skips validation and the rewrite.
+    """
+    is_valid, error_msg = validate_query(query)
+    if not is_valid:
+        return PreparedQuery(False, error_msg, query, 0, False)
+
     # Detect query type and apply appropriate limit
     is_aggregated = weighting_service.is_aggregated_query(query)
 
@@ -205,56 +469,54 @@ def execute_query_on_dataset(
     else:
         limit = min(limit, MAX_ROWS)
 
-    query_upper = query.upper().strip()
-    if query_upper.startswith('SELECT') and 'LIMIT' not in query_upper:
+    # A LIMIT inside a subquery or literal doesn't count
+    if needs_limit(query):
         query = f"{query.rstrip().rstrip(';')} LIMIT {limit}"
 
-    try:
-        conn = psycopg2.connect(connection_string)
-        cur = conn.cursor()
-        cur.execute(query)
-        rows = cur.fetchall()
-        columns = [desc[0] for desc in cur.description] if cur.description else []
-        results = [dict(zip(columns, row)) for row in rows]
-        cur.close()
-        conn.close()
-
-        # Detect weight column
-        weight_column = weighting_service.detect_weight_column(columns) if apply_weights else None
-
-        # Detect NCCS column
-        nccs_column = weighting_service.detect_nccs_column(columns) if apply_nccs_merging else None
+    return PreparedQuery(True, "", query, limit, is_aggregated)
 
-        # Apply NCCS merging if applicable
-        if nccs_column and results:
-            results = weighting_service.apply_nccs_merging(results, nccs_column)
 
-        # Calculate execution time
-        execution_time_ms = int((time.time() - start_time) * 1000)
-
-        # Determine if 5-row limit was applied
-        should_limit, is_raw = weighting_service.should_apply_5_row_limit(query, len(results))
-        row_limit_applied = should_limit and limit == MAX_RAW_ROWS
-
-        return {
-            'success': True,
-            'rows': results,
-            'columns': columns,
-            'row_count': len(results),
-            'execution_time_ms': execution_time_ms,
-            'weight_column': weight_column,
-            'nccs_column': nccs_column,
-            'is_aggregated': is_aggregated,
-            'row_limit_applied': row_limit_applied,
-            'dataset_id': dataset_id
-        }
-    except Exception as e:
-        execution_time_ms = int((time.time() - start_time) * 1000)
-        return {
-            'success': False,
-            'error': str(e),
-            'execution_time_ms': execution_time_ms
-        }
+def build_query_result(
+    dataset_id: int,
+    query: str,
+    limit: int,
+    is_aggregated: bool,
+    results: List,
+    columns: List[str],
+    apply_weights: bool,
+    apply_nccs_merging: bool,
+    start_ns: int
+) -> Dict[str, Any]:
+    """Weight/NCCS detection, NCCS merging and the result dict for fetched rows"""
+    # Detect weight column
+    weight_column = weighting_service.detect_weight_column(columns) if apply_weights else None
+
+    # Detect NCCS column
+    nccs_column = weighting_service.detect_nccs_column(columns) if apply_nccs_merging else None
+
+    # Apply NCCS merging if applicable
+    if nccs_column and results:
+        results = weighting_service.apply_nccs_merging(results, columns, nccs_column)
+
+    # Calculate execution time
+    execution_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+
+    # Determine if 5-row limit was applied
+    should_limit, is_raw = weighting_service.should_apply_5_row_limit(query, len(results))
+    row_limit_applied = should_limit and limit == MAX_RAW_ROWS
+
+    return {
+        'success': True,
+        'rows': results,
+        'columns': columns,
+        'row_count': len(results),
+        'execution_time_ms': execution_time_ms,
+        'weight_column': weight_column,
+        'nccs_column': nccs_column,
+        'is_aggregated': is_aggregated,
+        'row_limit_applied': row_limit_applied,
+        'dataset_id': dataset_id
+    }
 
 
 # ============================================================================
@@ -269,25 +531,39 @@ async def list_available_datasets() -> str:
     Returns:
         Markdown formatted table of datasets with id, name, and description
     """
-    datasets = get_active_datasets()
+    cached = _dataset_list_cache
+    if cached and cached[0] > time.time():
+        _, md, count = cached
+    else:
+        md, count = await asyncio.to_thread(render_dataset_list)
 
     # Log the tool call
-    db = next(get_db())
-    try:
-        query_logger.log_mcp_tool_call(
-            db=db,
-            tool_name='list_available_datasets',
-            parameters={},
-            result={'count': len(datasets)},
-            execution_time_ms=0,
-            tool_used='chatgpt'  # Default, will be detected from headers in production
-        )
-    except Exception:
-        pass  # Don't fail if logging fails
-    finally:
-        db.close()
+    query_logger.queue_mcp_tool_call(
+        tool_name='list_available_datasets',
+        parameters={},
+        result={'count': count},
+        execution_time_ms=0,
+        tool_used='chatgpt'  # Default, will be detected from headers in production
+    )
+
+    return md
 
-    return formatter.format_dataset_list(datasets)
+
+def render_dataset_list(datasets: Optional[List[Dict]] = None) -> tuple:
+    """
+    Format the active dataset list and keep it in the process cache
+
+    Freshly loaded datasets are kept for ACTIVE_DATASETS_CACHE_TTL_SECONDS; a
+    list read from Redis only for what's left of the shared key's TTL, so the
+    two cache layers never add up to more than one TTL of staleness.
+    """
+    global _dataset_list_cache
+    ttl = ACTIVE_DATASETS_CACHE_TTL_SECONDS
+    if datasets is None:
+        datasets, ttl = get_active_datasets_cached()
+    md = formatter.format_dataset_list(datasets)
+    _dataset_list_cache = (time.time() + ttl, md, len(datasets))
+    return md, len(datasets)
 
 
 @mcp.tool()
@@ -304,7 +580,27 @@ async def get_dataset_schema(dataset_id: int) -> str:
     Returns:
         Markdown formatted schema with ALL tables, columns, types, and descriptions
     """
-    start_time = time.time()
+    return await asyncio.to_thread(load_dataset_schema, dataset_id)
+
+
+def load_dataset_schema(dataset_id: int) -> str:
+    """get_dataset_schema's response, from the process cache, Redis, or the metadata DB"""
+    # Checked first (against the cached connection entry) so neither cache
+    # outlives a deactivation or deletion
+    if get_active_dataset_connection(dataset_id) is None:
+        return f"❌ Error: Dataset {dataset_id} not found or inactive"
+
+    cached = _schema_cache.get(dataset_id)
+    if cached and cached[0] > time.time():
+        return cached[1]
+
+    # Another server process may already have loaded it
+    shared = redis_cache_get(SCHEMA_CACHE_KEY.format(dataset_id=dataset_id))
+    if shared:
+        metadata_text = shared.decode('utf-8')
+        _schema_cache[dataset_id] = (time.time() + SCHEMA_CACHE_TTL_SECONDS, metadata_text)
+        return metadata_text
+
     db = next(get_db())
 
     try:
@@ -315,6 +611,12 @@ async def get_dataset_schema(dataset_id: int) -> str:
 
         # Return pre-generated metadata text (metadata tables already filtered out)
         if dataset.metadata_text:
+            _schema_cache[dataset_id] = (time.time() + SCHEMA_CACHE_TTL_SECONDS, dataset.metadata_text)
+            redis_cache_set(
+                SCHEMA_CACHE_KEY.format(dataset_id=dataset_id),
+                dataset.metadata_text.encode('utf-8'),
+                SCHEMA_CACHE_TTL_SECONDS
+            )
             return dataset.metadata_text
         else:
             return f"""# {dataset.name}
@@ -359,8 +661,28 @@ async def query_dataset(dataset_id: int, query: str, apply_weights: bool = True)
         query_dataset(1, "SELECT age_bucket, SUM(weights) FROM digital_insights GROUP BY age_bucket")
         query_dataset(1, "SELECT state_grp, SUM(weights) FROM digital_insights GROUP BY state_grp")
     """
-    # Execute query with all optimizations
-    result = execute_query_on_dataset(
+    # Identical queries (from any server process) reuse the formatted response,
+    # but only while the dataset is active: an inactive or deleted one falls
+    # through to execute_query_on_dataset_async, which reports it
+    cache_key = query_result_cache_key(dataset_id, query, apply_weights)
+    active, cached = await asyncio.gather(
+        asyncio.to_thread(get_active_dataset_connection, dataset_id),
+        asyncio.to_thread(redis_cache_get, cache_key)
+    )
+    if cached and active is not None:
+        query_logger.queue_query(
+            query_text=query,
+            dataset_id=dataset_id,
+            execution_time_ms=0,
+            success=True,
+            tool_used='chatgpt',
+            client_info={'cache_hit': True}
+        )
+        return cached.decode('utf-8')
+
+    # Execute query with all optimizations (on the dataset's asyncpg pool, so
+    # concurrent query_dataset calls actually overlap)
+    result = await execute_query_on_dataset_async(
         dataset_id=dataset_id,
         query=query,
         apply_weights=apply_weights,
@@ -368,22 +690,15 @@ async def query_dataset(dataset_id: int, query: str, apply_weights: bool = True)
     )
 
     # Log the query
-    db = next(get_db())
-    try:
-        query_logger.log_query(
-            db=db,
-            query_text=query,
-            dataset_id=dataset_id,
-            execution_time_ms=result.get('execution_time_ms'),
-            row_count=result.get('row_count'),
-            success=result.get('success', False),
-            error_message=result.get('error'),
-            tool_used='chatgpt'
-        )
-    except Exception:
-        pass
-    finally:
-        db.close()
+    query_logger.queue_query(
+        query_text=query,
+        dataset_id=dataset_id,
+        execution_time_ms=result.get('execution_time_ms'),
+        row_count=result.get('row_count'),
+        success=result.get('success', False),
+        error_message=result.get('error'),
+        tool_used='chatgpt'
+    )
 
     # Format response
     if not result['success']:
@@ -406,6 +721,8 @@ async def query_dataset(dataset_id: int, query: str, apply_weights: bool = True)
             md += f"🔄 NCCS merged: {result['nccs_column']}"
         md += "\n"
 
+    await asyncio.to_thread(redis_cache_set, cache_key, md.encode('utf-8'), QUERY_RESULT_CACHE_TTL_SECONDS)
+
     return md
 
 
@@ -423,9 +740,9 @@ async def get_dataset_sample(dataset_id: int, table_name: str, limit: int = 10)
         Markdown formatted sample data table
     """
     limit = min(limit, 100)
-    query = f"SELECT * FROM {table_name} LIMIT {limit}"
+    query = build_sample_query(table_name, limit)
 
-    result = execute_query_on_dataset(
+    result = await execute_query_on_dataset_async(
         dataset_id,
         query,
         limit=limit,
@@ -434,20 +751,13 @@ async def get_dataset_sample(dataset_id: int, table_name: str, limit: int = 10)
     )
 
     # Log the tool call
-    db = next(get_db())
-    try:
-        query_logger.log_mcp_tool_call(
-            db=db,
-            tool_name='get_dataset_sample',
-            parameters={'dataset_id': dataset_id, 'table_name': table_name, 'limit': limit},
-            result={'row_count': result.get('row_count', 0)},
-            execution_time_ms=result.get('execution_time_ms', 0),
-            tool_used='chatgpt'
-        )
-    except Exception:
-        pass
-    finally:
-        db.close()
+    query_logger.queue_mcp_tool_call(
+        tool_name='get_dataset_sample',
+        parameters={'dataset_id': dataset_id, 'table_name': table_name, 'limit': limit},
+        result={'row_count': result.get('row_count', 0)},
+        execution_time_ms=result.get('execution_time_ms', 0),
+        tool_used='chatgpt'
+    )
 
     if not result['success']:
         return formatter.format_error(result['error'], f'Table: {table_name}')
@@ -499,8 +809,6 @@ async def execute_multi_query(queries: List[Dict[str, Any]], apply_weights: bool
     
     This tool is kept for backward compatibility but will be removed in a future version.
     """
-    start_time = time.time()
-
     # Execute queries in parallel
     execution_result = await parallel_executor.execute_parallel(
         queries=queries,
@@ -509,20 +817,13 @@ async def execute_multi_query(queries: List[Dict[str, Any]], apply_weights: bool
     )
 
     # Log the multi-query execution
-    db = next(get_db())
-    try:
-        query_logger.log_mcp_tool_call(
-            db=db,
-            tool_name='execute_multi_query',
-            parameters={'num_queries': len(queries), 'apply_weights': apply_weights},
-            result=execution_result,
-            execution_time_ms=execution_result.get('total_execution_time_ms', 0),
-            tool_used='chatgpt'
-        )
-    except Exception:
-        pass
-    finally:
-        db.close()
+    query_logger.queue_mcp_tool_call(
+        tool_name='execute_multi_query',
+        parameters={'num_queries': len(queries), 'apply_weights': apply_weights},
+        result=execution_result,
+        execution_time_ms=execution_result.get('total_execution_time_ms', 0),
+        tool_used='chatgpt'
+    )
 
     # Handle execution error
     if not execution_result.get('success', False):
@@ -559,27 +860,34 @@ async def get_context(level: int = 0, dataset_id: Optional[int] = None) -> str:
     Returns:
         Markdown formatted context
     """
+    if level <= 0:
+        return GLOBAL_CONTEXT
+
+    context = await asyncio.to_thread(build_context, level, dataset_id)
+
+    # Log the tool call
+    if level >= 1:
+        query_logger.queue_mcp_tool_call(
+            tool_name='get_context',
+            parameters={'level': level, 'dataset_id': dataset_id},
+            result={'level': level},
+            execution_time_ms=0,
+            tool_used='chatgpt'
+        )
+
+    return context
+
+
+def build_context(level: int, dataset_id: Optional[int]) -> str:
+    """get_context's response (levels 1+ need a metadata DB session)"""
     db = next(get_db()) if level >= 1 else None
 
     try:
-        context = context_service.build_progressive_context(
+        return context_service.build_progressive_context(
             required_level=level,
             dataset_id=dataset_id,
             db=db
         )
-
-        # Log the tool call
-        if db:
-            query_logger.log_mcp_tool_call(
-                db=db,
-                tool_name='get_context',
-                parameters={'level': level, 'dataset_id': dataset_id},
-                result={'level': level},
-                execution_time_ms=0,
-                tool_used='chatgpt'
-            )
-
-        return context
     finally:
         if db:
             db.close()
@@ -599,63 +907,274 @@ def reload_datasets_cache():
     global _dataset_cache, _cache_timestamp
     _dataset_cache = get_active_datasets()
     _cache_timestamp = time.time()
+    render_dataset_list(_dataset_cache)
     print(f"✅ Reloaded dataset cache: {len(_dataset_cache)} datasets")
 
 
+# TaskGroup of the running run_background_tasks; spawn_background adds tasks to it
+_background_group: Optional[asyncio.TaskGroup] = None
+
+
+def spawn_background(coro) -> asyncio.Task:
+    """
+    Run a coroutine as a child of the background TaskGroup, so shutdown cancels it
+
+    Falls back to a plain task when the group isn't running (e.g. tools
+    driven from a script, or the group is already shutting down).
+    """
+    if _background_group is not None:
+        try:
+            return _background_group.create_task(coro)
+        except RuntimeError:
+            pass
+    return asyncio.create_task(coro)
+
+
+# A burst of activation messages within this window triggers a single reload
+RELOAD_DEBOUNCE_SECONDS = 0.2
+_reload_pending = False
+_reload_task: Optional[asyncio.Task] = None
+
+
+def schedule_datasets_reload():
+    """Reload the dataset cache RELOAD_DEBOUNCE_SECONDS from now, unless a reload is already waiting"""
+    global _reload_pending, _reload_task
+    if _reload_pending:
+        return
+    _reload_pending = True
+    _reload_task = spawn_background(_debounced_reload())
+
+
+async def _debounced_reload():
+    global _reload_pending
+    await asyncio.sleep(RELOAD_DEBOUNCE_SECONDS)
+    # Messages from here on schedule another reload, since this one may already have read past them
+    _reload_pending = False
+    try:
+        await asyncio.to_thread(reload_datasets_cache)
+    except Exception as e:
+        # Tools don't need the cache loaded (list_available_datasets builds on a miss)
+        print(f"⚠️  Dataset cache reload failed: {e}")
+
+
+async def handle_dataset_event(channel: str, data: dict):
+    """
+    Drop the caches a dataset activation, deactivation, deletion or schema change makes stale
+
+    Args:
+        channel: Redis channel the event arrived on
+        data: Decoded message ({"dataset_id", ...})
+    """
+    global _dataset_list_cache
+    dataset_id = data.get('dataset_id')
+
+    if channel == SCHEMA_CHANGED_CHANNEL:
+        if dataset_id is None:
+            print(f"⚠️  Ignoring schema change without a dataset_id: {data!r}")
+            return
+
+        # The publisher has already rewritten metadata_text; only our cached copies are stale
+        print(f"📢 Schema changed: dataset {dataset_id} tables {data.get('table_names')}")
+        _schema_cache.pop(dataset_id, None)
+        await asyncio.to_thread(redis_cache_delete, SCHEMA_CACHE_KEY.format(dataset_id=dataset_id))
+        return
+
+    # Messages from before "action" was added were all activations
+    action = data.get('action', 'activated')
+    print(f"📢 Dataset {action}: {data.get('name')} (ID: {dataset_id})")
+
+    # Drop the dataset's cached connection string and asyncpg pool, then reload dataset cache
+    invalidate_dataset_connection_string(dataset_id)
+    await parallel_executor.close_pool(dataset_id)
+    if dataset_id is not None and action == 'activated':
+        # Reconnect now so the dataset's first query doesn't pay for it
+        spawn_background(parallel_executor.warm_pool(dataset_id))
+    _schema_cache.clear()
+    _dataset_stats_cache.clear()
+    _dataset_list_cache = None
+    keys = [ACTIVE_DATASETS_CACHE_KEY]
+    if dataset_id is not None:
+        keys.append(SCHEMA_CACHE_KEY.format(dataset_id=dataset_id))
+    await asyncio.to_thread(redis_cache_delete, *keys)
+    if dataset_id is not None:
+        # Results cached against the old connection string, or for a dataset that's gone
+        await asyncio.to_thread(
+            redis_cache_delete_matching,
+            QUERY_RESULT_CACHE_KEY.format(dataset_id=dataset_id, digest='*')
+        )
+    schedule_datasets_reload()
+
+
+# Hot-reload listener reconnect delay, doubled after each failure up to the max
+LISTENER_BACKOFF_MIN_SECONDS = 1
+LISTENER_BACKOFF_MAX_SECONDS = 60
+
+
 async def listen_for_dataset_changes():
     """
     Background task to listen for dataset activation events via Redis pub/sub
 
-    This enables hot-reload: when a new dataset is approved via the API,
-    the MCP server automatically picks it up without restart.
+    This enables hot-reload: when a dataset is activated, deactivated or
+    deleted through the UI/API (app.events.publish_dataset_changed), the MCP
+    server picks up the change without restart. Messages on
+    channel:dataset:schema_changed (published by app.metadata_text after
+    metadata_text is rewritten) drop that dataset's cached schema.
+
+    Runs until cancelled: if Redis is down or the connection drops, it
+    reconnects with exponential backoff instead of ending hot-reload.
     """
+    # Import redis only if available
     try:
-        # Check if Redis is available
-        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        import redis.asyncio as aioredis
+    except ImportError:
+        print("⚠️  Redis not available - hot-reload disabled")
+        return
 
-        # Import redis only if available
+    redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    backoff = LISTENER_BACKOFF_MIN_SECONDS
+
+    while True:
+        redis_client = pubsub = None
         try:
-            import redis.asyncio as aioredis
-        except ImportError:
-            print("⚠️  Redis not available - hot-reload disabled")
-            return
+            # Connect to Redis (a dedicated connection: pub/sub never shares get_redis()'s
+            # command pool, and subscribe confirmations are dropped before reaching us)
+            redis_client = await aioredis.from_url(redis_url, decode_responses=True)
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+
+            # Subscribe to dataset activation and schema edit channels
+            await pubsub.subscribe(DATASET_CHANGED_CHANNEL, SCHEMA_CHANGED_CHANNEL)
+            print("🔔 Listening for dataset changes on Redis pub/sub...")
+            backoff = LISTENER_BACKOFF_MIN_SECONDS
+
+            async for message in pubsub.listen():
+                # Subscribe confirmations are already filtered out, so every message is an event.
+                # A bad message is logged and skipped; it must not end hot-reload for the process.
+                try:
+                    await handle_dataset_event(message['channel'], orjson.loads(message['data']))
+                except Exception as e:
+                    print(f"⚠️  Failed to handle message on {message['channel']}: {e} ({message['data']!r})")
 
-        # Connect to Redis
-        redis_client = await aioredis.from_url(redis_url, decode_responses=True)
-        pubsub = redis_client.pubsub()
+        except Exception as e:
+            print(f"⚠️  Hot-reload listener error: {e}")
+            print(f"   Reconnecting in {backoff}s...")
 
-        # Subscribe to dataset activation channel
-        await pubsub.subscribe('channel:dataset:activated')
-        print("🔔 Listening for dataset changes on Redis pub/sub...")
+        finally:
+            # Also runs on cancellation at shutdown, so the Redis connection isn't leaked
+            for resource in (pubsub, redis_client):
+                if resource is not None:
+                    try:
+                        await resource.aclose()
+                    except Exception:
+                        pass
 
-        async for message in pubsub.listen():
-            if message['type'] == 'message':
-                data = json.loads(message['data'])
-                print(f"📢 Dataset activated: {data.get('name')} (ID: {data.get('dataset_id')})")
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, LISTENER_BACKOFF_MAX_SECONDS)
 
-                # Reload dataset cache
-                reload_datasets_cache()
 
-    except Exception as e:
-        print(f"⚠️  Hot-reload listener error: {e}")
-        print("   Continuing without hot-reload...")
+def _log_background_failure(exc: BaseException):
+    """Print each exception a background TaskGroup failed with"""
+    for error in getattr(exc, 'exceptions', (exc,)):
+        print(f"⚠️  Background task failed: {error!r}")
+
+
+def _report_background_failure(task: asyncio.Task):
+    """Done callback: report a background TaskGroup that died while the server was running"""
+    if not task.cancelled() and task.exception() is not None:
+        _log_background_failure(task.exception())
+
+
+async def run_background_tasks(ready: Optional[asyncio.Event] = None):
+    """
+    Run the long-lived background tasks in one TaskGroup
 
+    The hot-reload listener starts here, and spawn_background adds the
+    short-lived ones (debounced cache reloads, pool warm-ups) while the group
+    is open. Cancelling the group cancels every child; a child that crashes
+    cancels the group with its exception instead of dying unnoticed.
 
-async def startup_event():
+    Args:
+        ready: Set once the group accepts tasks
+    """
+    global _background_group
+    try:
+        async with asyncio.TaskGroup() as tg:
+            _background_group = tg
+            tg.create_task(listen_for_dataset_changes())
+            if ready is not None:
+                ready.set()
+    finally:
+        _background_group = None
+
+
+async def start_background_tasks() -> asyncio.Task:
+    """
+    Start run_background_tasks and wait until its TaskGroup accepts tasks
+
+    Returns:
+        The supervising task; pass it to stop_background_tasks on shutdown
+    """
+    ready = asyncio.Event()
+    task = asyncio.create_task(run_background_tasks(ready))
+    task.add_done_callback(_report_background_failure)
+    ready_wait = asyncio.create_task(ready.wait())
+    await asyncio.wait({task, ready_wait}, return_when=asyncio.FIRST_COMPLETED)
+    ready_wait.cancel()
+    return task
+
+
+async def stop_background_tasks(task: Optional[asyncio.Task]):
+    """Cancel a run_background_tasks task, wait for its children, and log how it failed (if it did)"""
+    if task is None:
+        return
+    # A group that already died was reported by _report_background_failure
+    already_reported = task.done()
+    task.remove_done_callback(_report_background_failure)
+    task.cancel()
+    result, = await asyncio.gather(task, return_exceptions=True)
+    if isinstance(result, BaseException) and not isinstance(result, asyncio.CancelledError) and not already_reported:
+        _log_background_failure(result)
+
+
+async def startup_event() -> asyncio.Task:
     """
     Startup event handler
 
     Initializes dataset cache and starts hot-reload listener
+
+    Returns:
+        The background task; pass it to stop_background_tasks on shutdown
     """
     print("🚀 MCP Server starting up...")
 
-    # Initialize dataset cache
-    reload_datasets_cache()
-
     # Start hot-reload listener in background (non-blocking)
-    asyncio.create_task(listen_for_dataset_changes())
+    background = await start_background_tasks()
+
+    # Load the dataset cache in the background; tools work without it
+    schedule_datasets_reload()
+
+    # Open dataset pools now so the first queries skip connection setup
+    warmed = await parallel_executor.warm_pools()
+    print(f"✅ Warmed {warmed} dataset connection pools")
 
     print("✅ MCP Server ready!")
+    return background
+
+
+async def serve(host: str, port: int):
+    """
+    Run startup_event and the HTTP server on one event loop
+
+    The listener task and asyncpg pools created at startup belong to the loop
+    they were created on, so the server has to keep running that same loop.
+    """
+    background = await startup_event()
+
+    # HTTP transport (uses Streamable HTTP protocol internally) creates a /mcp
+    # endpoint that both ChatGPT and Claude Desktop can connect to
+    try:
+        await mcp.run_async(transport="http", host=host, port=port)
+    finally:
+        await stop_background_tasks(background)
 
 
 if __name__ == "__main__":
@@ -688,11 +1207,15 @@ if __name__ == "__main__":
     print(f"💡 Pro Tip: Use execute_multi_query() for multiple queries = ONE approval!")
     print()
 
-    # Initialize server (dataset cache + hot-reload listener)
-    print("Initializing server...")
-    asyncio.run(startup_event())
+    # uvloop (shipped with uvicorn[standard] on Linux/macOS) for the loop serve runs on
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        print("⚡ Using uvloop event loop")
+    except ImportError:
+        pass
 
-    # Start the server with HTTP transport (uses Streamable HTTP protocol internally)
-    # This creates a /mcp endpoint that both ChatGPT and Claude Desktop can connect to
-    mcp.run(transport="http", host=args.host, port=args.port)
+    # Initialize server (dataset cache + hot-reload listener), then serve on the same loop
+    print("Initializing server...")
+    asyncio.run(serve(args.host, args.port))
 
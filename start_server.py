@@ -4,26 +4,48 @@ MCP Analytics Server - Combined UI + MCP Server
 Runs both the Web UI and MCP protocol endpoint
 """
 import os
+import sys
 import argparse
 import asyncio
+import orjson
+from contextlib import asynccontextmanager
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
 
 # Load environment variables
 load_dotenv()
 
 from app.database import init_database, get_db
+from app.responses import json_bytes_response
 from app.ui.routes import router as ui_router
+from server import mcp, start_background_tasks, stop_background_tasks
+
+# FastMCP's Streamable HTTP app, served in this process at /mcp
+mcp_app = mcp.http_app(path="/mcp")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run startup, then keep FastMCP's session manager running for the app's lifetime"""
+    background = await startup_event()
+    try:
+        async with mcp_app.lifespan(app):
+            yield
+    finally:
+        await stop_background_tasks(background)
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="MCP Analytics Server",
     description="Multi-dataset analytics platform with AI-powered metadata",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -42,9 +64,8 @@ app.include_router(ui_router)
 templates = Jinja2Templates(directory="app/ui/templates")
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and server components on startup"""
+async def startup_event() -> asyncio.Task:
+    """Initialize database and server components on startup, returning the background task"""
     print("🚀 MCP Analytics Server starting up...")
     print()
 
@@ -52,12 +73,12 @@ async def startup_event():
     init_database()
     print("✅ Database initialized")
 
-    # Load datasets cache (from server.py logic)
-    from server import reload_datasets_cache, listen_for_dataset_changes
-    reload_datasets_cache()
-
     # Start hot-reload listener in background
-    asyncio.create_task(listen_for_dataset_changes())
+    background = await start_background_tasks()
+
+    # Load datasets cache in the background (from server.py logic; tools work without it)
+    from server import schedule_datasets_reload
+    schedule_datasets_reload()
 
     print()
     print("📊 Features Active:")
@@ -70,6 +91,7 @@ async def startup_event():
     print("   ✓ Query logging")
     print()
     print("✅ Server ready!")
+    return background
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -88,43 +110,21 @@ async def root(request: Request):
     })
 
 
+_HEALTH_JSON = orjson.dumps({
+    "status": "healthy",
+    "version": "2.0.0",
+    "phase": "Phase 2 - Multi-dataset + LLM Metadata + Web UI"
+})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "version": "2.0.0",
-        "phase": "Phase 2 - Multi-dataset + LLM Metadata + Web UI"
-    }
-
-
-@app.api_route("/mcp", methods=["GET", "POST", "DELETE"])
-async def mcp_endpoint(request: Request):
-    """
-    MCP protocol endpoint
-
-    This endpoint integrates with the MCP tools defined in server.py.
-    For full MCP functionality, tools from server.py are available via this endpoint.
-    """
-    # Import MCP instance from server.py
-    from server import mcp
-
-    # FastMCP will handle the request
-    # Note: This is a placeholder - FastMCP needs proper integration
-    # For now, return server info
-    return {
-        "jsonrpc": "2.0",
-        "result": {
-            "name": "mcp-analytics-phase2-optimized",
-            "version": "2.0.0",
-            "capabilities": {
-                "tools": True,
-                "prompts": False,
-                "resources": False
-            }
-        },
-        "id": None
-    }
+    return json_bytes_response(_HEALTH_JSON)
+
+
+# MCP protocol endpoint (mounted last so the UI routes above take precedence)
+app.mount("/", mcp_app)
 
 
 if __name__ == "__main__":
@@ -141,8 +141,11 @@ if __name__ == "__main__":
 
     # Run with uvicorn
     uvicorn.run(
-        app,
+        "start_server:app",
         host=args.host,
         port=args.port,
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),  # Each worker process gets its own pools
         log_level="info"
     )
@@ -42,6 +42,9 @@ if __name__ == "__main__":
         "app.main:app",
         host=host,
         port=port,
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),  # Each worker process gets its own pools
         log_level="info",
         reload=False  # Set to True for development
     )
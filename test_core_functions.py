@@ -2,74 +2,69 @@
 Test core functions directly (bypassing MCP protocol)
 This verifies the underlying logic works correctly
 """
-import asyncio
+import logging
+import os
 import sys
 from datetime import datetime
 
 sys.path.insert(0, '/home/ubuntu/new-mcp-server')
 
-from app.database import get_db
+from app.database import get_db, get_dataset_connection_string
 from app.models import Dataset
-from app.encryption import get_encryption_manager
-import psycopg2
+from app.pool import pooled_connection, close_all_pools
 
-def test_database_connection():
+# Per-row listings and result previews only show with LOGLEVEL=DEBUG
+log = logging.getLogger("mcptest")
+logging.basicConfig(format="%(message)s")
+log.setLevel(os.getenv("LOGLEVEL", "WARNING"))
+
+def check_database_connection(db):
     """Test that we can connect to the metadata database"""
     print("\n" + "=" * 80)
     print("TEST 1: Database Connection")
     print("=" * 80)
     try:
-        db = next(get_db())
         datasets = db.query(Dataset).all()
         print(f"✓ SUCCESS: Connected to database")
         print(f"  Found {len(datasets)} datasets")
         for ds in datasets:
-            print(f"  - ID {ds.id}: {ds.name} (active: {ds.is_active})")
-        db.close()
+            log.debug("  - ID %s: %s (active: %s)", ds.id, ds.name, ds.is_active)
         return True
     except Exception as e:
         print(f"✗ FAILED: {e}")
+        db.rollback()  # Keep the shared session usable for the next test
         return False
 
 
-def test_dataset_connection():
+def check_dataset_connection(db):
     """Test that we can connect to a dataset"""
     print("\n" + "=" * 80)
     print("TEST 2: Dataset Connection")
     print("=" * 80)
     try:
-        db = next(get_db())
         dataset = db.query(Dataset).filter(Dataset.id == 1).first()
         
         if not dataset:
             print("✗ FAILED: Dataset ID 1 not found")
-            db.close()
             return False
         
-        encryption_manager = get_encryption_manager()
-        connection_string = encryption_manager.decrypt(dataset.connection_string_encrypted)
-        
-        if connection_string.startswith('postgres://'):
-            connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
-        
-        # Test connection
-        conn = psycopg2.connect(connection_string)
-        cur = conn.cursor()
-        
-        # Test query
-        cur.execute("SELECT COUNT(*) FROM digital_insights")
-        count = cur.fetchone()[0]
+        # Test connection (the pool is shared with the later tests)
+        with pooled_connection(get_dataset_connection_string(dataset.id)) as conn:
+            cur = conn.cursor()
+
+            # Test query
+            cur.execute("SELECT COUNT(*) FROM digital_insights")
+            count = cur.fetchone()[0]
+            cur.close()
         
         print(f"✓ SUCCESS: Connected to dataset '{dataset.name}'")
         print(f"  Total respondents: {count:,}")
         
-        cur.close()
-        conn.close()
-        db.close()
         return True
         
     except Exception as e:
         print(f"✗ FAILED: {e}")
+        db.rollback()  # Keep the shared session usable for the next test
         return False
 
 
@@ -79,35 +74,24 @@ def test_schema_query():
     print("TEST 3: Schema Query")
     print("=" * 80)
     try:
-        db = next(get_db())
-        dataset = db.query(Dataset).filter(Dataset.id == 1).first()
-        
-        encryption_manager = get_encryption_manager()
-        connection_string = encryption_manager.decrypt(dataset.connection_string_encrypted)
-        
-        if connection_string.startswith('postgres://'):
-            connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
-        
-        conn = psycopg2.connect(connection_string)
-        cur = conn.cursor()
-        
-        # Get tables
-        cur.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_type = 'BASE TABLE'
-            ORDER BY table_name
-        """)
-        tables = [row[0] for row in cur.fetchall()]
+        with pooled_connection(get_dataset_connection_string(1)) as conn:
+            cur = conn.cursor()
+
+            # Get tables
+            cur.execute("""
+                SELECT table_name 
+                FROM information_schema.tables 
+                WHERE table_schema = 'public' 
+                AND table_type = 'BASE TABLE'
+                ORDER BY table_name
+            """)
+            tables = [row[0] for row in cur.fetchall()]
+            cur.close()
         
         print(f"✓ SUCCESS: Found {len(tables)} tables")
         for table in tables:
-            print(f"  - {table}")
+            log.debug("  - %s", table)
         
-        cur.close()
-        conn.close()
-        db.close()
         return True
         
     except Exception as e:
@@ -121,38 +105,27 @@ def test_weighted_query():
     print("TEST 4: Weighted Query")
     print("=" * 80)
     try:
-        db = next(get_db())
-        dataset = db.query(Dataset).filter(Dataset.id == 1).first()
-        
-        encryption_manager = get_encryption_manager()
-        connection_string = encryption_manager.decrypt(dataset.connection_string_encrypted)
-        
-        if connection_string.startswith('postgres://'):
-            connection_string = connection_string.replace('postgres://', 'postgresql://', 1)
-        
-        conn = psycopg2.connect(connection_string)
-        cur = conn.cursor()
-        
-        # Test weighted query
-        cur.execute("""
-            SELECT gender, COUNT(*) as count, SUM(weights) as weighted_count
-            FROM digital_insights
-            GROUP BY gender
-            LIMIT 5
-        """)
-        
-        results = cur.fetchall()
-        columns = [desc[0] for desc in cur.description]
+        with pooled_connection(get_dataset_connection_string(1)) as conn:
+            cur = conn.cursor()
+
+            # Test weighted query
+            cur.execute("""
+                SELECT gender, COUNT(*) as count, SUM(weights) as weighted_count
+                FROM digital_insights
+                GROUP BY gender
+                LIMIT 5
+            """)
+
+            results = cur.fetchall()
+            columns = [desc[0] for desc in cur.description]
+            cur.close()
         
         print(f"✓ SUCCESS: Executed weighted query")
-        print(f"  Columns: {columns}")
-        print(f"  Results:")
+        log.debug("  Columns: %s", columns)
+        log.debug("  Results:")
         for row in results:
-            print(f"    {row}")
+            log.debug("    %s", row)
         
-        cur.close()
-        conn.close()
-        db.close()
         return True
         
     except Exception as e:
@@ -160,22 +133,20 @@ def test_weighted_query():
         return False
 
 
-def test_metadata_table():
+def check_metadata_table(db):
     """Test that metadata table exists and has the metadata_text column"""
     print("\n" + "=" * 80)
     print("TEST 5: Metadata Table Schema")
     print("=" * 80)
     try:
-        db = next(get_db())
-        
         from sqlalchemy import inspect
         inspector = inspect(db.bind)
         columns = inspector.get_columns('metadata')
         
         print(f"✓ SUCCESS: Metadata table exists")
-        print(f"  Columns:")
+        log.debug("  Columns:")
         for col in columns:
-            print(f"    - {col['name']}: {col['type']}")
+            log.debug("    - %s: %s", col['name'], col['type'])
         
         # Check for metadata_text column
         has_metadata_text = any(col['name'] == 'metadata_text' for col in columns)
@@ -185,11 +156,11 @@ def test_metadata_table():
             print(f"  ✗ metadata_text column MISSING")
             return False
         
-        db.close()
         return True
         
     except Exception as e:
         print(f"✗ FAILED: {e}")
+        db.rollback()  # Keep the shared session usable for the next test
         return False
 
 
@@ -202,11 +173,17 @@ def main():
     
     results = []
     
-    results.append(("Database Connection", test_database_connection()))
-    results.append(("Dataset Connection", test_dataset_connection()))
-    results.append(("Schema Query", test_schema_query()))
-    results.append(("Weighted Query", test_weighted_query()))
-    results.append(("Metadata Table", test_metadata_table()))
+    # One metadata session for every test
+    db = next(get_db())
+    try:
+        results.append(("Database Connection", check_database_connection(db)))
+        results.append(("Dataset Connection", check_dataset_connection(db)))
+        results.append(("Schema Query", test_schema_query()))
+        results.append(("Weighted Query", test_weighted_query()))
+        results.append(("Metadata Table", check_metadata_table(db)))
+    finally:
+        db.close()
+        close_all_pools()
     
     # Summary
     print("\n" + "=" * 80)
@@ -1,43 +1,94 @@
 """
 Test MCP tools via HTTP/SSE endpoint
 This simulates how ChatGPT would call the MCP server
+
+By default the start_server app is called in-process (no socket or running
+server needed); pass --remote to go over HTTP to MCP_URL / MCP_UDS instead.
 """
-import requests
-import json
+import os
+import sys
+import asyncio
+import httpx
+import logging
+import orjson
 from datetime import datetime
+from itertools import islice
 
 # MCP endpoint
 MCP_URL = "http://localhost:8000/mcp"
 
-def call_mcp_tool(tool_name: str, arguments: dict = None):
+# Unix socket of a server started with --uds (the host in MCP_URL is then ignored)
+MCP_UDS = os.getenv("MCP_UDS")
+
+# Per-row listings and result previews only show with LOGLEVEL=DEBUG
+log = logging.getLogger("mcptest")
+logging.basicConfig(format="%(message)s")
+log.setLevel(os.getenv("LOGLEVEL", "WARNING"))
+
+# Most tool calls in flight at once (keep at or below the server's pool size)
+MAX_CONCURRENT_TESTS = int(os.getenv("MAX_CONCURRENT_TESTS", 8))
+
+# Headers sent with every tools/call
+HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json, text/event-stream"
+}
+
+# MCP protocol request fields shared by every tools/call
+_REQUEST_TEMPLATE = {"jsonrpc": "2.0", "method": "tools/call"}
+
+# Streamable HTTP session handshake (tools/call is refused without a session ID)
+_INITIALIZE_REQUEST = orjson.dumps({
+    "jsonrpc": "2.0",
+    "id": "test-initialize",
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "test_mcp_http", "version": "1.0"}
+    }
+})
+_INITIALIZED_NOTIFICATION = orjson.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+
+def decode_response(response: httpx.Response) -> dict:
+    """JSON-RPC message from a response, whether sent as plain JSON or as an SSE event"""
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        for line in response.text.splitlines():
+            if line.startswith("data:"):
+                return orjson.loads(line[5:])
+        raise ValueError("SSE response carried no data event")
+    return orjson.loads(response.content)
+
+
+async def open_session(client: httpx.AsyncClient):
+    """Run the MCP initialize handshake and send the session ID on every later request"""
+    response = await client.post(MCP_URL, content=_INITIALIZE_REQUEST, timeout=30)
+    response.raise_for_status()
+    session_id = response.headers.get("mcp-session-id")
+    if session_id:
+        client.headers["mcp-session-id"] = session_id
+    await client.post(MCP_URL, content=_INITIALIZED_NOTIFICATION, timeout=30)
+
+
+async def call_mcp_tool(client: httpx.AsyncClient, tool_name: str, arguments: dict = None):
     """Call an MCP tool via HTTP POST"""
-    if arguments is None:
-        arguments = {}
-    
-    # MCP protocol request format
-    request_data = {
-        "jsonrpc": "2.0",
+    payload = orjson.dumps({
+        **_REQUEST_TEMPLATE,
         "id": f"test-{tool_name}",
-        "method": "tools/call",
-        "params": {
-            "name": tool_name,
-            "arguments": arguments
-        }
-    }
+        "params": {"name": tool_name, "arguments": arguments or {}}
+    })
     
     try:
-        response = requests.post(
-            MCP_URL,
-            json=request_data,
-            headers={
-                "Content-Type": "application/json",
-                "Accept": "application/json, text/event-stream"
-            },
-            timeout=30
-        )
+        response = await client.post(MCP_URL, content=payload, timeout=30)
         
         if response.status_code == 200:
-            return {"success": True, "data": response.json()}
+            data = decode_response(response)
+            if "error" in data:
+                return {"success": False, "error": data["error"].get("message", str(data["error"]))}
+            if data.get("result", {}).get("isError"):
+                return {"success": False, "error": preview(data["result"].get("content"))}
+            return {"success": True, "data": data}
         else:
             return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
     
@@ -45,12 +96,85 @@ def call_mcp_tool(tool_name: str, arguments: dict = None):
         return {"success": False, "error": str(e)}
 
 
-def main():
+# (title, result name, tool, arguments) for each test, in report order
+TESTS = [
+    ("list_available_datasets()", "list_available_datasets", "list_available_datasets", {}),
+    ("get_dataset_schema(dataset_id=1)", "get_dataset_schema", "get_dataset_schema", {"dataset_id": 1}),
+    ("get_context(level=0)", "get_context_level_0", "get_context", {"level": 0}),
+    (
+        "get_dataset_sample(dataset_id=1, table_name='respondents', limit=5)",
+        "get_dataset_sample",
+        "get_dataset_sample",
+        {"dataset_id": 1, "table_name": "respondents", "limit": 5}
+    ),
+    (
+        "query_dataset(dataset_id=1, query='SELECT COUNT(*) as total FROM respondents')",
+        "query_dataset_count",
+        "query_dataset",
+        {"dataset_id": 1, "query": "SELECT COUNT(*) as total FROM respondents", "apply_weights": False}
+    ),
+    (
+        "execute_multi_query with 2 queries",
+        "execute_multi_query",
+        "execute_multi_query",
+        {
+            "queries": [
+                {
+                    "dataset_id": 1,
+                    "query": "SELECT COUNT(*) as total_respondents FROM respondents",
+                    "label": "Total Respondents"
+                },
+                {
+                    "dataset_id": 1,
+                    "query": "SELECT gender, COUNT(*) as count FROM respondents GROUP BY gender LIMIT 3",
+                    "label": "Gender Distribution"
+                }
+            ],
+            "apply_weights": False
+        }
+    ),
+]
+
+
+def preview(obj, limit: int = 500) -> str:
+    """Short summary of a tool result that never renders the whole payload"""
+    if isinstance(obj, str):
+        return obj[:limit] + ("..." if len(obj) > limit else "")
+    if isinstance(obj, (list, tuple)):
+        return f"{type(obj).__name__}[{len(obj)}] head={obj[:3]!r:.{limit}}"
+    if isinstance(obj, dict):
+        return f"dict[{len(obj)}] keys={list(islice(obj, 5))}"
+    text = repr(obj)
+    return text[:limit] + ("..." if len(text) > limit else "")
+
+
+async def bounded(semaphore: asyncio.Semaphore, call):
+    """Await a tool call once a concurrency slot is free"""
+    async with semaphore:
+        return await call
+
+
+async def run_tests(client: httpx.AsyncClient) -> list:
+    """Run every test's tool call, returning the results in TESTS order"""
+    await open_session(client)
+
+    # The tools are independent reads, so the calls overlap
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TESTS)
+    return await asyncio.gather(*(
+        bounded(semaphore, call_mcp_tool(client, tool, arguments))
+        for _, _, tool, arguments in TESTS
+    ))
+
+
+async def main(remote: bool = False):
     print("=" * 80)
     print("MCP ANALYTICS SERVER - HTTP ENDPOINT TEST")
     print("=" * 80)
     print(f"Test started at: {datetime.now()}")
-    print(f"Endpoint: {MCP_URL}")
+    if remote:
+        print(f"Endpoint: {MCP_URL}" + (f" via {MCP_UDS}" if MCP_UDS else ""))
+    else:
+        print("Endpoint: start_server:app (in-process)")
     print()
     
     results = {
@@ -59,117 +183,39 @@ def main():
         "tests": []
     }
     
-    # Test 1: list_available_datasets
-    print("\n" + "=" * 80)
-    print("TEST 1: list_available_datasets()")
-    print("=" * 80)
-    result = call_mcp_tool("list_available_datasets")
-    if result["success"]:
-        print("✓ SUCCESS")
-        print(f"Response: {json.dumps(result['data'], indent=2)[:500]}...")
-        results["passed"] += 1
-        results["tests"].append({"name": "list_available_datasets", "status": "PASS"})
-    else:
-        print(f"✗ FAILED: {result['error']}")
-        results["failed"] += 1
-        results["tests"].append({"name": "list_available_datasets", "status": "FAIL", "error": result['error']})
-    
-    # Test 2: get_dataset_schema
-    print("\n" + "=" * 80)
-    print("TEST 2: get_dataset_schema(dataset_id=1)")
-    print("=" * 80)
-    result = call_mcp_tool("get_dataset_schema", {"dataset_id": 1})
-    if result["success"]:
-        print("✓ SUCCESS")
-        print(f"Response: {json.dumps(result['data'], indent=2)[:500]}...")
-        results["passed"] += 1
-        results["tests"].append({"name": "get_dataset_schema", "status": "PASS"})
+    if remote:
+        # One keep-alive client for every call, so the tests share connections
+        async with httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=MCP_UDS) if MCP_UDS else None,
+            limits=httpx.Limits(max_connections=MAX_CONCURRENT_TESTS),
+            headers=HEADERS
+        ) as client:
+            responses = await run_tests(client)
     else:
-        print(f"✗ FAILED: {result['error']}")
-        results["failed"] += 1
-        results["tests"].append({"name": "get_dataset_schema", "status": "FAIL", "error": result['error']})
-    
-    # Test 3: get_context (level 0)
-    print("\n" + "=" * 80)
-    print("TEST 3: get_context(level=0)")
-    print("=" * 80)
-    result = call_mcp_tool("get_context", {"level": 0})
-    if result["success"]:
-        print("✓ SUCCESS")
-        print(f"Response: {json.dumps(result['data'], indent=2)[:500]}...")
-        results["passed"] += 1
-        results["tests"].append({"name": "get_context_level_0", "status": "PASS"})
-    else:
-        print(f"✗ FAILED: {result['error']}")
-        results["failed"] += 1
-        results["tests"].append({"name": "get_context_level_0", "status": "FAIL", "error": result['error']})
-    
-    # Test 4: get_dataset_sample
-    print("\n" + "=" * 80)
-    print("TEST 4: get_dataset_sample(dataset_id=1, table_name='respondents', limit=5)")
-    print("=" * 80)
-    result = call_mcp_tool("get_dataset_sample", {
-        "dataset_id": 1,
-        "table_name": "respondents",
-        "limit": 5
-    })
-    if result["success"]:
-        print("✓ SUCCESS")
-        print(f"Response: {json.dumps(result['data'], indent=2)[:500]}...")
-        results["passed"] += 1
-        results["tests"].append({"name": "get_dataset_sample", "status": "PASS"})
-    else:
-        print(f"✗ FAILED: {result['error']}")
-        results["failed"] += 1
-        results["tests"].append({"name": "get_dataset_sample", "status": "FAIL", "error": result['error']})
-    
-    # Test 5: query_dataset (simple count)
-    print("\n" + "=" * 80)
-    print("TEST 5: query_dataset(dataset_id=1, query='SELECT COUNT(*) as total FROM respondents')")
-    print("=" * 80)
-    result = call_mcp_tool("query_dataset", {
-        "dataset_id": 1,
-        "query": "SELECT COUNT(*) as total FROM respondents",
-        "apply_weights": False
-    })
-    if result["success"]:
-        print("✓ SUCCESS")
-        print(f"Response: {json.dumps(result['data'], indent=2)[:500]}...")
-        results["passed"] += 1
-        results["tests"].append({"name": "query_dataset_count", "status": "PASS"})
-    else:
-        print(f"✗ FAILED: {result['error']}")
-        results["failed"] += 1
-        results["tests"].append({"name": "query_dataset_count", "status": "FAIL", "error": result['error']})
-    
-    # Test 6: execute_multi_query
-    print("\n" + "=" * 80)
-    print("TEST 6: execute_multi_query with 2 queries")
-    print("=" * 80)
-    result = call_mcp_tool("execute_multi_query", {
-        "queries": [
-            {
-                "dataset_id": 1,
-                "query": "SELECT COUNT(*) as total_respondents FROM respondents",
-                "label": "Total Respondents"
-            },
-            {
-                "dataset_id": 1,
-                "query": "SELECT gender, COUNT(*) as count FROM respondents GROUP BY gender LIMIT 3",
-                "label": "Gender Distribution"
-            }
-        ],
-        "apply_weights": False
-    })
-    if result["success"]:
-        print("✓ SUCCESS")
-        print(f"Response: {json.dumps(result['data'], indent=2)[:500]}...")
-        results["passed"] += 1
-        results["tests"].append({"name": "execute_multi_query", "status": "PASS"})
-    else:
-        print(f"✗ FAILED: {result['error']}")
-        results["failed"] += 1
-        results["tests"].append({"name": "execute_multi_query", "status": "FAIL", "error": result['error']})
+        # Call the ASGI app directly; ASGITransport skips lifespan, so run startup/shutdown here
+        from start_server import app
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                headers=HEADERS
+            ) as client:
+                responses = await run_tests(client)
+
+    # Output is printed in test order once every call has returned
+
+    for number, ((title, name, _, _), result) in enumerate(zip(TESTS, responses), start=1):
+        print("\n" + "=" * 80)
+        print(f"TEST {number}: {title}")
+        print("=" * 80)
+        if result["success"]:
+            print("✓ SUCCESS")
+            log.debug("Response: %s", preview(result['data']['result']['content']))
+            results["passed"] += 1
+            results["tests"].append({"name": name, "status": "PASS"})
+        else:
+            print(f"✗ FAILED: {result['error']}")
+            results["failed"] += 1
+            results["tests"].append({"name": name, "status": "FAIL", "error": result['error']})
     
     # Print summary
     print("\n" + "=" * 80)
@@ -189,10 +235,10 @@ def main():
     print("\n" + "=" * 80)
     print(f"Test completed at: {datetime.now()}")
     print("=" * 80)
-    
+
     return results
 
 if __name__ == "__main__":
-    results = main()
+    results = asyncio.run(main(remote="--remote" in sys.argv[1:]))
     exit(0 if results["failed"] == 0 else 1)
 
@@ -6,23 +6,45 @@ Serves BOTH Web UI and MCP protocol on same port
 import os
 import sys
 import argparse
-import asyncio
+from contextlib import asynccontextmanager
+import orjson
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, RedirectResponse
 import uvicorn
 
 # Load environment variables
 load_dotenv()
 
 from app.database import init_database
+from app.pool import close_all_pools
+from app.responses import json_bytes_response
 from app.ui.routes import router as ui_router
+from server import mcp as mcp_instance
+
+# FastMCP's Streamable HTTP app, served in this process at /mcp
+mcp_app = mcp_instance.http_app(path="/mcp")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run startup, keep FastMCP's session manager running, then shut down"""
+    await startup_event()
+    try:
+        async with mcp_app.lifespan(app):
+            yield
+    finally:
+        await shutdown_event()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="MCP Analytics Server - Unified",
     description="Multi-dataset analytics with Web UI and MCP protocol",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS
@@ -38,7 +60,6 @@ app.add_middleware(
 app.include_router(ui_router)
 
 
-@app.on_event("startup")
 async def startup_event():
     """Initialize on startup"""
     print("=" * 70)
@@ -49,12 +70,12 @@ async def startup_event():
     init_database()
     print("✅ Database initialized")
 
-    # Initialize dataset cache
-    from server import reload_datasets_cache, listen_for_dataset_changes
-    reload_datasets_cache()
+    # Start hot-reload listener (cancelled by shutdown_event)
+    from server import schedule_datasets_reload, start_background_tasks
+    app.state.background_tasks = await start_background_tasks()
 
-    # Start hot-reload listener
-    asyncio.create_task(listen_for_dataset_changes())
+    # Load dataset cache in the background (tools work without it)
+    schedule_datasets_reload()
 
     print()
     print("📊 Features:")
@@ -66,39 +87,49 @@ async def startup_event():
     print()
 
 
+async def shutdown_event():
+    """Stop the background tasks and close the shared connection pools"""
+    from server import stop_background_tasks
+    await stop_background_tasks(getattr(app.state, "background_tasks", None))
+
+    from app.services.parallel_query_executor import parallel_executor
+    await parallel_executor.close_pool()
+    close_all_pools()
+
+
 @app.get("/")
 async def root():
     """Root endpoint - redirect to UI"""
-    from fastapi.responses import RedirectResponse
     return RedirectResponse(url="/ui")
 
 
+_HEALTH_JSON = orjson.dumps({
+    "status": "healthy",
+    "version": "2.0.0",
+    "endpoints": {
+        "ui": "/ui",
+        "mcp": "/mcp",
+        "docs": "/docs"
+    }
+})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "version": "2.0.0",
-        "endpoints": {
-            "ui": "/ui",
-            "mcp": "/mcp",
-            "docs": "/docs"
-        }
-    }
-
+    return json_bytes_response(_HEALTH_JSON)
 
-# Import and mount MCP tools from server.py
-from server import mcp as mcp_instance
 
-# Mount MCP endpoint using FastMCP
-# FastMCP will handle the /mcp endpoint automatically
-mcp_instance.mount(app)
+# MCP protocol endpoint (mounted last so the UI routes above take precedence)
+app.mount("/", mcp_app)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Unified MCP Analytics Server")
     parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)), help="Port")
     parser.add_argument("--host", type=str, default="0.0.0.0", help="Host")
+    parser.add_argument("--uds", type=str, default=None,
+                        help="Listen on this Unix domain socket instead of host/port (for same-host clients)")
     args = parser.parse_args()
 
     # Support port as first argument
@@ -110,17 +141,23 @@ if __name__ == "__main__":
 
     print()
     print("🌐 Server starting on:")
-    print(f"   Web UI:  http://{host}:{port}/ui")
-    print(f"   MCP API: http://{host}:{port}/mcp")
-    print(f"   Health:  http://{host}:{port}/health")
+    if args.uds:
+        print(f"   Unix socket: {args.uds} (/ui, /mcp, /health)")
+    else:
+        print(f"   Web UI:  http://{host}:{port}/ui")
+        print(f"   MCP API: http://{host}:{port}/mcp")
+        print(f"   Health:  http://{host}:{port}/health")
     print()
     print("=" * 70)
     print()
 
-    # Run with uvicorn
+    # Run with uvicorn (a Unix socket skips the TCP stack for same-host clients)
+    listen = {"uds": args.uds} if args.uds else {"host": host, "port": port}
     uvicorn.run(
-        app,
-        host=host,
-        port=port,
+        "unified_server:app",
+        **listen,
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),  # Each worker process gets its own pools
         log_level="info"
     )